@@ -0,0 +1,431 @@
+"""
+Офлайн-бенчмарки парсеров и конвейера
+
+Все запросы идут на локальный StandInServer с записанными страницами,
+поэтому результаты воспроизводимы и не зависят от живых сайтов.
+Каждая строка отчета замеряется в отдельном процессе (тот же скрипт
+с --child): пиковая память RSS относится только к этому замеру, а
+соединения и кэши не переходят из одного замера в другой.
+
+Примеры:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --latency 0.1 --error-rate 0.05
+    python benchmarks/run_benchmarks.py --save baseline.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+from requests.adapters import HTTPAdapter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+from parsers.keyword_matcher import KeywordMatcher  # noqa: E402
+from parsers.metrics import METRICS  # noqa: E402
+from parsers.parse_pool import ParsePool  # noqa: E402
+from parsers.rusprofile import RusprofileParser  # noqa: E402
+from parsers.scheduler import RequestScheduler  # noqa: E402
+from parsers.sources import Discovery, HHSource, create_source  # noqa: E402
+from parsers.superjob_parser import SuperJobParser, parse_vacancies  # noqa: E402
+from pipeline import EnrichmentPipeline  # noqa: E402
+from sinks import CsvSink  # noqa: E402
+from stand_in_server import FIXTURES_DIR, StandInConfig, StandInServer  # noqa: E402
+
+KEYWORDS = [
+    "Trados", "memoQ", "Smartcat", "Crowdin", "Phrase",
+    "translation memory", "память переводов", "CAT tool",
+    "локализация", "переводчик", "технический писатель", "Technical Writer"
+]
+
+# Метрики, по которым сравнивается с эталоном: больше - лучше
+THROUGHPUT_METRICS = ('pages_per_s', 'companies_per_s', 'calls_per_s')
+
+
+class LatencyRecorder(HTTPAdapter):
+    """HTTPAdapter, запоминающий время каждого запроса"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies: List[float] = []
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            with self._lock:
+                self.latencies.append(time.perf_counter() - started)
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    # В Linux ru_maxrss в килобайтах, в macOS - в байтах
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def record_latency(session, pool_size: int = 16) -> LatencyRecorder:
+    recorder = LatencyRecorder(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', recorder)
+    return recorder
+
+
+def latency_stats(recorder: LatencyRecorder) -> Dict[str, float]:
+    return {
+        'requests': len(recorder.latencies),
+        'p50_ms': percentile(recorder.latencies, 50) * 1000,
+        'p95_ms': percentile(recorder.latencies, 95) * 1000,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Скрывает print() парсеров, чтобы не мешать замерам и отчету"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def make_scheduler(args) -> RequestScheduler:
+    # Нижняя граница частоты не дает ошибкам (--error-rate) растянуть прогон на минуты
+    return RequestScheduler(rate=args.rate, burst=args.concurrency,
+                            min_rate=args.rate / 10, max_rate=args.rate, backoff_base=0.05)
+
+
+def make_parse_pool(args):
+    # --parse-workers 0 - разбор в потоках парсеров, как по умолчанию в main()
+    return ParsePool(workers=args.parse_workers, chunksize=args.parse_chunksize) if args.parse_workers else None
+
+
+def timed(func: Callable):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+# --- Бенчмарки ---
+# Каждая функция - одна строка отчета; она выполняется в отдельном процессе,
+# поэтому пиковая память (RSS) процесса относится только к ней
+
+def bench_superjob_parse(args, fast: bool) -> Dict:
+    """Время разбора одной страницы выдачи SuperJob: lxml или BeautifulSoup"""
+    with open(os.path.join(FIXTURES_DIR, 'superjob_search.html'), encoding='utf-8') as f:
+        html = f.read()
+    parser = SuperJobParser(fast_parse=fast)
+    elapsed, _ = timed(lambda: [parser._parse_company_names(html, 30) for _ in range(args.parse_iterations)])
+    return {
+        'parse_ms_per_page': elapsed / args.parse_iterations * 1000,
+        'pages_per_s': args.parse_iterations / elapsed,
+    }
+
+
+def bench_rusprofile_parse(args, fast: bool) -> Dict:
+    """Время разбора одной страницы поиска Rusprofile: lxml или BeautifulSoup"""
+    with open(os.path.join(FIXTURES_DIR, 'rusprofile_search.html'), encoding='utf-8') as f:
+        html = f.read().replace('__NAME__', 'Ромашка').replace('__INN__', '7701234567')
+    parser = RusprofileParser(fast_parse=fast)
+    extract = parser._extract_card if fast else parser._extract_card_soup
+    elapsed, _ = timed(lambda: [extract(html) for _ in range(args.parse_iterations)])
+    return {
+        'parse_ms_per_page': elapsed / args.parse_iterations * 1000,
+        'pages_per_s': args.parse_iterations / elapsed,
+    }
+
+
+def bench_keywords(args, extra: int) -> Dict:
+    """Поиск ключевых слов в тексте вакансий: время почти не зависит от длины списка"""
+    with open(os.path.join(FIXTURES_DIR, 'superjob_search.html'), encoding='utf-8') as f:
+        texts = [text for _, text in parse_vacancies(f.read(), 30)]
+    matcher = KeywordMatcher(KEYWORDS + [f'Product {i} Suite' for i in range(extra)])
+    elapsed, _ = timed(lambda: [matcher.count(text) for _ in range(args.parse_iterations) for text in texts])
+    return {
+        'match_ms_per_page': elapsed / args.parse_iterations * 1000,
+        'pages_per_s': args.parse_iterations / elapsed,
+    }
+
+
+def bench_superjob_search_async(args) -> Dict:
+    """Параллельный поиск вакансий по первым страницам"""
+    parser = SuperJobParser(concurrency=args.concurrency, scheduler=make_scheduler(args), parse_pool=args.pool)
+    recorder = record_latency(parser._make_session(), args.concurrency)
+    with quiet():
+        elapsed, companies = timed(lambda: asyncio.run(parser.search_companies_by_keywords_async(KEYWORDS)))
+    return {
+        'seconds': elapsed,
+        'pages_per_s': len(KEYWORDS) / elapsed,
+        'companies_per_s': len(companies) / elapsed,
+        **latency_stats(recorder),
+    }
+
+
+def bench_superjob_iter_companies(args) -> Dict:
+    """Потоковый поиск вакансий по всем страницам выдачи"""
+    parser = SuperJobParser(concurrency=args.concurrency, scheduler=make_scheduler(args), parse_pool=args.pool)
+    recorder = record_latency(parser._make_session(), args.concurrency)
+    with quiet():
+        elapsed, companies = timed(lambda: list(parser.iter_companies(KEYWORDS, max_pages=args.pages)))
+    return {
+        'seconds': elapsed,
+        'pages_per_s': len(recorder.latencies) / elapsed,
+        'companies_per_s': len(companies) / elapsed,
+        **latency_stats(recorder),
+    }
+
+
+def bench_discovery(args, names: List[str]) -> Dict:
+    """Поиск по одному и по двум сайтам: время почти не должно расти"""
+    scheduler = make_scheduler(args)
+    sources = [create_source(name, concurrency=args.concurrency, scheduler=scheduler, parse_pool=args.pool)
+               for name in names]
+    with quiet():
+        elapsed, companies = timed(lambda: list(
+            Discovery(sources, matcher=KeywordMatcher(KEYWORDS)).iter_companies(KEYWORDS, max_pages=args.pages)
+        ))
+    return {
+        'seconds': elapsed,
+        'companies_per_s': len(companies) / elapsed,
+        'companies': len(companies),
+    }
+
+
+def bench_rusprofile_search(args) -> Dict:
+    """Поиск ИНН по названию"""
+    parser = RusprofileParser(scheduler=make_scheduler(args), pool_size=args.concurrency, parse_pool=args.pool)
+    recorder = record_latency(parser.session, args.concurrency)
+    names = [f'Компания {i}' for i in range(args.companies)]
+    with quiet():
+        elapsed, _ = timed(lambda: [parser.search_inn_by_name(name) for name in names])
+    return {
+        'seconds': elapsed,
+        'calls_per_s': len(names) / elapsed,
+        **latency_stats(recorder),
+    }
+
+
+def bench_rusprofile_info(args) -> Dict:
+    """Получение финансов по ИНН (сервер-заглушка отвечает на любой ИНН)"""
+    parser = RusprofileParser(scheduler=make_scheduler(args), pool_size=args.concurrency, parse_pool=args.pool)
+    recorder = record_latency(parser.session, args.concurrency)
+    inns = [f'77{i:08d}' for i in range(args.companies)]
+    with quiet():
+        elapsed, _ = timed(lambda: [parser.get_company_info(inn) for inn in inns])
+    return {
+        'seconds': elapsed,
+        'calls_per_s': len(inns) / max(elapsed, 1e-9),
+        **latency_stats(recorder),
+    }
+
+
+def bench_pipeline(args) -> Dict:
+    """Сквозной прогон как в main(): SuperJob -> конвейер Rusprofile -> CSV"""
+    scheduler = make_scheduler(args)
+    superjob = SuperJobParser(concurrency=args.concurrency, scheduler=scheduler, parse_pool=args.pool)
+    rusprofile = RusprofileParser(scheduler=scheduler, pool_size=args.concurrency, parse_pool=args.pool)
+    superjob_recorder = record_latency(superjob._make_session(), args.concurrency)
+    rusprofile_recorder = record_latency(rusprofile.session, args.concurrency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = EnrichmentPipeline(
+            rusprofile,
+            sink=CsvSink(os.path.join(tmp, 'companies.csv')),
+            keep_results=False,
+            resolve_workers=args.concurrency // 2 or 1,
+            financials_workers=args.concurrency // 2 or 1,
+        )
+        with quiet():
+            elapsed, _ = timed(lambda: pipeline.run(
+                superjob.iter_companies(KEYWORDS, max_pages=args.pages)
+            ))
+
+    latencies = superjob_recorder.latencies + rusprofile_recorder.latencies
+    return {
+        'seconds': elapsed,
+        'pages_per_s': len(superjob_recorder.latencies) / elapsed,
+        'companies_per_s': pipeline.processed / elapsed,
+        'companies_in': pipeline.processed,
+        'companies_out': pipeline.written,
+        'requests': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+    }
+
+
+# Группа (--only) -> строки отчета и функции замера
+BENCHMARKS: Dict[str, Dict[str, Callable]] = {
+    'parse': {
+        'superjob_parse_fast': functools.partial(bench_superjob_parse, fast=True),
+        'rusprofile_parse_fast': functools.partial(bench_rusprofile_parse, fast=True),
+        'superjob_parse_soup': functools.partial(bench_superjob_parse, fast=False),
+        'rusprofile_parse_soup': functools.partial(bench_rusprofile_parse, fast=False),
+        'keywords_match_12': functools.partial(bench_keywords, extra=0),
+        'keywords_match_500': functools.partial(bench_keywords, extra=488),
+    },
+    'superjob': {
+        'superjob_search_async': bench_superjob_search_async,
+        'superjob_iter_companies': bench_superjob_iter_companies,
+    },
+    'discovery': {
+        'discovery_superjob': functools.partial(bench_discovery, names=['superjob']),
+        'discovery_superjob_hh': functools.partial(bench_discovery, names=['superjob', 'hh']),
+    },
+    'rusprofile': {
+        'rusprofile_search_inn_by_name': bench_rusprofile_search,
+        'rusprofile_get_company_info': bench_rusprofile_info,
+    },
+    'pipeline': {
+        'pipeline_end_to_end': bench_pipeline,
+    },
+}
+
+
+def point_parsers_at(url: str) -> None:
+    """Направляет парсеры на сервер-заглушку"""
+    SuperJobParser.BASE_URL = f"{url}/vakansii/"
+    RusprofileParser.SEARCH_URL = f"{url}/search"
+    RusprofileParser.BASE_URL = url
+    # hh.ru - под другим именем хоста, чтобы лимит частоты был отдельным, как у настоящих сайтов
+    HHSource.API_URL = url.replace('127.0.0.1', 'localhost') + '/vacancies'
+
+
+def run_child(args) -> None:
+    """Выполняет одну строку отчета (--child) и сохраняет результат в --child-output"""
+    point_parsers_at(args.server_url)
+    args.pool = make_parse_pool(args)
+    group, name = args.child.split('.', 1)
+    # Память интерпретатора и импортированных модулей - до начала замера
+    rss_before = peak_rss_mb()
+    try:
+        metrics = BENCHMARKS[group][name](args)
+    finally:
+        if args.pool is not None:
+            args.pool.close()
+    # Процессы ParsePool не входят в RSS этого процесса
+    metrics['peak_rss_mb'] = peak_rss_mb()
+    metrics['rss_growth_mb'] = metrics['peak_rss_mb'] - rss_before
+    with open(args.child_output, 'w', encoding='utf-8') as f:
+        json.dump({'benchmark': metrics, 'metrics': METRICS.report()}, f, ensure_ascii=False)
+
+
+def run_isolated(group: str, name: str, server_url: str) -> Dict:
+    """Запускает строку отчета в новом процессе с теми же параметрами командной строки"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'result.json')
+        subprocess.run([sys.executable, os.path.abspath(__file__), *sys.argv[1:],
+                        '--child', f'{group}.{name}', '--server-url', server_url, '--child-output', output],
+                       check=True)
+        with open(output, encoding='utf-8') as f:
+            return json.load(f)
+
+
+# --- Отчет ---
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Returns:
+        Список описаний регрессий (пустой, если их нет)
+    """
+    regressions = []
+    for name, metrics in results['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name, {})
+        for metric in THROUGHPUT_METRICS:
+            if metric in metrics and base.get(metric):
+                if metrics[metric] < base[metric] * (1 - tolerance):
+                    regressions.append(f"{name}.{metric}: {metrics[metric]:.1f} < {base[metric]:.1f}")
+    return regressions
+
+
+def print_report(results: Dict) -> None:
+    print("\nПиковая память (RSS) - у каждого замера своя, замеры идут в отдельных процессах")
+    for name, metrics in results['benchmarks'].items():
+        values = ', '.join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                           for key, value in metrics.items())
+        print(f"  {name}: {values}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Офлайн-бенчмарки парсеров')
+    parser.add_argument('--latency', type=float, default=0.02, help='задержка ответа сервера, с')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='доля ответов 503')
+    parser.add_argument('--rate', type=float, default=500.0, help='лимит запросов в секунду на хост')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--pages', type=int, default=3, help='страниц выдачи на ключевое слово')
+    parser.add_argument('--companies', type=int, default=100, help='названий для бенчмарка Rusprofile')
+    parser.add_argument('--parse-iterations', type=int, default=200)
+    parser.add_argument('--parse-workers', type=int, default=0, help='процессов для разбора HTML (0 - без пула)')
+    parser.add_argument('--parse-chunksize', type=int, default=8, help='страниц на одну передачу в пул')
+    parser.add_argument('--only', choices=['parse', 'superjob', 'discovery', 'rusprofile', 'pipeline'], action='append')
+    parser.add_argument('--save', help='сохранить результаты в JSON')
+    parser.add_argument('--baseline', help='JSON с эталонными результатами для сравнения')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='допустимое падение пропускной способности')
+    # Служебные параметры процесса одного замера
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--server-url', help=argparse.SUPPRESS)
+    parser.add_argument('--child-output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args)
+        return
+
+    selected = args.only or list(BENCHMARKS)
+    config = StandInConfig(latency=args.latency, error_rate=args.error_rate,
+                           pages_per_keyword=args.pages)
+    benchmarks = {}
+    metrics = {}
+
+    with StandInServer(config) as server:
+        print(f"Сервер-заглушка: {server.url} (задержка {args.latency} с, ошибки {args.error_rate:.0%})")
+        for group in selected:
+            print(f"▶ {group}...")
+            for name in BENCHMARKS[group]:
+                # Каждый замер - в новом процессе: холодные соединения и своя пиковая память
+                child = run_isolated(group, name, server.url)
+                benchmarks[name] = child['benchmark']
+                metrics[name] = child['metrics']
+
+    results = {
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('child', 'server_url', 'child_output')},
+        'benchmarks': benchmarks,
+        # Разбивка времени по стадиям и счетчики кэшей - по каждому замеру
+        'metrics': metrics,
+    }
+    print_report(results)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n📁 Результаты сохранены в '{args.save}'")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Регрессии производительности:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\n✅ Регрессий нет")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+Локальный HTTP-сервер, заменяющий SuperJob, hh.ru и Rusprofile в бенчмарках
+
+Отдает записанные страницы из benchmarks/fixtures, подставляя в них
+названия компаний и ИНН по запросу, с настраиваемой задержкой
+и долей ошибок (503 с Retry-After).
+
+Запуск отдельно: python benchmarks/stand_in_server.py --port 8765 --latency 0.05
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+_COMPANY_RE = re.compile(r'(f-test-text-vacancy-item-company-name[^>]*><a [^>]*>)([^<]+)(<)')
+
+
+def _load(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def _digits(text: str, length: int) -> str:
+    digest = hashlib.md5(text.encode('utf-8')).hexdigest()
+    return str(int(digest, 16))[:length].rjust(length, '0')
+
+
+class StandInConfig:
+    """
+    Настройки сервера
+
+    Args:
+        latency: Средняя задержка ответа в секундах
+        jitter: Случайный разброс задержки (доля от latency)
+        error_rate: Доля ответов 503 с заголовком Retry-After
+        pages_per_keyword: Сколько непустых страниц выдачи у каждого слова
+        companies_pool: Сколько разных компаний встречается в выдаче
+        not_found_rate: Доля названий, которых "нет" на Rusprofile
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.2, error_rate: float = 0.0,
+                 pages_per_keyword: int = 3, companies_pool: int = 200,
+                 not_found_rate: float = 0.1, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.pages_per_keyword = pages_per_keyword
+        self.companies_pool = companies_pool
+        self.not_found_rate = not_found_rate
+        self.random = random.Random(seed)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело уходят отдельными пакетами; без этого алгоритм Нейгла
+    # вместе с отложенным ACK добавляет ~40 мс к каждому ответу
+    disable_nagle_algorithm = True
+    config: StandInConfig = StandInConfig()
+    superjob_page = _load('superjob_search.html')
+    rusprofile_page = _load('rusprofile_search.html')
+    rusprofile_empty = _load('rusprofile_search_empty.html')
+    rusprofile_query = _load('rusprofile_query.json')
+    hh_vacancies = json.loads(_load('hh_vacancies.json'))
+
+    def log_message(self, *args):
+        pass
+
+    def _delay_and_maybe_fail(self) -> bool:
+        config = self.config
+        if config.latency:
+            spread = config.latency * config.jitter
+            time.sleep(max(0.0, config.latency + config.random.uniform(-spread, spread)))
+        if config.error_rate and config.random.random() < config.error_rate:
+            self._send(503, b'Service Unavailable', 'text/plain', {'Retry-After': '0'})
+            return True
+        return False
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # --- SuperJob ---
+
+    def _superjob(self, query: dict) -> None:
+        keyword = query.get('keywords', [''])[0]
+        page = int(query.get('page', ['1'])[0])
+        if page > self.config.pages_per_keyword:
+            html = self.superjob_page.split('<section')[0] + '</main></body></html>'
+        else:
+            pool = self.config.companies_pool
+
+            def rename(match):
+                number = int(_digits(f'{keyword}:{page}:{match.group(2)}', 6)) % pool
+                return f'{match.group(1)}ООО Компания {number}{match.group(3)}'
+
+            html = _COMPANY_RE.sub(rename, self.superjob_page)
+        self._send(200, html.encode('utf-8'), 'text/html; charset=utf-8')
+
+    # --- hh.ru ---
+
+    def _hh(self, query: dict) -> None:
+        keyword = query.get('text', [''])[0]
+        page = int(query.get('page', ['0'])[0])
+        data = dict(self.hh_vacancies, page=page, pages=self.config.pages_per_keyword)
+        if page >= self.config.pages_per_keyword:
+            data['items'] = []
+        else:
+            pool = self.config.companies_pool
+            items = []
+            for item in self.hh_vacancies['items']:
+                employer = dict(item['employer'])
+                if employer.get('id'):
+                    # Часть работодателей совпадает с компаниями выдачи SuperJob
+                    number = int(_digits(f"hh:{keyword}:{page}:{employer['id']}", 6)) % pool
+                    employer['name'] = f'Компания {number}'
+                items.append(dict(item, employer=employer))
+            data['items'] = items
+        self._send(200, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+    # --- Rusprofile ---
+
+    def _rusprofile_search(self, query: dict) -> None:
+        name = query.get('query', [''])[0]
+        if int(_digits('nf:' + name, 4)) / 10_000 < self.config.not_found_rate:
+            html = self.rusprofile_empty
+        else:
+            inn = '77' + _digits(name, 8)
+            html = (self.rusprofile_page.replace('__NAME__', name)
+                    .replace('__INN__', inn).replace('__ID__', inn[2:]))
+        self._send(200, html.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def _rusprofile_query(self, form: dict) -> None:
+        inn = form.get('query', [''])[0]
+        revenue_mln = int(_digits('rev:' + inn, 4)) % 500
+        body = (self.rusprofile_query.replace('__NAME__', f'Компания {inn[-4:]}')
+                .replace('__REVENUE__', f'{revenue_mln},5 млн ₽'))
+        self._send(200, body.encode('utf-8'), 'application/json; charset=utf-8')
+
+    # --- Маршрутизация ---
+
+    def do_GET(self):
+        if self._delay_and_maybe_fail():
+            return
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        if parts.path.startswith('/vakansii'):
+            self._superjob(query)
+        elif parts.path.startswith('/vacancies'):
+            self._hh(query)
+        elif parts.path.startswith('/search'):
+            self._rusprofile_search(query)
+        else:
+            self._send(404, b'Not Found', 'text/plain')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        if self._delay_and_maybe_fail():
+            return
+        if urlsplit(self.path).path.startswith('/ajax/query'):
+            self._rusprofile_query(form)
+        else:
+            self._send(404, b'Not Found', 'text/plain')
+
+
+class StandInServer:
+    """
+    Сервер в фоновом потоке; используется как контекстный менеджер
+
+    Пример:
+        with StandInServer(StandInConfig(latency=0.05)) as server:
+            print(server.url)
+    """
+
+    def __init__(self, config: Optional[StandInConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        handler = type('Handler', (StandInHandler,), {'config': config or StandInConfig()})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'StandInServer':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Локальная замена SuperJob, hh.ru и Rusprofile')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StandInServer(StandInConfig(latency=args.latency, error_rate=args.error_rate), port=args.port)
+    print(f"Сервер запущен: {server.url} (Ctrl+C - остановить)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,188 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Стадии обработки компании по порядку
+STAGE_DISCOVERED = 'discovered'
+STAGE_INN_RESOLVED = 'inn_resolved'
+STAGE_NOT_FOUND = 'not_found'
+STAGE_FINANCIALS_FETCHED = 'financials_fetched'
+STAGE_FILTERED = 'filtered'
+
+
+class CheckpointStore:
+    """
+    Хранилище прогресса обработки компаний в SQLite
+
+    Сопоставление "название -> ИНН" хранится по нормализованному ключу
+    названия, а финансы и результат фильтра - по ИНН. Каждая запись
+    сохраняется сразу, поэтому после падения или блокировки повторный
+    запуск продолжает с того же места, а свежие записи не запрашиваются
+    у сайта повторно.
+    """
+
+    def __init__(self, path: str = 'checkpoint.sqlite', max_age: float = 30 * 24 * 3600,
+                 not_found_max_age: float = 24 * 3600):
+        """
+        Args:
+            path: Путь к файлу базы
+            max_age: Через сколько секунд данные компании считаются устаревшими
+            not_found_max_age: Через сколько секунд повторять поиск ненайденных компаний
+        """
+        self.max_age = max_age
+        self.not_found_max_age = not_found_max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS resolutions (
+                company_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                inn TEXT,
+                stage TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS companies (
+                inn TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                passed INTEGER,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def _is_fresh(self, updated_at: float, max_age: float) -> bool:
+        return time.time() - updated_at < max_age
+
+    # --- Название -> ИНН ---
+
+    def get_resolution(self, company_id: str) -> Optional[Dict]:
+        """
+        Returns:
+            Словарь с ключами name, inn, stage, fresh или None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, inn, stage, updated_at FROM resolutions WHERE company_id = ?", (company_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        name, inn, stage, updated_at = row
+        max_age = self.not_found_max_age if stage == STAGE_NOT_FOUND else self.max_age
+        return {'name': name, 'inn': inn, 'stage': stage, 'fresh': self._is_fresh(updated_at, max_age)}
+
+    def mark_discovered(self, company_id: str, name: str) -> None:
+        """Отмечает новую компанию; уже известные записи не меняются"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO resolutions (company_id, name, inn, stage, updated_at) "
+                "VALUES (?, ?, NULL, ?, ?)", (company_id, name, STAGE_DISCOVERED, time.time())
+            )
+            self._conn.commit()
+
+    def save_resolution(self, company_id: str, name: str, inn: Optional[str]) -> None:
+        """
+        Args:
+            company_id: Нормализованный ключ названия
+            name: Название компании
+            inn: Найденный ИНН или None, если компания не найдена
+        """
+        stage = STAGE_INN_RESOLVED if inn else STAGE_NOT_FOUND
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolutions (company_id, name, inn, stage, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)", (company_id, name, inn, stage, time.time())
+            )
+            self._conn.commit()
+
+    # --- Данные по ИНН ---
+
+    def get_company(self, inn: str) -> Optional[Dict]:
+        """
+        Returns:
+            Словарь с ключами stage, passed, data, fresh или None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stage, passed, data, updated_at FROM companies WHERE inn = ?", (inn,)
+            ).fetchone()
+        if row is None:
+            return None
+        stage, passed, data, updated_at = row
+        return {
+            'stage': stage,
+            'passed': None if passed is None else bool(passed),
+            'data': json.loads(data),
+            'fresh': self._is_fresh(updated_at, self.max_age),
+        }
+
+    def save_financials(self, inn: str, data: Dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO companies (inn, stage, passed, data, updated_at) "
+                "VALUES (?, ?, NULL, ?, ?)",
+                (inn, STAGE_FINANCIALS_FETCHED, json.dumps(data, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+
+    def mark_filtered(self, inn: str, passed: bool) -> None:
+        """Сохраняет результат фильтра, не меняя время получения данных"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE companies SET stage = ?, passed = ? WHERE inn = ?",
+                (STAGE_FILTERED, int(passed), inn)
+            )
+            self._conn.commit()
+
+    def select_financials(self, fields: Iterable[str]) -> List[tuple]:
+        """
+        Поля сохраненных данных всех компаний (в том числе не прошедших фильтр)
+
+        Значения достаются из JSON средствами SQLite, без разбора
+        каждой записи в Python - для повторной фильтрации больших выборок.
+
+        Args:
+            fields: Имена полей в порядке колонок результата
+
+        Returns:
+            Список кортежей значений
+        """
+        columns = ', '.join(f"json_extract(data, '$.{name}')" for name in fields)
+        with self._lock:
+            return self._conn.execute(f"SELECT {columns} FROM companies").fetchall()
+
+    def select_resolved(self) -> List[Dict]:
+        """
+        Все найденные сопоставления "название -> ИНН" с данными компании
+
+        Returns:
+            Словари с ключами source_query (название из вакансий), inn,
+            name, full_name, ogrn (последние три - если получены финансы)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.name, r.inn, json_extract(c.data, '$.name'), "
+                "json_extract(c.data, '$.full_name'), json_extract(c.data, '$.ogrn') "
+                "FROM resolutions r LEFT JOIN companies c ON c.inn = r.inn "
+                "WHERE r.stage = ? AND r.inn IS NOT NULL", (STAGE_INN_RESOLVED,)
+            ).fetchall()
+        return [
+            {'source_query': query, 'inn': inn, 'name': name or query, 'full_name': full_name, 'ogrn': ogrn}
+            for query, inn, name, full_name, ogrn in rows
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        """Количество записей на каждой стадии"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, COUNT(*) FROM resolutions GROUP BY stage "
+                "UNION ALL SELECT stage, COUNT(*) FROM companies GROUP BY stage"
+            ).fetchall()
+        return {stage: count for stage, count in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,407 @@
+"""
+Распределенный обход: координатор и рабочие процессы с общей очередью задач
+
+Координатор ставит в очередь TaskQueue первые страницы выдачи для всех
+сочетаний (источник, регион, слово). Рабочие процессы берут задачи
+в аренду и ставят следующие:
+    search_page  - страница выдачи -> resolve_inn по каждой компании
+                   и search_page для следующей страницы;
+    resolve_inn  - поиск ИНН по названию -> fetch_company;
+    fetch_company - данные компании по ИНН, фильтр, запись результата по ИНН.
+Лимит частоты запросов к каждому хосту общий для всех процессов
+(SharedRateLimiter), поэтому добавление рабочих не нарушает его.
+Свидетельства (сайт и ключевое слово) каждого появления компании
+копятся в очереди, а не в задаче, поэтому повторные появления по другим
+словам, на других сайтах и в других регионах не теряются; при выгрузке
+cat_evidence собирается из них по ИНН, как в main.py.
+
+Локально (очередь в SQLite, рабочие - процессы этой машины):
+    python src/distributed.py run --workers 4
+Несколько машин (очередь в Redis):
+    python src/distributed.py seed --queue redis://queue-host:6379/0
+    python src/distributed.py worker --queue redis://queue-host:6379/0   # на каждой машине
+    python src/distributed.py export --queue redis://queue-host:6379/0
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from filtering import FilterCriteria
+from parsers.http_cache import ResponseCache
+from parsers.keyword_matcher import KeywordMatcher
+from parsers.metrics import METRICS, log, set_verbose
+from parsers.normalize import make_company_id
+from parsers.records import CompanyRecord, Source, format_evidence
+from parsers.rusprofile import RusprofileParser
+from parsers.scheduler import AdaptiveRateLimiter, RequestScheduler
+from parsers.sources import VacancySource, create_source, is_last_page, page_digest
+from sinks import PARQUET_AVAILABLE, CsvSink, MultiSink, ParquetSink
+from task_queue import Task, TaskQueue, open_queue
+
+# Типы задач; задачи ближе к результату выдаются раньше,
+# чтобы результаты появлялись с начала обхода, а очередь не разрасталась
+TASK_SEARCH_PAGE = 'search_page'
+TASK_RESOLVE_INN = 'resolve_inn'
+TASK_FETCH_COMPANY = 'fetch_company'
+PRIORITIES = {TASK_SEARCH_PAGE: 0, TASK_RESOLVE_INN: 1, TASK_FETCH_COMPANY: 2}
+
+CAT_KEYWORDS = [
+    "Trados", "memoQ", "Smartcat", "Crowdin", "Phrase",
+    "translation memory", "память переводов", "CAT tool",
+    "локализация", "переводчик", "технический писатель", "Technical Writer"
+]
+
+
+class SharedRateLimiter(AdaptiveRateLimiter):
+    """
+    Лимит частоты запросов к хосту, общий для всех процессов
+
+    Время делится на окна длиной burst / rate секунд; счетчик запросов
+    к хосту в текущем окне хранится в очереди (TaskQueue.incr_window),
+    и в одно окно проходит не больше burst запросов всех процессов.
+    Сверх общего лимита каждый процесс подстраивает свою частоту
+    под ответы сайта, как AdaptiveRateLimiter.
+    """
+
+    def __init__(self, queue: TaskQueue, rate: float = 1.0, burst: int = 1, **kwargs):
+        """
+        Args:
+            queue: Общая очередь (хранит счетчики окон)
+            rate: Общий лимит запросов в секунду к одному хосту
+            burst: Сколько запросов подряд допускается
+            **kwargs: Параметры AdaptiveRateLimiter (min_rate, decrease_factor, ...)
+        """
+        kwargs.setdefault('max_rate', rate)
+        super().__init__(rate=rate, burst=burst, **kwargs)
+        self.queue = queue
+        self.window = max(1, burst) / rate
+
+    def _reserve(self, url: str) -> float:
+        """Занимает место в текущем окне; возвращает, сколько ждать до следующей попытки"""
+        host = urlsplit(url).netloc.lower()
+        now = time.time()
+        window = int(now / self.window)
+        count = self.queue.incr_window(f'rate:{host}:{window}', ttl=self.window * 2)
+        if count <= self.burst:
+            return 0.0
+        return (window + 1) * self.window - now
+
+    def acquire(self, url: str) -> None:
+        while True:
+            delay = self._reserve(url)
+            if delay <= 0:
+                break
+            time.sleep(delay)
+        super().acquire(url)
+
+    async def acquire_async(self, url: str) -> None:
+        while True:
+            delay = await asyncio.to_thread(self._reserve, url)
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        await super().acquire_async(url)
+
+
+class Coordinator:
+    """Ставит начальные задачи и собирает результаты обхода"""
+
+    def __init__(self, queue: TaskQueue):
+        self.queue = queue
+
+    def seed(self, keywords: List[str], sources: List[str], regions: List[str],
+             max_pages: int = 3, max_results: int = 30) -> int:
+        """
+        Ставит первые страницы выдачи по всем сочетаниям источника, региона и слова
+
+        Returns:
+            Сколько задач поставлено (уже поставленные ранее не считаются)
+        """
+        added = 0
+        for source in sources:
+            for region in regions:
+                for keyword in keywords:
+                    payload = {'source': source, 'region': region, 'keyword': keyword, 'page': 1,
+                               'max_pages': max_pages, 'max_results': max_results}
+                    added += self.queue.put(TASK_SEARCH_PAGE, page_task_key(payload), payload,
+                                            PRIORITIES[TASK_SEARCH_PAGE])
+        return added
+
+    def wait(self, poll_interval: float = 2.0, processes: Optional[List] = None) -> None:
+        """Ждет, пока очередь не опустеет (или не завершатся все запущенные процессы)"""
+        while not self.queue.is_drained():
+            if processes is not None and not any(process.is_alive() for process in processes):
+                break
+            log(f"📬 Очередь: {self.queue.counts()}")
+            time.sleep(poll_interval)
+
+    def export(self, output_file: str = 'superjob_companies.csv') -> int:
+        """
+        Записывает прошедшие фильтр компании в CSV (и Parquet, если доступен)
+
+        Returns:
+            Сколько компаний записано
+        """
+        sinks = [CsvSink(output_file)]
+        if PARQUET_AVAILABLE:
+            sinks.append(ParquetSink(os.path.splitext(output_file)[0] + '.parquet'))
+        else:
+            log("⚠️ pyarrow не установлен - Parquet не записывается (pip install pyarrow)")
+        sink = MultiSink(sinks)
+        written = 0
+        for row in self.queue.results():
+            # Обход закончен: свидетельства всех появлений компании уже в очереди
+            row['cat_evidence'] = format_evidence(merged_evidence(self.queue, row.get('inn')))
+            sink.write(row)
+            written += 1
+        sink.close()
+        return written
+
+
+def merged_evidence(queue: TaskQueue, inn: str) -> List[Tuple[Source, str]]:
+    """
+    Свидетельства всех появлений компании с этим ИНН (под всеми названиями, на всех сайтах)
+
+    Returns:
+        Пары (сайт, ключевое слово) в постоянном порядке: по сайту,
+        затем по порядку CAT_KEYWORDS - не зависит от порядка выполнения задач
+    """
+    items: Set[str] = set()
+    for company_id in queue.evidence(f'inn:{inn}'):
+        items |= queue.evidence(f'company:{company_id}')
+    order = {keyword: index for index, keyword in enumerate(CAT_KEYWORDS)}
+    pairs = sorted((item.split('\t', 1) for item in items),
+                   key=lambda pair: (pair[0], order.get(pair[1], len(order)), pair[1]))
+    return [(Source(source), keyword) for source, keyword in pairs]
+
+
+def page_task_key(payload: Dict) -> str:
+    return f"{TASK_SEARCH_PAGE}:{payload['source']}:{payload['region']}:{payload['keyword']}:{payload['page']}"
+
+
+class Worker:
+    """
+    Рабочий процесс: берет задачи из очереди, пока они есть
+
+    Все результаты идемпотентны: задача, выполненная дважды (например,
+    после истечения аренды у зависшего процесса), ставит те же задачи
+    с теми же ключами и перезаписывает ту же строку результата.
+    """
+
+    def __init__(self, queue: TaskQueue, worker_id: Optional[str] = None, rate: float = 1.0,
+                 burst: int = 2, criteria: Optional[FilterCriteria] = None,
+                 matcher: Optional[KeywordMatcher] = None, cache: Optional[ResponseCache] = None,
+                 visibility_timeout: float = 120, poll_interval: float = 1.0):
+        """
+        Args:
+            queue: Общая очередь задач
+            worker_id: Имя процесса в очереди (по умолчанию - хост и PID)
+            rate: Общий для всех процессов лимит запросов в секунду к одному сайту
+            burst: Запросов подряд к одному сайту
+            criteria: Условия отбора компаний
+            matcher: Поиск ключевых слов в тексте вакансий
+            cache: Кэш HTTP-ответов этого процесса
+            visibility_timeout: На сколько секунд задача выдается в аренду
+            poll_interval: Пауза, когда свободных задач нет, но другие процессы еще работают
+        """
+        self.queue = queue
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.criteria = criteria or FilterCriteria()
+        self.matcher = matcher
+        self.cache = cache
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.scheduler = RequestScheduler(limiter=SharedRateLimiter(queue, rate=rate, burst=burst))
+        self.rusprofile = RusprofileParser(cache=cache, scheduler=self.scheduler)
+        self._sources: Dict[str, VacancySource] = {}
+        self.handlers = {
+            TASK_SEARCH_PAGE: self._search_page,
+            TASK_RESOLVE_INN: self._resolve_inn,
+            TASK_FETCH_COMPANY: self._fetch_company,
+        }
+        self.completed = 0
+
+    def _source(self, name: str) -> VacancySource:
+        if name not in self._sources:
+            self._sources[name] = create_source(name, concurrency=1, cache=self.cache, scheduler=self.scheduler)
+        return self._sources[name]
+
+    # --- Задачи ---
+
+    def _search_page(self, payload: Dict) -> None:
+        source = self._source(payload['source'])
+        keyword, page = payload['keyword'], payload['page']
+        url = source.build_url(keyword, page, source.regions[payload['region']])
+        response = self.scheduler.request(source.session(), 'GET', url, timeout=10)
+        response.raise_for_status()
+        vacancies = asyncio.run(source.parse_page(response.content, payload['max_results']))
+        METRICS.incr(f'discovery.pages.{source.name}')
+        # То же правило окончания выдачи, что и в VacancySource.iter_pages
+        if is_last_page(vacancies, payload.get('previous')):
+            return
+        digest = page_digest(vacancies)
+        for company_name, text in vacancies:
+            evidence = self.matcher.find(text) if self.matcher is not None else []
+            company_id = make_company_id(company_name)
+            # Свидетельства - до постановки задачи, чтобы поиск ИНН их уже видел
+            self.queue.add_evidence(f'company:{company_id}',
+                                    [f'{source.source.value}\t{word}' for word in evidence or [keyword]])
+            task = {'name': company_name, 'source': source.source.value}
+            self.queue.put(TASK_RESOLVE_INN, f'{TASK_RESOLVE_INN}:{company_id}', task,
+                           PRIORITIES[TASK_RESOLVE_INN])
+        if page < payload['max_pages']:
+            following = dict(payload, page=page + 1, previous=digest)
+            self.queue.put(TASK_SEARCH_PAGE, page_task_key(following), following, PRIORITIES[TASK_SEARCH_PAGE])
+
+    def _resolve_inn(self, payload: Dict) -> None:
+        inn_info, definitive = self.rusprofile.resolve_inn(payload['name'])
+        if not definitive:
+            # Ошибка сети (в том числе когда есть только похожее название
+            # из справочника): задача вернется в очередь и будет повторена
+            raise RuntimeError(f"поиск ИНН для '{payload['name']}' не удался")
+        if inn_info and 'inn' in inn_info:
+            # Под одним ИНН могут найтись несколько названий: их свидетельства объединяются
+            self.queue.add_evidence(f"inn:{inn_info['inn']}", [make_company_id(payload['name'])])
+            task = dict(payload, inn=inn_info['inn'])
+            self.queue.put(TASK_FETCH_COMPANY, f"{TASK_FETCH_COMPANY}:{inn_info['inn']}", task,
+                           PRIORITIES[TASK_FETCH_COMPANY])
+
+    def _fetch_company(self, payload: Dict) -> None:
+        company = CompanyRecord(name=payload['name'], inn=payload['inn'], source=Source(payload['source']))
+        company.financials, definitive = self.rusprofile.fetch_company_info(company.inn)
+        if company.financials is None and not definitive:
+            # Ошибка сети или разбора: задача вернется в очередь, а не запишется как отклоненная
+            raise RuntimeError(f"данные компании с ИНН {company.inn} не получены")
+        passed = self.criteria.matches(company.financials)
+        METRICS.incr('filter.passed' if passed else 'filter.rejected')
+        row = company.as_row()
+        # Уже известные свидетельства; при выгрузке они собираются заново
+        row['cat_evidence'] = format_evidence(merged_evidence(self.queue, company.inn))
+        self.queue.save_result(company.inn, row, passed)
+
+    # --- Цикл ---
+
+    def run_task(self, task: Task) -> bool:
+        """Выполняет одну задачу; False - задача вернулась в очередь"""
+        try:
+            with METRICS.timer(task.kind):
+                self.handlers[task.kind](task.payload)
+        except Exception as e:
+            METRICS.incr(f'{task.kind}.errors')
+            log(f"  Ошибка задачи {task.key} (попытка {task.attempts}): {e}")
+            self.queue.fail(task, str(e))
+            return False
+        if not self.queue.ack(task):
+            # Аренда истекла раньше: задачу уже взял другой процесс
+            METRICS.incr('distributed.lease_lost')
+        self.completed += 1
+        return True
+
+    def run(self, until_drained: bool = True) -> int:
+        """
+        Обрабатывает задачи
+
+        Args:
+            until_drained: Завершиться, когда очередь опустеет; False - ждать новые задачи
+
+        Returns:
+            Сколько задач выполнено
+        """
+        while True:
+            task = self.queue.lease(self.worker_id, self.visibility_timeout)
+            if task is not None:
+                self.run_task(task)
+                continue
+            # Свободных задач нет, но выданные другим процессам могут поставить новые
+            if until_drained and self.queue.is_drained():
+                return self.completed
+            time.sleep(self.poll_interval)
+
+
+def _worker_main(queue_url: str, rate: float, cache_path: Optional[str]) -> None:
+    # Точка входа процесса, запущенного командой run (метод запуска spawn)
+    if os.environ.get('CAT_QUIET'):
+        set_verbose(False)
+    queue = open_queue(queue_url)
+    cache = ResponseCache(cache_path) if cache_path else None
+    worker = Worker(queue, rate=rate, matcher=KeywordMatcher(CAT_KEYWORDS), cache=cache,
+                    criteria=criteria_from_env())
+    completed = worker.run()
+    log(f"✅ {worker.worker_id}: выполнено задач {completed}")
+    queue.close()
+
+
+def criteria_from_env() -> FilterCriteria:
+    """Условия отбора из тех же переменных окружения, что и в main.py"""
+    min_employees = os.environ.get('CAT_MIN_EMPLOYEES')
+    return FilterCriteria(
+        min_revenue=float(os.environ.get('CAT_MIN_REVENUE', 100_000_000)),
+        min_employees=int(min_employees) if min_employees else None,
+        okved_prefixes=[code for code in os.environ.get('CAT_OKVED', '').split(',') if code],
+    )
+
+
+def _split(value: str) -> List[str]:
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Распределенный обход с общей очередью задач')
+    parser.add_argument('command', choices=['seed', 'worker', 'run', 'status', 'export'],
+                        help='seed - поставить задачи, worker - рабочий процесс, '
+                             'run - все вместе на этой машине, status - состояние, export - выгрузить результат')
+    parser.add_argument('--queue', default=os.environ.get('CAT_QUEUE', 'crawl_queue.sqlite'),
+                        help='файл SQLite или redis://host:6379/0')
+    parser.add_argument('--sources', default=os.environ.get('CAT_SOURCES', 'superjob'))
+    parser.add_argument('--regions', default=os.environ.get('CAT_REGIONS', 'moscow'))
+    parser.add_argument('--max-pages', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4, help='рабочих процессов для команды run')
+    parser.add_argument('--rate', type=float, default=1.0, help='общий лимит запросов в секунду на сайт')
+    parser.add_argument('--cache', help='файл кэша HTTP-ответов рабочего процесса')
+    parser.add_argument('--fresh', action='store_true', help='очистить очередь перед постановкой задач')
+    parser.add_argument('-o', '--output', default='superjob_companies.csv')
+    args = parser.parse_args()
+
+    if os.environ.get('CAT_QUIET'):
+        set_verbose(False)
+    task_queue = open_queue(args.queue)
+    coordinator = Coordinator(task_queue)
+
+    if args.command in ('seed', 'run'):
+        if args.fresh:
+            task_queue.clear()
+        added = coordinator.seed(CAT_KEYWORDS, _split(args.sources), _split(args.regions), args.max_pages)
+        print(f"📬 Поставлено задач: {added}")
+
+    if args.command == 'worker':
+        worker = Worker(task_queue, rate=args.rate, matcher=KeywordMatcher(CAT_KEYWORDS),
+                        cache=ResponseCache(args.cache) if args.cache else None, criteria=criteria_from_env())
+        print(f"✅ {worker.worker_id}: выполнено задач {worker.run()}")
+
+    if args.command == 'run':
+        # Процессы запускаются методом spawn, как в ParsePool
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=_worker_main, args=(args.queue, args.rate, args.cache))
+            for _ in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        coordinator.wait(processes=processes)
+        for process in processes:
+            process.join()
+
+    if args.command in ('run', 'export'):
+        written = coordinator.export(args.output)
+        print(f"📁 Сохранено компаний: {written} в '{args.output}'")
+
+    print(f"📊 Задачи: {task_queue.counts()}")
+    task_queue.close()
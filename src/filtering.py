@@ -0,0 +1,207 @@
+"""
+Пакетная нормализация денежных значений и фильтрация компаний
+
+Денежные строки Rusprofile ('1 234 567 ₽', '12,34 млн ₽', '5 тыс ₽',
+'1,2 млрд ₽') разбираются строковыми операциями pandas над всей колонкой
+сразу, а фильтры по выручке, числу сотрудников и ОКВЭД применяются одной
+булевой маской. Те же условия для потоковой обработки по одной компании
+проверяет FilterCriteria.matches().
+
+Повторная фильтрация сохраненных данных с другими порогами:
+    python src/filtering.py checkpoint.sqlite --min-revenue 500000000 --okved 62,63 -o result.csv
+"""
+import argparse
+import dataclasses
+import os
+import time
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from checkpoint import CheckpointStore
+from parsers.records import Financials
+from sinks import MONEY_FIELDS
+
+# Множители единиц; проверяются по порядку, как в RusprofileParser._parse_money
+MONEY_UNITS = (
+    ('млрд', 1_000_000_000),
+    ('млн', 1_000_000),
+    ('тыс', 1_000),
+)
+
+
+def normalize_money(values: pd.Series) -> pd.Series:
+    """
+    Переводит колонку денежных строк в рубли
+
+    Числа (например, уже разобранная выручка из CheckpointStore)
+    возвращаются как есть, пустые и неразборчивые значения дают 0.
+
+    Args:
+        values: Колонка значений вида "1 234 567 ₽" или "12.34 млн ₽"
+
+    Returns:
+        Колонка float64 с тем же индексом
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64').fillna(0.0)
+
+    text = values.astype('string').fillna('')
+    # Убираем пробелы (в том числе неразрывные) и символ валюты; неразрывные
+    # пробелы - готовыми символами: regex pyarrow (RE2) не понимает \u в шаблоне
+    clean = text.str.replace('[\\s\u00a0\u202f₽]', '', regex=True).str.replace(',', '.', regex=False)
+    number = pd.to_numeric(clean.str.extract(r'([\d.]+)', expand=False), errors='coerce')
+
+    conditions = [clean.str.contains(unit, regex=False).to_numpy(dtype=bool) for unit, _ in MONEY_UNITS]
+    multiplier = np.select(conditions, [factor for _, factor in MONEY_UNITS], default=1)
+    return (number.astype('float64') * multiplier).fillna(0.0).astype('float64')
+
+
+def normalize_count(values: pd.Series) -> pd.Series:
+    """Колонка числа сотрудников ('120', '1 200 чел.', 120) -> float64, NaN - не указано"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+    digits = values.astype('string').str.replace(r'\D', '', regex=True)
+    return pd.to_numeric(digits.replace('', pd.NA), errors='coerce').astype('float64')
+
+
+class FilterCriteria:
+    """
+    Условия отбора компаний
+
+    Args:
+        min_revenue: Минимальная выручка в рублях (None - без ограничения)
+        max_revenue: Максимальная выручка в рублях
+        min_employees: Минимальное число сотрудников; компании без данных
+                       о сотрудниках при этом отсекаются
+        max_employees: Максимальное число сотрудников
+        okved_prefixes: Допустимые коды ОКВЭД (по началу кода: '62' подходит
+                        для '62.01'); None - любой
+    """
+
+    def __init__(self, min_revenue: Optional[float] = 100_000_000, max_revenue: Optional[float] = None,
+                 min_employees: Optional[int] = None, max_employees: Optional[int] = None,
+                 okved_prefixes: Optional[Iterable[str]] = None):
+        self.min_revenue = min_revenue
+        self.max_revenue = max_revenue
+        self.min_employees = min_employees
+        self.max_employees = max_employees
+        self.okved_prefixes = tuple(okved_prefixes) if okved_prefixes else None
+
+    def __repr__(self) -> str:
+        return (f"FilterCriteria(min_revenue={self.min_revenue}, max_revenue={self.max_revenue}, "
+                f"min_employees={self.min_employees}, max_employees={self.max_employees}, "
+                f"okved_prefixes={self.okved_prefixes})")
+
+    def matches(self, financials: Optional[Financials]) -> bool:
+        """Проверка одной компании (для потоковой обработки в EnrichmentPipeline)"""
+        revenue = financials.revenue if financials is not None else 0.0
+        if self.min_revenue is not None and revenue < self.min_revenue:
+            return False
+        if self.max_revenue is not None and revenue > self.max_revenue:
+            return False
+        if self.min_employees is not None or self.max_employees is not None:
+            employees = financials.employees if financials is not None else None
+            if employees is None:
+                return False
+            if self.min_employees is not None and employees < self.min_employees:
+                return False
+            if self.max_employees is not None and employees > self.max_employees:
+                return False
+        if self.okved_prefixes is not None:
+            okved = financials.okved_main if financials is not None else ''
+            if not (okved or '').startswith(self.okved_prefixes):
+                return False
+        return True
+
+    def mask(self, frame: pd.DataFrame) -> pd.Series:
+        """
+        Булева маска подходящих строк
+
+        Колонки revenue и employees должны быть уже нормализованы
+        (см. normalize_frame).
+        """
+        mask = pd.Series(True, index=frame.index)
+        revenue = frame['revenue'] if 'revenue' in frame else pd.Series(0.0, index=frame.index)
+        if self.min_revenue is not None:
+            mask &= revenue >= self.min_revenue
+        if self.max_revenue is not None:
+            mask &= revenue <= self.max_revenue
+        if self.min_employees is not None or self.max_employees is not None:
+            employees = frame['employees'] if 'employees' in frame else pd.Series(np.nan, index=frame.index)
+            if self.min_employees is not None:
+                mask &= employees >= self.min_employees
+            if self.max_employees is not None:
+                mask &= employees <= self.max_employees
+        if self.okved_prefixes is not None:
+            if 'okved_main' in frame:
+                okved = frame['okved_main'].astype('string').fillna('')
+                mask &= okved.str.startswith(self.okved_prefixes).astype(bool)
+            else:
+                mask &= False
+        return mask
+
+    def apply(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Нормализует денежные колонки и оставляет только подходящие компании"""
+        frame = normalize_frame(frame)
+        return frame[self.mask(frame)]
+
+
+def normalize_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Копия таблицы с денежными колонками в рублях и числом сотрудников как числом"""
+    frame = frame.copy()
+    for name in MONEY_FIELDS:
+        if name in frame:
+            frame[name] = normalize_money(frame[name])
+    if 'employees' in frame:
+        frame['employees'] = normalize_count(frame['employees'])
+    return frame
+
+
+def load_companies(path: str) -> pd.DataFrame:
+    """
+    Загружает сохраненные данные компаний
+
+    Args:
+        path: CSV или Parquet с результатами, либо база CheckpointStore
+              (в ней есть и компании, не прошедшие прошлый фильтр)
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.sqlite', '.db'):
+        store = CheckpointStore(path)
+        try:
+            fields = [field.name for field in dataclasses.fields(Financials)]
+            return pd.DataFrame(store.select_financials(fields), columns=fields)
+        finally:
+            store.close()
+    if extension == '.parquet':
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype={'inn': 'string', 'okved_main': 'string'})
+
+
+def _split(value: Optional[str]) -> Optional[List[str]]:
+    return [part.strip() for part in value.split(',') if part.strip()] if value else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Повторная фильтрация сохраненных компаний')
+    parser.add_argument('path', help='CSV, Parquet или checkpoint.sqlite')
+    parser.add_argument('--min-revenue', type=float, default=100_000_000)
+    parser.add_argument('--max-revenue', type=float)
+    parser.add_argument('--min-employees', type=int)
+    parser.add_argument('--max-employees', type=int)
+    parser.add_argument('--okved', help='коды ОКВЭД через запятую (по началу кода)')
+    parser.add_argument('-o', '--output', help='сохранить результат в CSV')
+    args = parser.parse_args()
+
+    criteria = FilterCriteria(args.min_revenue, args.max_revenue, args.min_employees,
+                              args.max_employees, _split(args.okved))
+    companies = load_companies(args.path)
+    started = time.perf_counter()
+    result = criteria.apply(companies)
+    elapsed = time.perf_counter() - started
+    print(f"{criteria}: {len(result)} из {len(companies)} компаний ({elapsed * 1000:.1f} мс)")
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"📁 Сохранено в '{args.output}'")
@@ -1,23 +1,29 @@
+import csv
 import sys
 import os
-import re
-import time
-import csv
-import requests
-from typing import List, Dict
-from bs4 import BeautifulSoup
 
 # Добавляем папку проекта в путь поиска
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Импортируем парсеры
 try:
-    from superjob_parser import SuperJobParser
-    from rusprofile_parser import RusprofileParser
+    from parsers.sources import Discovery, create_source
+    from parsers.rusprofile import RusprofileParser
+    from parsers.http_cache import ResponseCache
+    from parsers.scheduler import RequestScheduler
+    from parsers.company_index import CompanyIndex
+    from pipeline import EnrichmentPipeline
+    from filtering import FilterCriteria
+    from checkpoint import CheckpointStore
+    from sinks import PARQUET_AVAILABLE, CsvSink, MultiSink, ParquetSink
+    from parsers.metrics import METRICS, set_verbose
+    from parsers.parse_pool import ParsePool
+    from parsers.site_analyzer import SiteAnalyzer
+    from parsers.keyword_matcher import KeywordMatcher
     print("✅ Модули загружены")
 except ImportError as e:
     print(f"❌ Ошибка: {e}")
-    print("Убедитесь, что superjob_parser.py и rusprofile_parser.py в той же папке")
+    print("Убедитесь, что папка parsers с superjob_parser.py и rusprofile.py лежит рядом с main.py")
     sys.exit(1)
 
 def main():
@@ -28,81 +34,128 @@ def main():
         "локализация", "переводчик", "технический писатель", "Technical Writer"
     ]
 
-    # Инициализируем парсеры
-    superjob_parser = SuperJobParser()
-    rusprofile_parser = RusprofileParser()
+    # Метрики и профилирование настраиваются переменными окружения:
+    # CAT_QUIET=1 - без подробного вывода по каждой компании,
+    # CAT_PROFILE=parse,fetch - профилировать стадии (результат в profiles/),
+    # CAT_METRICS_PROM=metrics.prom - сохранить метрики в формате Prometheus
+    if os.environ.get('CAT_QUIET'):
+        set_verbose(False)
+    profile_stages = [s for s in os.environ.get('CAT_PROFILE', '').split(',') if s]
+    if profile_stages:
+        METRICS.enable_profiling(profile_stages, backend=os.environ.get('CAT_PROFILER', 'cprofile'))
+
+    # Общий кэш ответов: повторные запуски берут страницы с диска
+    cache = ResponseCache('http_cache.sqlite')
+    # Прогресс по компаниям: перезапуск продолжает с места остановки
+    checkpoint = CheckpointStore('checkpoint.sqlite')
     
-    print("Начинаем парсинг SuperJob.ru...")
-    found_companies = superjob_parser.search_companies_by_keywords(cat_keywords, max_results=30)
+    # Справочник уже найденных компаний: повторные запуски не ищут их на сайте.
+    # Пустой справочник заполняется из прошлых результатов
+    company_index = CompanyIndex('company_index.sqlite')
+    if not len(company_index):
+        seeded = company_index.add_many(checkpoint.select_resolved())
+        verified = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_verified.csv')
+        if os.path.exists(verified):
+            with open(verified, encoding='utf-8') as f:
+                seeded += company_index.add_many(csv.DictReader(f))
+        print(f"📇 Справочник компаний заполнен: {seeded} записей")
     
-    print(f"Найдено {len(found_companies)} компаний на SuperJob")
+    # Общий планировщик запросов: начинаем с одного запроса в секунду
+    # на сайт и подстраиваем частоту под ответы (429/503 - медленнее)
+    scheduler = RequestScheduler(rate=1.0, burst=2, max_rate=4.0)
     
-    # Дополнительная обработка: попробуем найти ИНН через названия компаний
-    filtered_companies = []
+    # Разбор HTML в отдельных процессах (CAT_PARSE_WORKERS=4), чтобы
+    # разбор страниц не отнимал GIL у потоков, ждущих сеть.
+    # Страницы потокового обхода и карточки передаются в пул по одной
+    parse_workers = int(os.environ.get('CAT_PARSE_WORKERS', '0'))
+    parse_pool = ParsePool(workers=parse_workers) if parse_workers else None
     
-    for company in found_companies:
-        # Попробуем найти компанию на rusprofile по названию
-        company_name = company.get('name', '')
-        print(f"Поиск ИНН для компании: {company_name}")
-        
-        try:
-            # Предполагаем, что RusprofileParser имеет метод search_inn_by_name
-            # Если такого метода нет, вам нужно будет его добавить
-            inn_info = rusprofile_parser.search_inn_by_name(company_name)
-            
-            if inn_info and 'inn' in inn_info:
-                company['inn'] = inn_info['inn']
-                
-                # Получаем финансовую информацию по ИНН
-                financials = rusprofile_parser.get_company_info(inn_info['inn'])
-                
-                # Проверяем выручку (если доступна)
-                revenue = financials.get('revenue', 0) if financials else 0
-                
-                # Фильтруем по выручке (100 млн рублей)
-                if revenue >= 100_000_000:
-                    company.update(financials or {})
-                    filtered_companies.append(company)
-                else:
-                    print(f"  Пропускаем: выручка {revenue} < 100 млн")
-            else:
-                print(f"  ИНН не найден для {company_name}")
-                
-        except Exception as e:
-            print(f"  Ошибка при обработке {company_name}: {e}")
-            continue
+    # Источники вакансий и регионы (CAT_SOURCES=superjob,hh, CAT_REGIONS=moscow,spb).
+    # По умолчанию - только SuperJob; hh.ru подключается явно
+    # Все сайты, регионы и ключевые слова обходятся параллельно;
+    # в cat_evidence попадают слова, найденные в тексте вакансии
+    source_names = [name for name in os.environ.get('CAT_SOURCES', 'superjob').split(',') if name]
+    regions = [region for region in os.environ.get('CAT_REGIONS', 'moscow').split(',') if region]
+    sources = [
+        create_source(name, concurrency=4, cache=cache, scheduler=scheduler, parse_pool=parse_pool)
+        for name in source_names
+    ]
+    discovery = Discovery(sources, regions=regions, matcher=KeywordMatcher(cat_keywords))
+    # Пул соединений Rusprofile - по числу потоков конвейера, работающих с сайтом
+    rusprofile_parser = RusprofileParser(cache=cache, scheduler=scheduler, pool_size=4, parse_pool=parse_pool,
+                                         index=company_index)
     
-    print(f"После фильтрации по выручке: {len(filtered_companies)} компаний")
+    print(f"Начинаем поиск вакансий: {', '.join(source_names)} ({', '.join(regions)})...")
+    # Компании отдаются по мере разбора страниц выдачи, поэтому
+    # поиск на Rusprofile начинается, не дожидаясь конца обхода сайтов
+    found_companies = discovery.iter_companies(cat_keywords, max_pages=3, max_results=30)
     
-    # Сохраняем в CSV
-    if filtered_companies:
-        output_file = 'superjob_companies.csv'
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            # Определяем все возможные поля
-            all_keys = set()
-            for company in filtered_companies:
-                all_keys.update(company.keys())
-            
-            fieldnames = ['inn', 'name', 'revenue', 'site', 'source', 'cat_evidence', 
-                         'cat_product', 'employees', 'okved_main']
-            # Добавляем остальные поля
-            for key in sorted(all_keys):
-                if key not in fieldnames:
-                    fieldnames.append(key)
-            
-            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
-            writer.writeheader()
-            writer.writerows(filtered_companies)
-
-        print(f"✅ Найдено {len(filtered_companies)} уникальных компаний.")
+    # Условия отбора: выручка от 100 млн рублей (CAT_MIN_REVENUE),
+    # при необходимости - число сотрудников (CAT_MIN_EMPLOYEES) и ОКВЭД (CAT_OKVED=62,63).
+    # Сохраненные данные можно отфильтровать заново: python src/filtering.py checkpoint.sqlite
+    min_employees = os.environ.get('CAT_MIN_EMPLOYEES')
+    criteria = FilterCriteria(
+        min_revenue=float(os.environ.get('CAT_MIN_REVENUE', 100_000_000)),
+        min_employees=int(min_employees) if min_employees else None,
+        okved_prefixes=[code for code in os.environ.get('CAT_OKVED', '').split(',') if code],
+    )
+    
+    # Анализ сайтов прошедших фильтр компаний на упоминания CAT-систем (CAT_ANALYZE_SITES=1).
+    # Страницы и результаты кэшируются: повторно анализируются только изменившиеся сайты
+    analyzer = None
+    if os.environ.get('CAT_ANALYZE_SITES'):
+        analyzer = SiteAnalyzer('site_cache.sqlite', max_depth=int(os.environ.get('CAT_SITE_DEPTH', '1')),
+                                max_pages=int(os.environ.get('CAT_SITE_PAGES', '5')))
+    
+    # Обогащение данными Rusprofile: поиск ИНН, получение финансов,
+    # фильтр и запись идут параллельно.
+    # Строки пишутся сразу после фильтра; Parquet - для дальнейшего анализа в pandas
+    output_file = 'superjob_companies.csv'
+    sinks = [CsvSink(output_file)]
+    if PARQUET_AVAILABLE:
+        sinks.append(ParquetSink('superjob_companies.parquet'))
+    else:
+        print("⚠️ pyarrow не установлен - Parquet не записывается (pip install pyarrow)")
+    pipeline = EnrichmentPipeline(
+        rusprofile_parser,
+        sink=MultiSink(sinks),
+        keep_results=False,
+        criteria=criteria,
+        resolve_workers=2,
+        financials_workers=2,
+        checkpoint=checkpoint,
+        analyzer=analyzer,
+        # Появления компании на других сайтах и по другим словам,
+        # найденные уже после передачи ее в конвейер
+        evidence=discovery.evidence,
+    )
+    pipeline.run(found_companies)
+    if analyzer is not None:
+        analyzer.close()
+    if parse_pool is not None:
+        parse_pool.close()
+    
+    print(f"Обработано {pipeline.processed} компаний с сайтов вакансий")
+    print(f"После фильтрации: {pipeline.written} компаний")
+    
+    if pipeline.written:
+        print(f"✅ Найдено {pipeline.written} уникальных компаний.")
         print(f"📁 Данные сохранены в файл: '{output_file}'")
         print("\nПервые 5 записей:")
-        for i, company in enumerate(filtered_companies[:5]):
-            revenue = company.get('revenue', 'не указана')
-            inn = company.get('inn', 'не найден')
-            print(f"   {i+1}. {company['name']} (ИНН: {inn}, Выручка: {revenue})")
+        for i, company in enumerate(pipeline.preview):
+            row = company.as_row()
+            print(f"   {i+1}. {row['name']} (ИНН: {row['inn'] or 'не найден'}, Выручка: {row.get('revenue', 'не указана')})")
     else:
         print("❌ Компании не найдены после фильтрации.")
+    
+    # Сводка по стадиям: время, попадания в кэши, повторы запросов
+    METRICS.write_json('run_report.json')
+    print("📊 Отчет о запуске: run_report.json")
+    if os.environ.get('CAT_METRICS_PROM'):
+        METRICS.write_prometheus(os.environ['CAT_METRICS_PROM'])
+    if profile_stages:
+        METRICS.dump_profiles('profiles')
+        print("🔬 Профили стадий сохранены в папку profiles/")
 
 if __name__ == "__main__":
     main()
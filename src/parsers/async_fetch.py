@@ -0,0 +1,121 @@
+import asyncio
+import queue
+import threading
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+import requests
+
+from .metrics import log
+from .scheduler import RequestScheduler
+
+
+class AsyncFetcher:
+    """
+    Асинхронный загрузчик страниц
+
+    Запросы выполняются параллельно (не более concurrency одновременно),
+    а частота обращений к каждому хосту и повторы при ошибках определяются
+    планировщиком RequestScheduler вместо фиксированной паузы после
+    каждого запроса.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, concurrency: int = 4,
+                 rate: float = 1.0, burst: int = 1, timeout: float = 10,
+                 scheduler: Optional[RequestScheduler] = None):
+        self.session = session or requests.Session()
+        self.concurrency = max(1, int(concurrency))
+        self.scheduler = scheduler or RequestScheduler(rate=rate, burst=burst)
+        self.timeout = timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Семафор создается внутри работающего цикла событий
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def fetch(self, url: str, method: str = 'GET', **kwargs) -> requests.Response:
+        """
+        Загружает одну страницу с учетом лимитов
+
+        Args:
+            url: Адрес страницы
+            method: HTTP-метод
+            **kwargs: Дополнительные параметры для requests
+
+        Returns:
+            Ответ сервера
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        # Кэш проверяет планировщик: свежий ответ не расходует лимит запросов к сайту
+        async with self._get_semaphore():
+            return await self.scheduler.request_async(self.session, method, url, **kwargs)
+
+    async def fetch_all(self, urls: List[str], **kwargs) -> List[Tuple[str, Optional[requests.Response], Optional[Exception]]]:
+        """
+        Загружает список страниц параллельно
+
+        Args:
+            urls: Список адресов
+            **kwargs: Дополнительные параметры для requests
+
+        Returns:
+            Список кортежей (url, ответ, ошибка) в порядке исходного списка
+        """
+        async def _one(url):
+            try:
+                response = await self.fetch(url, **kwargs)
+                response.raise_for_status()
+                return url, response, None
+            except requests.exceptions.RequestException as e:
+                return url, None, e
+
+        return list(await asyncio.gather(*(_one(url) for url in urls)))
+
+
+def iter_async(make_iterator: Callable[[], AsyncIterator], buffer: int = 8) -> Iterator:
+    """
+    Синхронный обход асинхронного генератора для обычного (не async) кода
+
+    Генератор работает в отдельном потоке со своим циклом событий,
+    элементы передаются через ограниченную очередь по мере появления.
+    Если обход прерван, генератор останавливается.
+
+    Args:
+        make_iterator: Функция без аргументов, создающая асинхронный генератор
+        buffer: Размер очереди между потоками
+    """
+    results = queue.Queue(maxsize=max(1, buffer))
+    stop = threading.Event()
+    done = object()
+
+    async def produce():
+        async for item in make_iterator():
+            if stop.is_set():
+                break
+            await asyncio.to_thread(results.put, item)
+
+    def run():
+        try:
+            asyncio.run(produce())
+        except Exception as e:
+            log(f"   Ошибка потокового поиска: {e}")
+        finally:
+            results.put(done)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        # Освобождаем место в очереди, чтобы поток поиска мог завершиться
+        while thread.is_alive():
+            try:
+                results.get(timeout=0.1)
+            except queue.Empty:
+                pass
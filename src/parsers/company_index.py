@@ -0,0 +1,221 @@
+"""
+Локальный справочник компаний с нечетким поиском по названию
+
+Известные компании (ИНН, ОГРН, ссылка на Rusprofile и все встречавшиеся
+варианты названия) хранятся в SQLite, а в памяти для них строится
+инвертированный индекс по триграммам символов. Название ищется сначала
+точно (по ключу make_company_id), затем по сходству триграмм. Только
+точное совпадение считается достоверным: похожее название может
+принадлежать другой компании ('Яндекс.Маркет Лаб' и 'Яндекс.Маркет'),
+поэтому такие совпадения проверяются поиском на сайте.
+"""
+import heapq
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .normalize import make_company_id
+
+_NUMBER_RE = re.compile(r'\d+')
+_INN_RE = re.compile(r'^\d{10,12}$')
+
+
+def trigrams(key: str) -> Set[str]:
+    """Триграммы нормализованного ключа (с краевыми пробелами, как в pg_trgm)"""
+    text = f"  {key.replace('_', ' ')} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class CompanyIndex:
+    """
+    Справочник "название -> ИНН" с поиском по сходству триграмм
+
+    Сходство - коэффициент Дайса: 2 * |общие| / (|A| + |B|).
+    Совпадение считается уверенным, если сходство не ниже threshold
+    и лучший кандидат заметно опережает компанию с другим ИНН. Числа
+    в названиях должны совпадать точно: 'Компания 12' и 'Компания 123' -
+    разные компании, хотя триграммы у них почти одинаковые.
+    """
+
+    def __init__(self, path: str = 'company_index.sqlite', threshold: float = 0.9,
+                 margin: float = 0.05):
+        """
+        Args:
+            path: Путь к файлу базы (':memory:' - справочник в памяти)
+            threshold: Минимальное сходство для уверенного совпадения (0..1)
+            margin: На сколько лучший кандидат должен опережать
+                    кандидата с другим ИНН
+        """
+        self.threshold = threshold
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS companies (
+                inn TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                ogrn TEXT,
+                rusprofile_url TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                alias TEXT NOT NULL,
+                inn TEXT NOT NULL,
+                PRIMARY KEY (alias, inn)
+            );
+        """)
+        self._conn.commit()
+        # Индекс в памяти: варианты названий и списки вхождений триграмм
+        self._alias_ids: Dict[Tuple[str, str], int] = {}
+        self._aliases: List[Tuple[str, str, int]] = []  # (ключ, ИНН, число триграмм)
+        self._exact: Dict[str, Set[str]] = defaultdict(set)
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+    def _load(self) -> None:
+        for alias, inn in self._conn.execute("SELECT alias, inn FROM aliases"):
+            self._index_alias(alias, inn)
+
+    def _index_alias(self, alias: str, inn: str) -> bool:
+        if (alias, inn) in self._alias_ids:
+            return False
+        grams = trigrams(alias)
+        alias_id = len(self._aliases)
+        self._alias_ids[(alias, inn)] = alias_id
+        self._aliases.append((alias, inn, len(grams)))
+        self._exact[alias].add(inn)
+        for gram in grams:
+            self._postings[gram].append(alias_id)
+        return True
+
+    # --- Пополнение ---
+
+    def add(self, name: str, inn: str, ogrn: Optional[str] = None, rusprofile_url: Optional[str] = None,
+            aliases: Iterable[str] = ()) -> None:
+        """
+        Добавляет компанию или дополняет уже известную
+
+        Args:
+            name: Название компании
+            inn: ИНН
+            ogrn: ОГРН (если известен)
+            rusprofile_url: Ссылка на страницу компании
+            aliases: Другие варианты названия (запрос, полное название и т.п.)
+        """
+        if not inn or not name:
+            return
+        keys = {make_company_id(value) for value in (name, *aliases) if value}
+        keys.discard('')
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO companies (inn, name, ogrn, rusprofile_url, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(inn) DO UPDATE SET "
+                "ogrn = COALESCE(excluded.ogrn, ogrn), "
+                "rusprofile_url = COALESCE(excluded.rusprofile_url, rusprofile_url), "
+                "updated_at = excluded.updated_at",
+                (inn, name, ogrn or None, rusprofile_url, time.time())
+            )
+            for key in keys:
+                if self._index_alias(key, inn):
+                    self._conn.execute("INSERT OR IGNORE INTO aliases (alias, inn) VALUES (?, ?)", (key, inn))
+            self._conn.commit()
+
+    def add_many(self, rows: Iterable[Dict]) -> int:
+        """
+        Пакетное пополнение из сохраненных результатов
+
+        Args:
+            rows: Словари с ключами name, inn и необязательными
+                  ogrn, rusprofile_url, full_name, source_query
+
+        Returns:
+            Сколько строк с ИНН обработано
+        """
+        count = 0
+        for row in rows:
+            inn = str(row.get('inn') or '').strip()
+            # ИНН юрлица - 10 цифр, ИП - 12; более короткие (например,
+            # с потерянным ведущим нулем после Excel) не добавляются
+            if not _INN_RE.match(inn):
+                continue
+            aliases = [row.get(field) for field in ('full_name', 'source_query') if row.get(field)]
+            self.add(row.get('name') or '', inn, row.get('ogrn'), row.get('rusprofile_url'), aliases)
+            count += 1
+        return count
+
+    # --- Поиск ---
+
+    def _company(self, inn: str) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+        return self._conn.execute(
+            "SELECT name, ogrn, rusprofile_url FROM companies WHERE inn = ?", (inn,)
+        ).fetchone()
+
+    def candidates(self, name: str, limit: int = 5) -> List[Tuple[str, str, float]]:
+        """
+        Ближайшие известные названия
+
+        Returns:
+            Список (ключ названия, ИНН, сходство) по убыванию сходства
+        """
+        key = make_company_id(name)
+        grams = trigrams(key)
+        with self._lock:
+            shared: Dict[int, int] = defaultdict(int)
+            for gram in grams:
+                for alias_id in self._postings.get(gram, ()):
+                    shared[alias_id] += 1
+            scored = []
+            for alias_id, common in shared.items():
+                alias, inn, size = self._aliases[alias_id]
+                scored.append((alias, inn, 2 * common / (len(grams) + size)))
+        return heapq.nlargest(limit, scored, key=lambda item: item[2])
+
+    def lookup(self, name: str) -> Tuple[Optional[Dict], float, bool]:
+        """
+        Ищет компанию по названию
+
+        Returns:
+            Кортеж (результат в формате RusprofileParser.search_inn_by_name, сходство,
+            точное совпадение); результат None, если уверенного совпадения нет.
+            Совпадение по сходству (точное=False) - только кандидат: его стоит
+            проверить поиском на сайте и не сохранять как найденный ИНН
+        """
+        key = make_company_id(name)
+        with self._lock:
+            exact = self._exact.get(key)
+            inn = next(iter(exact)) if exact and len(exact) == 1 else None
+        score = 1.0
+        exact = inn is not None
+        if not exact:
+            numbers = _NUMBER_RE.findall(key)
+            candidates = [item for item in self.candidates(name, limit=20)
+                          if _NUMBER_RE.findall(item[0]) == numbers]
+            if not candidates:
+                return None, 0.0, False
+            _, inn, score = candidates[0]
+            rival = next((item[2] for item in candidates[1:] if item[1] != inn), 0.0)
+            if score < self.threshold or score - rival < self.margin:
+                return None, score, False
+        with self._lock:
+            company = self._company(inn)
+        if company is None:
+            return None, 0.0, False
+        found_name, ogrn, rusprofile_url = company
+        return {
+            'name': found_name,
+            'inn': inn,
+            'ogrn': ogrn,
+            'rusprofile_url': rusprofile_url,
+            'source_query': name,
+        }, score, exact
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
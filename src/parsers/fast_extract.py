@@ -0,0 +1,132 @@
+"""
+Быстрое извлечение данных из страниц результатов поиска через lxml
+
+XPath-выражения компилируются один раз при импорте модуля, а из дерева
+берутся только карточки результатов. Если lxml не установлен или
+страница не разбирается, функции бросают FastExtractError, и парсеры
+используют обычный путь через BeautifulSoup.
+"""
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+
+class FastExtractError(Exception):
+    """Быстрый разбор недоступен или не удался"""
+
+
+def _has_class(name: str) -> str:
+    # Точное совпадение одного из классов элемента (как class_='...' в BeautifulSoup)
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+if LXML_AVAILABLE:
+    # SuperJob: карточки вакансий и название компании внутри карточки
+    _SJ_ITEMS = etree.XPath(f"//div[{_has_class('f-test-search-result-item')}]")
+    _SJ_ITEMS_LOOSE = etree.XPath("//div[contains(@class, 'search-result-item')]")
+    _SJ_COMPANY = etree.XPath(f".//span[{_has_class('f-test-text-vacancy-item-company-name')}]")
+
+    # Rusprofile: первая карточка компании и ее поля
+    _RP_CARD = etree.XPath(f"(//div[{_has_class('company-item')}])[1]")
+    _RP_CARD_LOOSE = etree.XPath("(//div[contains(@class, 'company-item')])[1]")
+    _RP_NAME = etree.XPath(f".//a[{_has_class('company-name')}]")
+    _RP_INN = etree.XPath(f".//span[{_has_class('copy-target')}]")
+    _RP_ROWS = etree.XPath(f".//div[{_has_class('company-row')}]")
+
+_INN_RE = re.compile(r'ИНН\s*(\d{10,12})')
+
+
+def _text(element) -> str:
+    # Повторяет get_text(strip=True) из BeautifulSoup
+    return ''.join(part.strip() for part in element.itertext())
+
+
+def _parse(html: str):
+    if not LXML_AVAILABLE:
+        raise FastExtractError("lxml не установлен")
+    try:
+        return lxml_html.document_fromstring(html)
+    except (etree.ParserError, ValueError) as e:
+        raise FastExtractError(str(e)) from e
+
+
+def _superjob_items(html: str, max_results: int) -> Iterator[Tuple[object, str]]:
+    # Карточки вакансий с названием компании (скрытые компании пропускаются)
+    tree = _parse(html)
+    items = _SJ_ITEMS(tree) or _SJ_ITEMS_LOOSE(tree)
+    for item in items[:max_results]:
+        company_block = _SJ_COMPANY(item)
+        if not company_block:
+            continue
+        company_name = _text(company_block[0])
+        if not company_name or company_name.lower() == 'скрыто':
+            continue
+        yield item, company_name
+
+
+def extract_superjob_company_names(html: str, max_results: int) -> List[str]:
+    """
+    Названия компаний из страницы вакансий SuperJob
+
+    Args:
+        html: HTML страницы результатов поиска
+        max_results: Сколько вакансий просматривать
+
+    Returns:
+        Список названий компаний в порядке вакансий
+    """
+    return [company_name for _, company_name in _superjob_items(html, max_results)]
+
+
+def extract_superjob_vacancies(html: str, max_results: int) -> List[Tuple[str, str]]:
+    """
+    Вакансии со страницы SuperJob: название компании и текст карточки
+    (должность и описание) для поиска ключевых слов
+
+    Returns:
+        Список пар (название компании, текст вакансии) в порядке вакансий
+    """
+    return [(company_name, ' '.join(' '.join(item.itertext()).split()))
+            for item, company_name in _superjob_items(html, max_results)]
+
+
+def extract_rusprofile_card(html: str) -> Optional[Dict]:
+    """
+    Первая карточка компании из результатов поиска Rusprofile
+
+    Args:
+        html: HTML страницы поиска
+
+    Returns:
+        Словарь с ключами name, inn, href (значения могут быть None)
+        или None, если карточек на странице нет
+    """
+    tree = _parse(html)
+    cards = _RP_CARD(tree) or _RP_CARD_LOOSE(tree)
+    if not cards:
+        return None
+    card = cards[0]
+
+    name_elements = _RP_NAME(card)
+    name = _text(name_elements[0]) if name_elements else None
+    href = name_elements[0].get('href') if name_elements else None
+
+    inn_elements = _RP_INN(card)
+    if inn_elements:
+        inn = _text(inn_elements[0])
+    else:
+        inn = None
+        for row in _RP_ROWS(card):
+            text = _text(row)
+            if 'ИНН' in text:
+                inn_match = _INN_RE.search(text)
+                inn = inn_match.group(1) if inn_match else None
+                break
+
+    return {'name': name, 'inn': inn, 'href': href}
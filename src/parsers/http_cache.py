@@ -0,0 +1,335 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .metrics import METRICS
+
+# Время жизни ответов по умолчанию (секунды) - по подстроке адреса.
+# Финансы компаний меняются раз в год, поиск по названию - редко,
+# а выдача вакансий обновляется каждый день.
+DEFAULT_TTLS = {
+    'rusprofile.ru/ajax/query': 30 * 24 * 3600,
+    'rusprofile.ru/search': 7 * 24 * 3600,
+    'superjob.ru/vakansii': 12 * 3600,
+    'api.hh.ru/vacancies': 12 * 3600,
+}
+
+# Заголовки, которые не имеют смысла для уже распакованного тела ответа
+_SKIP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+# Время последнего использования записи обновляется не чаще, чем раз в столько секунд:
+# для вытеснения давно не использованных записей точнее не нужно, а каждое
+# попадание в кэш не превращается в запись на диск
+ACCESS_RESOLUTION = 300
+
+
+class ResponseCache:
+    """
+    Кэш HTTP-ответов в SQLite
+
+    Хранит ответы с учетом времени жизни для каждого адреса, вытесняет
+    давно не использованные записи при превышении размера и сохраняет
+    ETag/Last-Modified для условной перепроверки устаревших ответов.
+    Суммарный размер тел ответов ведут триггеры в таблице cache_meta,
+    поэтому запись в кэш не пересчитывает размер всей таблицы.
+    Рядом хранятся результаты обработки страниц по хэшу их содержимого
+    (get_result/put_result), чтобы не открывать второе соединение к файлу.
+    """
+
+    def __init__(self, path: str = 'http_cache.sqlite', ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = 0, max_bytes: int = 200 * 1024 * 1024):
+        """
+        Args:
+            path: Путь к файлу базы (':memory:' - кэш в памяти)
+            ttls: Время жизни по подстроке адреса, по умолчанию DEFAULT_TTLS
+            default_ttl: Время жизни для остальных адресов (0 - не кэшировать)
+            max_bytes: Максимальный суммарный размер тел ответов
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._results_ready = False
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                content BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO cache_meta (name, value)
+                SELECT 'total_bytes', COALESCE(SUM(LENGTH(content)), 0) FROM responses;
+            CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN
+                UPDATE cache_meta SET value = value + LENGTH(NEW.content) WHERE name = 'total_bytes';
+            END;
+            CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF content ON responses BEGIN
+                UPDATE cache_meta SET value = value + LENGTH(NEW.content) - LENGTH(OLD.content)
+                WHERE name = 'total_bytes';
+            END;
+            CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN
+                UPDATE cache_meta SET value = value - LENGTH(OLD.content) WHERE name = 'total_bytes';
+            END;
+        """)
+        self._conn.commit()
+
+    def ttl_for(self, url: str) -> float:
+        """Время жизни ответа для адреса (0 - адрес не кэшируется)"""
+        for pattern, ttl in self.ttls.items():
+            if pattern in url:
+                return ttl
+        return self.default_ttl
+
+    @staticmethod
+    def make_key(method: str, url: str, body=None) -> str:
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        digest = hashlib.sha256()
+        digest.update(method.upper().encode('ascii'))
+        digest.update(b' ')
+        digest.update(url.encode('utf-8'))
+        if body:
+            digest.update(b'\n')
+            digest.update(body)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Возвращает сохраненный ответ и отмечает его использование
+
+        Returns:
+            Словарь с полями ответа и признаком fresh или None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, content, etag, last_modified, expires, last_access "
+                "FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[7] >= ACCESS_RESOLUTION:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        url, status, headers, content, etag, last_modified, expires, _ = row
+        return {
+            'url': url,
+            'status': status,
+            'headers': json.loads(headers),
+            'content': content,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': expires > now,
+        }
+
+    def put(self, key: str, response: requests.Response, ttl: float) -> None:
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _SKIP_HEADERS}
+        now = time.time()
+        with self._lock:
+            # UPSERT, а не INSERT OR REPLACE: замена записи вызывает триггер
+            # обновления, и размер в cache_meta остается верным
+            self._conn.execute(
+                "INSERT INTO responses "
+                "(key, url, status, headers, content, etag, last_modified, expires, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET url = excluded.url, status = excluded.status, "
+                "headers = excluded.headers, content = excluded.content, etag = excluded.etag, "
+                "last_modified = excluded.last_modified, expires = excluded.expires, "
+                "last_access = excluded.last_access",
+                (key, response.url, response.status_code, json.dumps(headers), response.content,
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'), now + ttl, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, key: str, ttl: float) -> None:
+        """Продлевает срок жизни записи после ответа 304 Not Modified"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET expires = ?, last_access = ? WHERE key = ?", (now + ttl, now, key)
+            )
+            self._conn.commit()
+
+    def total_bytes(self) -> int:
+        """Суммарный размер тел ответов в кэше"""
+        with self._lock:
+            return self._total_bytes()
+
+    def _total_bytes(self) -> int:
+        return self._conn.execute("SELECT value FROM cache_meta WHERE name = 'total_bytes'").fetchone()[0]
+
+    def _evict(self) -> None:
+        # Удаляем самые давно использованные записи, пока кэш не уложится в лимит
+        total = self._total_bytes()
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, LENGTH(content) FROM responses ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    # --- Результаты обработки страниц ---
+
+    def _ensure_results_table(self) -> None:
+        if self._results_ready:
+            return
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                value TEXT NOT NULL,
+                saved_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._results_ready = True
+
+    def get_result(self, namespace: str, key: str, content_hash: str) -> Optional[Dict]:
+        """
+        Сохраненный результат обработки, если содержимое не изменилось
+
+        Args:
+            namespace: Вид результата (например, 'site_analysis')
+            key: Ключ внутри вида (например, домен сайта)
+            content_hash: Хэш содержимого, по которому получен результат
+
+        Returns:
+            Сохраненный словарь или None, если результата нет или хэш другой
+        """
+        with self._lock:
+            self._ensure_results_table()
+            row = self._conn.execute(
+                "SELECT value FROM results WHERE namespace = ? AND key = ? AND content_hash = ?",
+                (namespace, key, content_hash)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_result(self, namespace: str, key: str, content_hash: str, value: Dict) -> None:
+        """Сохраняет результат обработки содержимого с хэшем content_hash (заменяет прежний)"""
+        with self._lock:
+            self._ensure_results_table()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (namespace, key, content_hash, value, saved_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, content_hash, json.dumps(value, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Запрос не проверялся через cached_response
+_NOT_LOOKED_UP = object()
+
+
+class CachedSession(requests.Session):
+    """
+    requests.Session, который отдает ответы из ResponseCache
+
+    Свежие ответы возвращаются без обращения к сети, устаревшие
+    перепроверяются условным запросом (If-None-Match / If-Modified-Since),
+    если сервер прислал ETag или Last-Modified. У ответов есть
+    атрибут from_cache.
+    """
+
+    def __init__(self, cache: ResponseCache):
+        super().__init__()
+        self.cache = cache
+        # Записи, уже прочитанные cached_response для запроса, который уйдет в сеть:
+        # send берет их отсюда, и промах кэша стоит одного обращения к базе
+        self._lookups: Dict[str, Optional[Dict]] = {}
+        self._lookups_lock = threading.Lock()
+
+    def _build_response(self, request: requests.PreparedRequest, entry: Dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['content']
+        response.url = entry['url']
+        response.request = request
+        response.reason = 'OK'
+        response.from_cache = True
+        return response
+
+    def cached_response(self, method: str, url: str, **kwargs) -> Optional[requests.Response]:
+        """
+        Возвращает свежий ответ из кэша, не обращаясь к сети
+
+        Returns:
+            Ответ из кэша или None, если свежей записи нет
+        """
+        request = self.prepare_request(requests.Request(method=method.upper(), url=url,
+                                                        params=kwargs.get('params'),
+                                                        data=kwargs.get('data'), json=kwargs.get('json')))
+        if not self.cache.ttl_for(request.url) or request.method not in ('GET', 'POST'):
+            return None
+        key = self.cache.make_key(request.method, request.url, request.body)
+        entry = self.cache.get(key)
+        if entry is None or not entry['fresh']:
+            with self._lookups_lock:
+                self._lookups[key] = entry
+            return None
+        METRICS.incr('cache.hit')
+        return self._build_response(request, entry)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        ttl = self.cache.ttl_for(request.url)
+        if not ttl or request.method not in ('GET', 'POST'):
+            return super().send(request, **kwargs)
+
+        key = self.cache.make_key(request.method, request.url, request.body)
+        with self._lookups_lock:
+            entry = self._lookups.pop(key, _NOT_LOOKED_UP)
+        if entry is _NOT_LOOKED_UP:
+            entry = self.cache.get(key)
+        if entry is not None:
+            if entry['fresh']:
+                METRICS.incr('cache.hit')
+                return self._build_response(request, entry)
+            METRICS.incr('cache.stale')
+            # Устаревшая запись: спрашиваем сервер, изменился ли ответ
+            if entry['etag']:
+                request.headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, **kwargs)
+        response.from_cache = False
+        if response.status_code == 304 and entry is not None:
+            METRICS.incr('cache.revalidated')
+            METRICS.incr('cache.hit')
+            self.cache.refresh(key, ttl)
+            cached = self._build_response(request, entry)
+            cached.from_cache = True
+            return cached
+        METRICS.incr('cache.miss')
+        if response.status_code == 200:
+            self.cache.put(key, response, ttl)
+        return response
@@ -0,0 +1,147 @@
+"""
+Поиск всех ключевых слов в тексте за один проход
+
+Текст разбивается на слова, каждое слово приводится к нижнему регистру
+и к основе (для русских слов отбрасывается окончание: 'переводчика',
+'переводчиком' -> 'переводчик'), после чего последовательность основ
+проходит через автомат Ахо-Корасик, построенный по всем ключевым словам.
+Время поиска линейно по длине текста и почти не зависит от числа
+ключевых слов, поэтому список можно расширять до сотен названий.
+"""
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Tuple, Union
+
+_WORD_RE = re.compile(r'\w+')
+_CYRILLIC_RE = re.compile(r'[а-я]')
+
+# Окончания русских слов, от длинных к коротким. Это не полный стеммер:
+# достаточно, чтобы формы одного слова в вакансиях давали одну основу
+_RU_ENDINGS = tuple(sorted((
+    'иями', 'ями', 'ами', 'ией', 'ием', 'иях', 'иям',
+    'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ах', 'ях', 'ам', 'ям', 'ом', 'ем', 'им', 'ым', 'ой', 'ей', 'ий', 'ый', 'ою', 'ею',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ых', 'их', 'ую', 'юю', 'ью',
+    'ия', 'ию', 'ии', 'ов', 'ев',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True))
+# Короче основа не становится: 'мой' не превращается в 'м'
+_MIN_STEM = 3
+
+
+# Словарь вакансий и сайтов невелик: основа каждого слова вычисляется один раз
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Основа слова: нижний регистр, ё -> е, без окончания (английские - в единственном числе)"""
+    word = word.lower().replace('ё', 'е')
+    if _CYRILLIC_RE.search(word):
+        for ending in _RU_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+                return word[:-len(ending)]
+        return word
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Основы всех слов текста по порядку"""
+    return [stem(word) for word in _WORD_RE.findall(text)]
+
+
+class KeywordMatcher:
+    """
+    Автомат Ахо-Корасик по основам слов
+
+    Ключевое слово может состоять из нескольких слов ('память переводов')
+    и иметь варианты написания: словарь {'memoQ': ['memoQ', 'memo Q']}
+    считает любое из написаний упоминанием memoQ. Совпадения ищутся
+    по целым словам, поэтому 'Phrase' не находится внутри 'Paraphrase'.
+
+    Пример:
+        matcher = KeywordMatcher(['Trados', 'память переводов'])
+        matcher.count('Опыт работы с SDL Trados, ведение памяти переводов')
+        # {'Trados': 1, 'память переводов': 1}
+    """
+
+    def __init__(self, keywords: Union[Iterable[str], Mapping[str, Iterable[str]]]):
+        """
+        Args:
+            keywords: Список ключевых слов или словарь
+                      {ключевое слово: варианты написания}
+        """
+        if isinstance(keywords, Mapping):
+            variants = {keyword: list(spellings) or [keyword] for keyword, spellings in keywords.items()}
+        else:
+            variants = {keyword: [keyword] for keyword in keywords}
+        self.keywords: Tuple[str, ...] = tuple(variants)
+        # Переходы, ссылки неудачи и выходы автомата; состояние 0 - корень
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+        for index, keyword in enumerate(self.keywords):
+            for spelling in variants[keyword]:
+                self._add(tokenize(spelling), index)
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _add(self, tokens: List[str], index: int) -> None:
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            following = self._goto[state].get(token)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][token] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = following
+        if index not in self._output[state]:
+            self._output[state] += (index,)
+
+    def _build(self) -> None:
+        # Ссылки неудачи - обходом в ширину; выходы состояния дополняются
+        # выходами состояния, на которое указывает ссылка
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for token, following in self._goto[state].items():
+                pending.append(following)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[following] = target if target != following else 0
+                extra = tuple(i for i in self._output[self._fail[following]] if i not in self._output[following])
+                self._output[following] += extra
+
+    def count(self, text: str) -> Dict[str, int]:
+        """
+        Число упоминаний каждого ключевого слова в тексте
+
+        Returns:
+            {ключевое слово: число упоминаний} - только найденные слова,
+            в порядке списка ключевых слов
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        # Счетчики только найденных слов: работа не зависит от длины списка
+        hits: Dict[int, int] = {}
+        state = 0
+        for token in tokenize(text):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for index in output[state]:
+                hits[index] = hits.get(index, 0) + 1
+        return {self.keywords[index]: hits[index] for index in sorted(hits)}
+
+    def find(self, text: str) -> List[str]:
+        """Найденные в тексте ключевые слова (в порядке списка)"""
+        return list(self.count(text))
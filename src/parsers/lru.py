@@ -0,0 +1,48 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш в памяти с необязательным сроком жизни записей
+    """
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Returns:
+            Кортеж (найдено, значение); просроченные записи считаются отсутствующими
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            value, expires = item
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Args:
+            key: Ключ записи
+            value: Значение (может быть None)
+            ttl: Срок жизни в секундах (None - бессрочно)
+        """
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
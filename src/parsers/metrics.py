@@ -0,0 +1,217 @@
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Iterable, Optional
+
+try:
+    import pyinstrument
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PYINSTRUMENT_AVAILABLE = False
+
+# Вывод print() в горячих местах; отключается через set_verbose(False)
+VERBOSE = True
+
+
+def set_verbose(enabled: bool) -> None:
+    global VERBOSE
+    VERBOSE = enabled
+
+
+def log(*args, **kwargs) -> None:
+    """print(), который можно отключить, чтобы не тратить время на вывод"""
+    if VERBOSE:
+        print(*args, **kwargs)
+
+
+class _Timing:
+    """Статистика длительностей одной стадии"""
+
+    def __init__(self, reservoir: int):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        # Последние длительности - для p50/p95 без роста памяти
+        self.samples = deque(maxlen=reservoir)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1) + 0.5))]
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'total_s': self.total,
+            'mean_s': self.total / self.count if self.count else 0.0,
+            'min_s': self.min if self.count else 0.0,
+            'max_s': self.max,
+            'p50_s': self.quantile(0.5),
+            'p95_s': self.quantile(0.95),
+        }
+
+
+class Metrics:
+    """
+    Таймеры и счетчики по стадиям обработки
+
+    Стадии (fetch, parse, resolve_inn, fetch_financials, filter, write)
+    замеряются через timer(), события (попадания в кэш, повторы, коды
+    ответов) - через incr(). Итог выгружается в JSON или в текстовый
+    формат Prometheus. Для выбранных стадий можно включить профилировщик.
+    """
+
+    def __init__(self, reservoir: int = 10_000):
+        self.reservoir = reservoir
+        self._timings: Dict[str, _Timing] = {}
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._profile_stages = set()
+        self._profile_backend = 'cprofile'
+        # (стадия, поток) -> профилировщик: cProfile работает только в своем потоке
+        self._profilers: Dict[tuple, object] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+            self._profilers.clear()
+            self._started = time.time()
+
+    # --- Сбор ---
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            timing = self._timings.get(stage)
+            if timing is None:
+                timing = self._timings[stage] = _Timing(self.reservoir)
+            timing.add(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, stage: str):
+        """Замеряет длительность блока и, если включено, профилирует его"""
+        profiler = self._profiler_for(stage) if stage in self._profile_stages else None
+        if profiler is not None:
+            try:
+                profiler.enable() if self._profile_backend == 'cprofile' else profiler.start()
+            except (ValueError, RuntimeError):
+                # В этом потоке уже работает профилировщик внешней стадии
+                profiler = None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+            if profiler is not None:
+                profiler.disable() if self._profile_backend == 'cprofile' else profiler.stop()
+
+    # --- Профилирование ---
+
+    def enable_profiling(self, stages: Iterable[str], backend: str = 'cprofile') -> None:
+        """
+        Включает профилирование стадий
+
+        Args:
+            stages: Имена стадий (как в timer())
+            backend: 'cprofile' или 'pyinstrument' (если установлен)
+        """
+        if backend == 'pyinstrument' and not PYINSTRUMENT_AVAILABLE:
+            raise ImportError("Установите pyinstrument: pip install pyinstrument")
+        if backend not in ('cprofile', 'pyinstrument'):
+            raise ValueError(f"Неизвестный профилировщик: {backend}")
+        self._profile_stages = set(stages)
+        self._profile_backend = backend
+
+    def _profiler_for(self, stage: str):
+        key = (stage, threading.get_ident())
+        with self._lock:
+            profiler = self._profilers.get(key)
+            if profiler is None:
+                if self._profile_backend == 'cprofile':
+                    profiler = cProfile.Profile()
+                else:
+                    profiler = pyinstrument.Profiler()
+                self._profilers[key] = profiler
+            return profiler
+
+    def dump_profiles(self, output_dir: str = 'profiles') -> None:
+        """Сохраняет профили: <стадия>.prof (cProfile) или <стадия>.html (pyinstrument)"""
+        os.makedirs(output_dir, exist_ok=True)
+        by_stage = defaultdict(list)
+        for (stage, _), profiler in self._profilers.items():
+            by_stage[stage].append(profiler)
+        for stage, profilers in by_stage.items():
+            if self._profile_backend == 'cprofile':
+                stats = pstats.Stats(profilers[0])
+                for profiler in profilers[1:]:
+                    stats.add(profiler)
+                stats.dump_stats(os.path.join(output_dir, f'{stage}.prof'))
+            else:
+                with open(os.path.join(output_dir, f'{stage}.html'), 'w', encoding='utf-8') as f:
+                    f.write('\n'.join(profiler.output_html() for profiler in profilers))
+
+    # --- Выгрузка ---
+
+    def _rate(self, hit: str, miss: str) -> Optional[float]:
+        total = self._counters.get(hit, 0) + self._counters.get(miss, 0)
+        return self._counters.get(hit, 0) / total if total else None
+
+    def report(self) -> Dict:
+        """Сводка по запуску в виде словаря"""
+        with self._lock:
+            return {
+                'started_at': self._started,
+                'duration_s': time.time() - self._started,
+                'stages': {stage: timing.as_dict() for stage, timing in sorted(self._timings.items())},
+                'counters': dict(sorted(self._counters.items())),
+                'rates': {
+                    'http_cache_hit': self._rate('cache.hit', 'cache.miss'),
+                    'inn_memo_hit': self._rate('inn_memo.hit', 'inn_memo.miss'),
+                    'checkpoint_hit': self._rate('checkpoint.hit', 'checkpoint.miss'),
+                    'company_index_hit': self._rate('company_index.hit', 'company_index.miss'),
+                },
+            }
+
+    def write_json(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+    def prometheus_text(self, prefix: str = 'cat_parser') -> str:
+        report = self.report()
+        lines = [f'# TYPE {prefix}_stage_seconds summary']
+        for stage, timing in report['stages'].items():
+            lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="0.5"}} {timing["p50_s"]}')
+            lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="0.95"}} {timing["p95_s"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {timing["total_s"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {timing["count"]}')
+        lines.append(f'# TYPE {prefix}_events_total counter')
+        for name, value in report['counters'].items():
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str, prefix: str = 'cat_parser') -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text(prefix))
+
+
+# Общий реестр метрик процесса
+METRICS = Metrics()
@@ -0,0 +1,27 @@
+import re
+
+# Организационно-правовые формы, которые не влияют на то, какая это компания
+_LEGAL_FORMS = (
+    'ооо', 'оао', 'зао', 'пао', 'ао', 'нао', 'ип', 'нко', 'ано', 'фгуп', 'гуп', 'муп',
+    'ltd', 'llc', 'inc', 'gmbh',
+)
+_LEGAL_FORMS_RE = re.compile(r'(^|_)(' + '|'.join(_LEGAL_FORMS) + r')(?=_|$)')
+
+
+def make_company_id(company_name: str) -> str:
+    """
+    Нормализованный ключ компании для дедупликации
+
+    Регистр, кавычки, знаки препинания и организационно-правовая форма
+    не учитываются: 'ООО "Ромашка"' и 'Ромашка' дают один ключ 'ромашка'.
+
+    Args:
+        company_name: Название компании
+
+    Returns:
+        Ключ из строчных букв и цифр, разделенных '_'
+    """
+    company_id = re.sub(r'\W+', '_', company_name.lower())
+    stripped = _LEGAL_FORMS_RE.sub('_', company_id).strip('_')
+    # Если название состоит только из формы собственности, оставляем его как есть
+    return re.sub(r'_+', '_', stripped) if stripped else company_id.strip('_')
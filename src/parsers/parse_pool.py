@@ -0,0 +1,106 @@
+"""
+Разбор HTML в отдельных процессах
+
+Разбор страниц загружает процессор и из-за GIL мешает потокам,
+которые ждут сеть. ParsePool отправляет сырые байты ответов в пул
+процессов и получает обратно только извлеченные данные (списки
+названий, словари карточек), а не деревья разбора.
+
+Функции, которые передаются в пул, должны быть объявлены на уровне
+модуля (их передают по имени через pickle). Поэтому функции разбора
+страниц - parse_company_names и parse_vacancies (superjob_parser),
+parse_search_card (rusprofile), parse_hh_vacancies (sources.hh) -
+вынесены из классов парсеров на уровень модулей.
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+
+def _call_catching(func: Callable, *args):
+    # Ошибка разбора одной страницы возвращается как значение и не прерывает пачку
+    try:
+        return func(*args)
+    except Exception as e:
+        return e
+
+
+class ParsePool:
+    """
+    Пул процессов для разбора страниц
+
+    Процессы запускаются при первом обращении. Используется метод
+    запуска 'spawn': парсеры работают в многопоточном коде, а fork
+    процесса с запущенными потоками может зависнуть.
+
+    Пачками по chunksize передаются только аргументы map(). run() и
+    run_async() - по одной странице за обмен с процессом: так работают
+    потоковый обход выдачи и карточки Rusprofile, где страница
+    разбирается сразу после загрузки и ждать пачку нельзя.
+
+    Пример:
+        with ParsePool(workers=4) as pool:
+            names = pool.map(parse_company_names, pages, [30] * len(pages))
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunksize: int = 8):
+        """
+        Args:
+            workers: Число процессов (по умолчанию - по числу ядер)
+            chunksize: Сколько страниц отправлять процессу за раз в map();
+                       крупные пачки уменьшают накладные расходы на передачу
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = max(1, chunksize)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def run(self, func: Callable, *args):
+        """Выполняет func(*args) в пуле и ждет результат"""
+        return self._get_executor().submit(func, *args).result()
+
+    async def run_async(self, func: Callable, *args):
+        """То же, что run(), но не блокирует цикл событий"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args))
+
+    def map(self, func: Callable, *iterables: Iterable, return_exceptions: bool = False) -> List:
+        """
+        Пакетный разбор: аргументы отправляются в процессы пачками по chunksize
+
+        Args:
+            func: Функция разбора
+            *iterables: Аргументы, как у встроенной map()
+            return_exceptions: Возвращать исключение вызова вместо его результата
+                               (как asyncio.gather), а не прерывать всю пачку
+
+        Returns:
+            Результаты в порядке аргументов
+        """
+        if return_exceptions:
+            func = functools.partial(_call_catching, func)
+        return list(self._get_executor().map(func, *iterables, chunksize=self.chunksize))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму "ведро токенов"
+
+    Ведро пополняется со скоростью rate токенов в секунду и вмещает
+    не более burst токенов. Каждый запрос забирает один токен.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate должен быть больше нуля")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        Забирает токен и возвращает время ожидания до его появления
+
+        Returns:
+            Сколько секунд нужно подождать перед запросом (0 - можно сразу)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def set_rate(self, rate: float) -> None:
+        """Меняет скорость пополнения, сохраняя уже накопленные токены"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = float(rate)
+
+    def acquire(self) -> None:
+        """Блокирует поток, пока не появится токен"""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """Асинхронно ждет появления токена, не блокируя цикл событий"""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class HostRateLimiter:
+    """
+    Набор ведер токенов - по одному на каждый хост
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        """
+        Возвращает ведро токенов для хоста из URL
+
+        Args:
+            url: Адрес запроса
+
+        Returns:
+            Ведро токенов, общее для всех запросов к этому хосту
+        """
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._make_bucket(host)
+                self._buckets[host] = bucket
+            return bucket
+
+    def _make_bucket(self, host: str) -> TokenBucket:
+        return TokenBucket(self.rate, self.burst)
+
+    def acquire(self, url: str) -> None:
+        self.bucket_for(url).acquire()
+
+    async def acquire_async(self, url: str) -> None:
+        await self.bucket_for(url).acquire_async()
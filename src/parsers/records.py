@@ -0,0 +1,286 @@
+"""
+Компактные записи о компаниях
+
+Вместо словарей с повторяющимися строковыми ключами компании хранятся
+в dataclass со __slots__: у экземпляра нет __dict__, источник и статус -
+общие для всех записей значения Enum, а ключевые слова вакансий -
+битовая маска по общему реестру слов. Для записи в файл запись
+разворачивается в плоский словарь через as_row().
+"""
+import re
+import threading
+from dataclasses import dataclass, fields
+from enum import Enum
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class Source(str, Enum):
+    """Откуда получены данные"""
+    SUPERJOB = 'superjob.ru'
+    HH = 'hh.ru'
+    RUSPROFILE = 'rusprofile.ru'
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class Status(str, Enum):
+    """Стадия обработки компании (значения совпадают со стадиями CheckpointStore)"""
+    DISCOVERED = 'discovered'
+    INN_RESOLVED = 'inn_resolved'
+    NOT_FOUND = 'not_found'
+    FINANCIALS_FETCHED = 'financials_fetched'
+    PASSED = 'passed'
+    REJECTED = 'rejected'
+
+    def __str__(self) -> str:
+        return self.value
+
+
+_SOURCES_BY_VALUE = {source.value: source for source in Source}
+
+
+# --- Реестр ключевых слов ---
+
+# (источник, слово) -> бит маски. Общий для процесса, поэтому маски
+# разных записей можно объединять операцией |
+_KEYWORD_BITS: Dict[Hashable, int] = {}
+_KEYWORDS: List[Hashable] = []
+_KEYWORDS_LOCK = threading.Lock()
+
+
+def keyword_bit(keyword: Hashable) -> int:
+    """Бит маски для пары (источник, слово) (регистрирует ее при первом обращении)"""
+    bit = _KEYWORD_BITS.get(keyword)
+    if bit is None:
+        with _KEYWORDS_LOCK:
+            bit = _KEYWORD_BITS.get(keyword)
+            if bit is None:
+                bit = _KEYWORD_BITS[keyword] = 1 << len(_KEYWORDS)
+                _KEYWORDS.append(keyword)
+    return bit
+
+
+def keywords_from_mask(mask: int) -> List[Hashable]:
+    """Пары (источник, слово) из маски в порядке регистрации"""
+    found = []
+    index = 0
+    while mask:
+        if mask & 1:
+            found.append(_KEYWORDS[index])
+        mask >>= 1
+        index += 1
+    return found
+
+
+def _to_float(value) -> float:
+    if value is None or value == '':
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_int(value) -> Optional[int]:
+    """Целое число из значения вида 120, '120' или '1 200 чел.' (None, если цифр нет)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, int):
+        return value
+    digits = re.sub(r'\D', '', str(value))
+    return int(digits) if digits else None
+
+
+def format_evidence(evidence: List[Tuple[Source, str]]) -> str:
+    """Колонка cat_evidence из пар (источник, слово) в заданном порядке"""
+    by_source: Dict[Source, List[str]] = {}
+    for source, keyword in evidence:
+        by_source.setdefault(source, []).append(keyword)
+    if len(by_source) <= 1:
+        return f"Вакансия: {', '.join(keyword for _, keyword in evidence)}"
+    # Несколько сайтов: слова по каждому источнику отдельно
+    parts = [f"{source.value} - {', '.join(keywords)}" for source, keywords in by_source.items()]
+    return f"Вакансия: {'; '.join(parts)}"
+
+
+def parse_evidence(text: str, default_source: Source = Source.SUPERJOB) -> List[Tuple[Source, str]]:
+    """
+    Пары (источник, слово) из колонки cat_evidence (обратное к format_evidence)
+
+    В форме с одним источником ("Вакансия: Trados, memoQ") сайт не указан -
+    слова относятся к default_source. В форме с несколькими
+    ("Вакансия: superjob.ru - Trados; hh.ru - memoQ") сайт стоит перед каждой группой.
+    """
+    text = (text or '').strip()
+    if text.startswith('Вакансия:'):
+        text = text[len('Вакансия:'):]
+    evidence = []
+    for part in text.split(';'):
+        source = default_source
+        head, separator, tail = part.partition(' - ')
+        if separator and head.strip() in _SOURCES_BY_VALUE:
+            source = _SOURCES_BY_VALUE[head.strip()]
+            part = tail
+        evidence.extend((source, keyword.strip()) for keyword in part.split(',') if keyword.strip())
+    return evidence
+
+
+# --- Записи ---
+
+@dataclass(slots=True)
+class Financials:
+    """Данные компании с Rusprofile (результат RusprofileParser.get_company_info)"""
+    inn: str
+    name: str = ''
+    full_name: str = ''
+    ogrn: str = ''
+    okved: str = ''
+    okved_main: str = ''
+    status: str = ''
+    registration_date: str = ''
+    authorized_capital: float = 0.0
+    revenue: float = 0.0
+    profit: float = 0.0
+    employees: Optional[int] = None
+    site: str = ''
+    email: str = ''
+    phone: str = ''
+    address: str = ''
+    ceo: str = ''
+    source: Source = Source.RUSPROFILE
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Financials':
+        """Запись из словаря (например, сохраненного в CheckpointStore); лишние ключи игнорируются"""
+        values = {name: data[name] for name in _FINANCIALS_FIELDS if data.get(name) is not None}
+        for name in ('authorized_capital', 'revenue', 'profit'):
+            values[name] = _to_float(values.get(name))
+        values['employees'] = parse_int(values.get('employees'))
+        values['source'] = Source(values.get('source', Source.RUSPROFILE))
+        return cls(**values)
+
+    def as_dict(self) -> Dict:
+        """Плоский словарь с простыми значениями (для JSON и файлов)"""
+        row = {name: getattr(self, name) for name in _FINANCIALS_FIELDS}
+        row['source'] = self.source.value
+        return row
+
+
+_FINANCIALS_FIELDS = tuple(field.name for field in fields(Financials))
+
+
+@dataclass(slots=True)
+class SiteAnalysis:
+    """Результат анализа сайта компании на упоминания CAT-систем"""
+    site: str
+    accessible: bool = False
+    confidence: float = 0.0
+    products: Tuple[str, ...] = ()
+    pages: int = 0
+    duration: float = 0.0
+    analyzed_at: str = ''
+    content_hash: str = ''
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SiteAnalysis':
+        values = {field.name: data[field.name] for field in fields(cls) if field.name in data}
+        values['products'] = tuple(values.get('products') or ())
+        return cls(**values)
+
+    def as_dict(self) -> Dict:
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    def as_row(self) -> Dict:
+        """Колонки выходного файла (как в data_verified.csv)"""
+        return {
+            'cat_product': '/'.join(self.products),
+            'cat_confidence': round(self.confidence, 2),
+            'website_accessible': self.accessible,
+            'website_analysis_date': self.analyzed_at,
+            'analysis_duration': round(self.duration, 2),
+        }
+
+
+@dataclass(slots=True)
+class CompanyRecord:
+    """
+    Компания, найденная по вакансиям
+
+    keywords - битовая маска пар (источник, ключевое слово), см. keyword_bit:
+    по ней видно, на каком сайте и по какому слову нашлась компания.
+    source - источник, где компания встретилась впервые. Финансы
+    не копируются в запись, а хранятся ссылкой на Financials.
+    """
+    name: str
+    inn: Optional[str] = None
+    source: Source = Source.SUPERJOB
+    keywords: int = 0
+    status: Status = Status.DISCOVERED
+    financials: Optional[Financials] = None
+    site_analysis: Optional[SiteAnalysis] = None
+
+    def add_keyword(self, keyword: str, source: Optional[Source] = None) -> bool:
+        """
+        Отмечает ключевое слово, по которому найдена вакансия
+
+        Args:
+            keyword: Ключевое слово
+            source: Сайт вакансии (по умолчанию - source записи)
+
+        Returns:
+            False, если эта пара уже была отмечена
+        """
+        bit = keyword_bit((source or self.source, keyword))
+        if self.keywords & bit:
+            return False
+        self.keywords |= bit
+        return True
+
+    @property
+    def evidence(self) -> List[Tuple[Source, str]]:
+        return keywords_from_mask(self.keywords)
+
+    @property
+    def keywords_found(self) -> List[str]:
+        return list(dict.fromkeys(keyword for _, keyword in self.evidence))
+
+    @property
+    def sources_found(self) -> List[Source]:
+        return list(dict.fromkeys(source for source, _ in self.evidence))
+
+    @property
+    def cat_evidence(self) -> str:
+        return format_evidence(self.evidence)
+
+    @property
+    def revenue(self) -> float:
+        return self.financials.revenue if self.financials is not None else 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CompanyRecord':
+        """Запись из словаря в прежнем формате ({'name': ..., 'cat_evidence': ...})"""
+        record = cls(name=data.get('name', ''), inn=data.get('inn'),
+                     source=Source(data.get('source', Source.SUPERJOB)))
+        for source, keyword in parse_evidence(data.get('cat_evidence', ''), record.source):
+            record.add_keyword(keyword, source)
+        return record
+
+    def as_row(self) -> Dict:
+        """
+        Плоский словарь для записи в файл
+
+        Поля Rusprofile перекрывают поля SuperJob (название, ИНН, источник),
+        как при прежнем слиянии словарей через update().
+        """
+        row = {
+            'name': self.name,
+            'inn': self.inn,
+            'source': self.source.value,
+            'cat_evidence': self.cat_evidence,
+        }
+        if self.financials is not None:
+            row.update(self.financials.as_dict())
+        if self.site_analysis is not None:
+            row.update(self.site_analysis.as_row())
+        return row
@@ -1,10 +1,44 @@
 import requests
 from bs4 import BeautifulSoup
 import re
-import time
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple, Union
 from urllib.parse import quote_plus
 
+from .company_index import CompanyIndex
+from .http_cache import ResponseCache
+from .fast_extract import FastExtractError, extract_rusprofile_card
+from .lru import LRUCache
+from .metrics import METRICS, log
+from .normalize import make_company_id
+from .parse_pool import ParsePool
+from .records import Financials, parse_int
+from .scheduler import RequestScheduler
+from .transport import get_session
+
+
+def parse_search_card(page: Union[str, bytes], fast_parse: bool = True) -> Optional[Dict]:
+    """
+    Извлекает первую карточку компании из страницы поиска
+    
+    Берет название, ИНН и ссылку на карточку из первого результата
+    выдачи. Сначала пробует быстрый разбор через lxml, при его
+    недоступности или ошибке - полный разбор через BeautifulSoup.
+    
+    Args:
+        page: HTML страницы поиска (строка или байты ответа в UTF-8)
+        fast_parse: Разбирать через lxml
+        
+    Returns:
+        Словарь с ключами name, inn, href или None, если карточки нет
+    """
+    html = page.decode('utf-8', errors='replace') if isinstance(page, bytes) else page
+    if fast_parse:
+        try:
+            return extract_rusprofile_card(html)
+        except FastExtractError:
+            pass
+    return RusprofileParser._extract_card_soup(html)
+
 
 class RusprofileParser:
     """
@@ -14,7 +48,28 @@ class RusprofileParser:
     SEARCH_URL = "https://www.rusprofile.ru/search"
     BASE_URL = "https://www.rusprofile.ru"
     
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None, memo_size: int = 10_000,
+                 negative_ttl: float = 3600, fast_parse: bool = True,
+                 scheduler: Optional[RequestScheduler] = None, pool_size: int = 10,
+                 http2: bool = False, parse_pool: Optional[ParsePool] = None,
+                 index: Optional[CompanyIndex] = None):
+        """
+        Args:
+            cache: Кэш HTTP-ответов; если задан, повторные запросы
+                   отдаются с диска без обращения к сайту
+            memo_size: Сколько результатов поиска ИНН помнить в памяти
+            negative_ttl: Сколько секунд помнить, что компания не найдена
+            fast_parse: Разбирать страницы поиска через lxml (с откатом на BeautifulSoup)
+            scheduler: Общий планировщик запросов (лимит частоты и повторы);
+                       по умолчанию - не чаще одного запроса в секунду
+            pool_size: Размер пула соединений (по числу потоков, работающих с парсером)
+            http2: Использовать HTTP/2 через httpx, если он установлен
+            parse_pool: Пул процессов для разбора страниц поиска
+                        (None - разбор в вызывающем потоке)
+            index: Локальный справочник компаний; точные совпадения
+                   не ищутся на сайте, похожие названия проверяются поиском
+                   на сайте, найденные на сайте компании добавляются в справочник
+        """
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -23,8 +78,16 @@ class RusprofileParser:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        # Общая сессия: keep-alive соединения переиспользуются всеми экземплярами парсера
+        self.session = get_session('rusprofile', headers=self.headers, cache=cache,
+                                   pool_size=pool_size, http2=http2)
+        # Результаты поиска ИНН по нормализованному названию компании
+        self._inn_memo = LRUCache(max_size=memo_size)
+        self.negative_ttl = negative_ttl
+        self.fast_parse = fast_parse
+        self.scheduler = scheduler or RequestScheduler(rate=1.0)
+        self.parse_pool = parse_pool
+        self.index = index
     
     def search_inn_by_name(self, company_name: str) -> Optional[Dict]:
         """
@@ -36,82 +99,198 @@ class RusprofileParser:
         Returns:
             Словарь с информацией о компании или None, если не найдена
         """
-        print(f"  Поиск ИНН для: '{company_name}'")
+        return self._search_inn(company_name)[0]
+    
+    def search_inn_cached(self, company_name: str) -> Optional[Dict]:
+        """
+        Поиск ИНН с запоминанием результатов
+        
+        Названия сравниваются после нормализации (как ключ компании
+        в SuperJob), поэтому 'ООО "Ромашка"' и 'Ромашка' - один запрос.
+        Найденные компании запоминаются до вытеснения из LRU, а "не найдено" -
+        на negative_ttl секунд. Ошибки сети не запоминаются.
+        
+        Args:
+            company_name: Название компании для поиска
+            
+        Returns:
+            Словарь с информацией о компании или None, если не найдена
+        """
+        return self.resolve_inn(company_name)[0]
+    
+    def resolve_inn(self, company_name: str) -> Tuple[Optional[Dict], bool]:
+        """
+        То же, что search_inn_cached, но с признаком достоверности
+        
+        Returns:
+            Кортеж (результат, достоверно); достоверно=False, если
+            компания не найдена из-за ошибки сети или разбора либо
+            ИНН взят из похожего названия в справочнике, а сайт
+            не ответил. Недостоверные результаты не запоминаются
+        """
+        key = make_company_id(company_name)
+        found, result = self._inn_memo.get(key)
+        METRICS.incr('inn_memo.hit' if found else 'inn_memo.miss')
+        definitive = True
+        if not found:
+            result, definitive = self._resolve_uncached(company_name)
+            if result is not None and definitive:
+                self._inn_memo.put(key, result)
+            elif definitive:
+                self._inn_memo.put(key, None, ttl=self.negative_ttl)
+        # Отдаем копию, чтобы вызывающий код не испортил сохраненный результат
+        return (dict(result) if result is not None else None), definitive
+    
+    def _resolve_uncached(self, company_name: str) -> Tuple[Optional[Dict], bool]:
+        # Сначала локальный справочник: точное совпадение названия достоверно,
+        # похожее - только кандидат, который проверяется поиском на сайте
+        candidate = None
+        if self.index is not None:
+            candidate, score, exact = self.index.lookup(company_name)
+            if candidate is not None and exact:
+                METRICS.incr('company_index.hit')
+                log(f"  ИНН для '{company_name}' из справочника: {candidate['inn']}")
+                return candidate, True
+            # Похожее название тоже уходит на сайт, поэтому считается промахом
+            METRICS.incr('company_index.miss')
+            if candidate is not None:
+                METRICS.incr('company_index.fuzzy')
+        
+        result, definitive = self._search_inn(company_name)
+        if result is not None and self.index is not None:
+            self.index.add(result['name'], result['inn'], rusprofile_url=result['rusprofile_url'],
+                           aliases=[company_name])
+        if result is None and not definitive and candidate is not None:
+            # Сайт не ответил: похожее название из справочника лучше, чем ничего,
+            # но результат недостоверный - он не запоминается и не сохраняется
+            log(f"  ИНН для '{company_name}' по похожему названию из справочника: "
+                f"{candidate['inn']} (сходство {score:.2f})")
+            return candidate, False
+        return result, definitive
+    
+    def resolve_inns(self, company_names: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Пакетный поиск ИНН: один запрос на каждую уникальную компанию
+        
+        Args:
+            company_names: Список названий (возможны повторы и варианты написания)
+            
+        Returns:
+            Словарь {название из списка: информация о компании или None}
+        """
+        unique = {}
+        for name in company_names:
+            unique.setdefault(make_company_id(name), name)
+        
+        log(f"  Пакетный поиск ИНН: {len(company_names)} названий, {len(unique)} уникальных")
+        resolved = {key: self.search_inn_cached(name) for key, name in unique.items()}
+        return {name: resolved[make_company_id(name)] for name in company_names}
+    
+    def _search_inn(self, company_name: str) -> Tuple[Optional[Dict], bool]:
+        """
+        Поиск ИНН по названию с признаком достоверности результата
+        
+        Returns:
+            Кортеж (результат, достоверно); при ошибке сети или разбора
+            достоверно=False, и отсутствие результата нельзя кэшировать
+        """
+        log(f"  Поиск ИНН для: '{company_name}'")
         
         # Кодируем название для URL
         encoded_name = quote_plus(company_name)
         search_url = f"{self.SEARCH_URL}?query={encoded_name}&type=ul"
         
         try:
-            response = self.session.get(search_url, timeout=10)
+            response = self.scheduler.request(self.session, 'GET', search_url, timeout=10)
             response.raise_for_status()
-            response.encoding = 'utf-8'
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
             
-            # Ищем первую карточку компании в результатах поиска
-            company_card = soup.find('div', class_='company-item')
+            company_card = self._extract_card(response.content)
             
             if not company_card:
-                # Пробуем другие возможные селекторы
-                company_card = soup.find('div', class_=re.compile(r'company-item'))
+                log(f"    Компания '{company_name}' не найдена в результатах поиска")
+                return None, True
             
-            if not company_card:
-                print(f"    Компания '{company_name}' не найдена в результатах поиска")
-                return None
-            
-            # Извлекаем название компании
-            name_element = company_card.find('a', class_='company-name')
-            company_name_found = name_element.get_text(strip=True) if name_element else company_name
-            
-            # Извлекаем ИНН
-            inn_element = company_card.find('span', class_='copy-target')
-            if not inn_element:
-                # Пробуем другой селектор для ИНН
-                inn_text = None
-                for div in company_card.find_all('div', class_='company-row'):
-                    text = div.get_text(strip=True)
-                    if 'ИНН' in text:
-                        inn_text = text
-                        break
-                
-                if inn_text:
-                    # Извлекаем ИНН из текста
-                    inn_match = re.search(r'ИНН\s*(\d{10,12})', inn_text)
-                    inn = inn_match.group(1) if inn_match else None
-                else:
-                    inn = None
-            else:
-                inn = inn_element.get_text(strip=True)
+            company_name_found = company_card['name'] or company_name
+            inn = company_card['inn']
             
             if not inn or not inn.isdigit():
-                print(f"    Не удалось извлечь ИНН для '{company_name_found}'")
-                return None
+                log(f"    Не удалось извлечь ИНН для '{company_name_found}'")
+                return None, True
             
-            # Извлекаем ссылку на страницу компании
-            link_element = company_card.find('a', class_='company-name')
-            company_url = f"{self.BASE_URL}{link_element['href']}" if link_element and 'href' in link_element.attrs else None
+            # Ссылка на страницу компании
+            href = company_card['href']
+            company_url = f"{self.BASE_URL}{href}" if href is not None else None
             
-            print(f"    Найдено: {company_name_found} (ИНН: {inn})")
+            log(f"    Найдено: {company_name_found} (ИНН: {inn})")
             
             return {
                 'name': company_name_found,
                 'inn': inn,
                 'rusprofile_url': company_url,
                 'source_query': company_name
-            }
+            }, True
             
         except requests.exceptions.RequestException as e:
-            print(f"    Ошибка сети при поиске '{company_name}': {e}")
-            return None
+            log(f"    Ошибка сети при поиске '{company_name}': {e}")
+            return None, False
         except Exception as e:
-            print(f"    Ошибка при обработке результатов поиска для '{company_name}': {e}")
+            log(f"    Ошибка при обработке результатов поиска для '{company_name}': {e}")
+            return None, False
+    
+    def _extract_card(self, page: Union[str, bytes]) -> Optional[Dict]:
+        """
+        Извлекает первую карточку компании из страницы поиска (см. parse_search_card)
+        
+        Если задан parse_pool, страница разбирается в отдельном процессе,
+        а поток, вызвавший поиск, не держит GIL на время разбора.
+        """
+        with METRICS.timer('parse'):
+            if self.parse_pool is not None:
+                return self.parse_pool.run(parse_search_card, page, self.fast_parse)
+            return parse_search_card(page, self.fast_parse)
+    
+    @staticmethod
+    def _extract_card_soup(html: str) -> Optional[Dict]:
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Ищем первую карточку компании в результатах поиска
+        company_card = soup.find('div', class_='company-item')
+        
+        if not company_card:
+            # Пробуем другие возможные селекторы
+            company_card = soup.find('div', class_=re.compile(r'company-item'))
+        
+        if not company_card:
             return None
-        finally:
-            # Уважаем сайт - делаем паузу между запросами
-            time.sleep(1)
+        
+        # Извлекаем название компании
+        name_element = company_card.find('a', class_='company-name')
+        name = name_element.get_text(strip=True) if name_element else None
+        
+        # Извлекаем ИНН
+        inn_element = company_card.find('span', class_='copy-target')
+        if not inn_element:
+            # Пробуем другой селектор для ИНН
+            inn_text = None
+            for div in company_card.find_all('div', class_='company-row'):
+                text = div.get_text(strip=True)
+                if 'ИНН' in text:
+                    inn_text = text
+                    break
+            
+            if inn_text:
+                # Извлекаем ИНН из текста
+                inn_match = re.search(r'ИНН\s*(\d{10,12})', inn_text)
+                inn = inn_match.group(1) if inn_match else None
+            else:
+                inn = None
+        else:
+            inn = inn_element.get_text(strip=True)
+        
+        href = name_element['href'] if name_element and 'href' in name_element.attrs else None
+        return {'name': name, 'inn': inn, 'href': href}
     
-    def get_company_info(self, inn: str) -> Optional[Dict]:
+    def get_company_info(self, inn: str) -> Optional[Financials]:
         """
         Получает подробную информацию о компании по ИНН
         
@@ -119,13 +298,24 @@ class RusprofileParser:
             inn: ИНН компании (10 или 12 цифр)
             
         Returns:
-            Словарь с информацией о компании или None в случае ошибки
+            Запись Financials (as_dict() - словарь) или None в случае ошибки
         """
-        print(f"  Получение информации по ИНН: {inn}")
+        return self.fetch_company_info(inn)[0]
+    
+    def fetch_company_info(self, inn: str) -> Tuple[Optional[Financials], bool]:
+        """
+        То же, что get_company_info, но с признаком достоверности
+        
+        Returns:
+            Кортеж (результат, достоверно); достоверно=False, если данные
+            не получены из-за ошибки сети (в том числе 429/503 после всех
+            повторов) или разбора - такой запрос стоит повторить позже
+        """
+        log(f"  Получение информации по ИНН: {inn}")
         
         if not inn or not re.match(r'^\d{10,12}$', inn):
-            print(f"    Неверный формат ИНН: {inn}")
-            return None
+            log(f"    Неверный формат ИНН: {inn}")
+            return None, True
         
         company_url = f"{self.BASE_URL}/ajax/query"
         
@@ -138,7 +328,7 @@ class RusprofileParser:
                 'with_aliases': '1'
             }
             
-            response = self.session.post(company_url, data=payload, timeout=10)
+            response = self.scheduler.request(self.session, 'POST', company_url, data=payload, timeout=10)
             response.raise_for_status()
             
             # Парсим JSON ответ
@@ -148,51 +338,52 @@ class RusprofileParser:
                 company_data = data['ul_list'][0]
                 
                 # Извлекаем основную информацию
-                result = {
-                    'inn': inn,
-                    'name': company_data.get('name', ''),
-                    'full_name': company_data.get('full_name', ''),
-                    'ogrn': company_data.get('ogrn', ''),
-                    'okved': company_data.get('okved', ''),
-                    'okved_main': company_data.get('okved_main', ''),
-                    'status': company_data.get('status', ''),
-                    'registration_date': company_data.get('registration_date', ''),
-                    'authorized_capital': self._parse_money(company_data.get('authorized_capital', '')),
-                    'revenue': self._parse_money(company_data.get('revenue', '')),
-                    'profit': self._parse_money(company_data.get('profit', '')),
-                    'employees': company_data.get('employees_count', ''),
-                    'site': company_data.get('site', ''),
-                    'email': company_data.get('email', ''),
-                    'phone': company_data.get('phone', ''),
-                    'address': company_data.get('address', ''),
-                    'ceo': company_data.get('ceo_name', ''),
-                    'source': 'rusprofile.ru'
-                }
+                result = Financials(
+                    inn=inn,
+                    name=company_data.get('name', ''),
+                    full_name=company_data.get('full_name', ''),
+                    ogrn=company_data.get('ogrn', ''),
+                    okved=company_data.get('okved', ''),
+                    okved_main=company_data.get('okved_main', ''),
+                    status=company_data.get('status', ''),
+                    registration_date=company_data.get('registration_date', ''),
+                    authorized_capital=self._parse_money(company_data.get('authorized_capital', '')),
+                    revenue=self._parse_money(company_data.get('revenue', '')),
+                    profit=self._parse_money(company_data.get('profit', '')),
+                    employees=parse_int(company_data.get('employees_count')),
+                    site=company_data.get('site', ''),
+                    email=company_data.get('email', ''),
+                    phone=company_data.get('phone', ''),
+                    address=company_data.get('address', ''),
+                    ceo=company_data.get('ceo_name', ''),
+                )
                 
-                print(f"    Получена информация для {result['name']}")
-                return result
+                log(f"    Получена информация для {result.name}")
+                if self.index is not None:
+                    self.index.add(result.name, inn, ogrn=result.ogrn, aliases=[result.full_name])
+                return result, True
             
-            print(f"    Компания с ИНН {inn} не найдена")
-            return None
+            log(f"    Компания с ИНН {inn} не найдена")
+            return None, True
             
         except requests.exceptions.RequestException as e:
-            print(f"    Ошибка сети при получении информации по ИНН {inn}: {e}")
-            return None
+            log(f"    Ошибка сети при получении информации по ИНН {inn}: {e}")
+            return None, False
         except (KeyError, IndexError, ValueError) as e:
-            print(f"    Ошибка парсинга данных для ИНН {inn}: {e}")
-            return None
+            log(f"    Ошибка парсинга данных для ИНН {inn}: {e}")
+            return None, False
         except Exception as e:
-            print(f"    Неожиданная ошибка для ИНН {inn}: {e}")
-            return None
-        finally:
-            time.sleep(1)
+            log(f"    Неожиданная ошибка для ИНН {inn}: {e}")
+            return None, False
     
     def _parse_money(self, value: str) -> float:
         """
         Преобразует строковое значение денег в число
         
+        Для целой колонки значений есть filtering.normalize_money.
+        
         Args:
-            value: Строка вида "1 234 567 ₽" или "12.34 млн ₽"
+            value: Строка вида "1 234 567 ₽", "12.34 млн ₽" или "1,2 млрд ₽"
             
         Returns:
             Числовое значение в рублях
@@ -201,11 +392,14 @@ class RusprofileParser:
             return 0.0
         
         try:
-            # Убираем пробелы и символ валюты
-            clean_value = value.replace(' ', '').replace('₽', '').replace(',', '.')
+            # Убираем пробелы (в том числе неразрывные) и символ валюты
+            clean_value = re.sub(r'\s', '', value).replace('₽', '').replace(',', '.')
             
-            # Проверяем наличие "млн", "тыс" и т.д.
-            if 'млн' in clean_value:
+            # Проверяем наличие "млрд", "млн", "тыс"
+            if 'млрд' in clean_value:
+                number = float(re.search(r'[\d.]+', clean_value).group())
+                return number * 1_000_000_000
+            elif 'млн' in clean_value:
                 number = float(re.search(r'[\d.]+', clean_value).group())
                 return number * 1_000_000
             elif 'тыс' in clean_value:
@@ -227,9 +421,10 @@ class RusprofileParser:
             Список найденных компаний с ИНН
         """
         results = []
+        resolved = self.resolve_inns(company_names)
         
         for name in company_names:
-            company_info = self.search_inn_by_name(name)
+            company_info = resolved[name]
             if company_info:
                 results.append(company_info)
         
@@ -252,8 +447,8 @@ if __name__ == "__main__":
             # Получаем полную информацию
             full_info = parser.get_company_info(result['inn'])
             if full_info:
-                print(f"    Выручка: {full_info.get('revenue', 'не указана')}")
-                print(f"    Сотрудники: {full_info.get('employees', 'не указано')}")
-                print(f"    ОКВЭД: {full_info.get('okved_main', 'не указан')}")
+                print(f"    Выручка: {full_info.revenue}")
+                print(f"    Сотрудники: {full_info.employees or 'не указано'}")
+                print(f"    ОКВЭД: {full_info.okved_main or 'не указан'}")
         else:
             print(f"  Не найдено: {company}")
@@ -0,0 +1,242 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from .metrics import METRICS
+from .rate_limit import HostRateLimiter, TokenBucket
+
+# Коды ответа, после которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Коды, которыми сайт просит снизить нагрузку
+THROTTLE_STATUSES = {429, 503}
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """
+    Лимит частоты по хостам, подстраивающийся под ответы сайта (AIMD)
+
+    Успешный быстрый ответ увеличивает частоту на additive_increase
+    запросов в секунду, а 429/503 или медленный ответ уменьшает ее
+    в decrease_factor раз. Частота держится в пределах [min_rate, max_rate].
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 1, min_rate: float = 0.1,
+                 max_rate: float = 5.0, additive_increase: float = 0.1,
+                 decrease_factor: float = 0.5, slow_latency: float = 5.0):
+        super().__init__(rate=rate, burst=burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.slow_latency = slow_latency
+        # Время (time.monotonic), до которого хост просил не обращаться к нему
+        self._paused_until: Dict[str, float] = {}
+
+    def _make_bucket(self, host: str) -> TokenBucket:
+        return TokenBucket(min(max(self.rate, self.min_rate), self.max_rate), self.burst)
+
+    def record(self, url: str, status: Optional[int], latency: float) -> None:
+        """
+        Учитывает результат запроса
+
+        Args:
+            url: Адрес запроса
+            status: Код ответа (None - ошибка соединения)
+            latency: Время ответа в секундах
+        """
+        bucket = self.bucket_for(url)
+        if status in THROTTLE_STATUSES or status is None or latency > self.slow_latency:
+            bucket.set_rate(max(self.min_rate, bucket.rate * self.decrease_factor))
+        elif status < 400:
+            bucket.set_rate(min(self.max_rate, bucket.rate + self.additive_increase))
+
+    def pause(self, url: str, seconds: float) -> None:
+        """Приостанавливает запросы к хосту (например, по Retry-After)"""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._paused_until[host] = max(until, self._paused_until.get(host, 0))
+
+    def pause_left(self, url: str) -> float:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            return max(0.0, self._paused_until.get(host, 0) - time.monotonic())
+
+    def acquire(self, url: str) -> None:
+        delay = self.pause_left(url)
+        if delay > 0:
+            time.sleep(delay)
+        super().acquire(url)
+
+    async def acquire_async(self, url: str) -> None:
+        delay = self.pause_left(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await super().acquire_async(url)
+
+    def current_rate(self, url: str) -> float:
+        return self.bucket_for(url).rate
+
+
+class RequestScheduler:
+    """
+    Общий планировщик HTTP-запросов для всех парсеров
+
+    Перед запросом ждет разрешения адаптивного лимита хоста, после
+    ошибки повторяет запрос с экспоненциальной задержкой и случайным
+    разбросом, учитывает заголовок Retry-After. Число повторов ограничено
+    на один запрос (max_retries) и в целом: каждый запрос добавляет в
+    бюджет retry_ratio повтора, каждый повтор забирает один.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 1, min_rate: float = 0.1,
+                 max_rate: float = 5.0, max_retries: int = 3, backoff_base: float = 1.0,
+                 backoff_max: float = 60.0, retry_ratio: float = 0.2, min_retry_budget: float = 10,
+                 limiter: Optional[AdaptiveRateLimiter] = None):
+        self.limiter = limiter or AdaptiveRateLimiter(rate=rate, burst=burst,
+                                                      min_rate=min_rate, max_rate=max_rate)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_ratio = retry_ratio
+        self.min_retry_budget = min_retry_budget
+        self._budget = float(min_retry_budget)
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.retries = 0
+
+    # --- Общая логика ---
+
+    def _deposit(self) -> None:
+        with self._lock:
+            self.requests_sent += 1
+            cap = max(self.min_retry_budget, self.requests_sent * self.retry_ratio)
+            self._budget = min(cap, self._budget + self.retry_ratio)
+
+    def _withdraw(self) -> bool:
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            self.retries += 1
+            return True
+
+    @staticmethod
+    def _retry_after(response: Optional[requests.Response]) -> Optional[float]:
+        if response is None:
+            return None
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _backoff(self, attempt: int) -> float:
+        # "Полный разброс": случайная задержка от 0 до экспоненциального предела
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _next_delay(self, url: str, attempt: int, response: Optional[requests.Response],
+                    error: Optional[Exception], latency: float) -> Optional[float]:
+        """
+        Учитывает результат попытки и решает, нужен ли повтор
+
+        Returns:
+            Задержка перед повтором в секундах или None, если повторять не нужно
+        """
+        status = response.status_code if response is not None else None
+        if not getattr(response, 'from_cache', False):
+            self.limiter.record(url, status, latency)
+        METRICS.incr(f'http.status.{status}' if status is not None else 'http.errors')
+
+        if error is None and status not in RETRY_STATUSES:
+            return None
+        if attempt >= self.max_retries or not self._withdraw():
+            METRICS.incr('http.gave_up')
+            return None
+        METRICS.incr('http.retries')
+
+        delay = self._backoff(attempt)
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+            self.limiter.pause(url, delay)
+        return delay
+
+    @staticmethod
+    def _cached(session: requests.Session, method: str, url: str, kwargs: Dict) -> Optional[requests.Response]:
+        # Свежий ответ из кэша не расходует лимит запросов к сайту
+        cached_response = getattr(session, 'cached_response', None)
+        return cached_response(method, url, **kwargs) if cached_response is not None else None
+
+    # --- Запросы ---
+
+    def request(self, session: requests.Session, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Выполняет запрос с учетом лимитов и повторов (блокирующий вызов)
+
+        Returns:
+            Ответ сервера (последний, если повторы не помогли)
+
+        Raises:
+            requests.exceptions.RequestException: если все попытки закончились ошибкой сети
+        """
+        cached = self._cached(session, method, url, kwargs)
+        if cached is not None:
+            return cached
+
+        attempt = 0
+        while True:
+            self.limiter.acquire(url)
+            self._deposit()
+            response, error = None, None
+            started = time.monotonic()
+            try:
+                with METRICS.timer('fetch'):
+                    response = session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                error = e
+            delay = self._next_delay(url, attempt, response, error, time.monotonic() - started)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    async def request_async(self, session: requests.Session, method: str, url: str, **kwargs) -> requests.Response:
+        """То же, что request, но без блокировки цикла событий"""
+        cached = self._cached(session, method, url, kwargs)
+        if cached is not None:
+            return cached
+
+        attempt = 0
+        while True:
+            await self.limiter.acquire_async(url)
+            self._deposit()
+            response, error = None, None
+            started = time.monotonic()
+            try:
+                # requests блокирующий, поэтому запрос уходит в пул потоков
+                with METRICS.timer('fetch'):
+                    response = await asyncio.to_thread(session.request, method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                error = e
+            delay = self._next_delay(url, attempt, response, error, time.monotonic() - started)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
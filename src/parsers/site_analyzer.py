@@ -0,0 +1,299 @@
+"""
+Анализ сайтов компаний на упоминания CAT-систем
+
+Сайт компании (поле site из RusprofileParser.get_company_info) обходится
+асинхронно: главная страница и ссылки того же домена на заданную глубину,
+в пределах бюджета страниц. Текст страниц сначала проверяется за один
+проход KeywordMatcher на названия Trados, memoQ, Smartcat, Crowdin
+и Phrase; необязательная оценка моделью (scorer) запускается только
+для сайтов, где что-то нашлось.
+
+Страницы кэшируются по адресу в отдельном ResponseCache (с перепроверкой
+по ETag/Last-Modified), а результат анализа - по хэшу содержимого сайта:
+если ни одна страница не изменилась, сайт повторно не анализируется.
+"""
+import asyncio
+import hashlib
+import re
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+from .async_fetch import AsyncFetcher
+from .http_cache import ResponseCache
+from .keyword_matcher import KeywordMatcher
+from .metrics import METRICS, log
+from .records import SiteAnalysis
+from .scheduler import RequestScheduler
+from .transport import get_session
+
+try:
+    from lxml import html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Продукт -> варианты написания. Phrase ищется только как Phrase TMS/Strings
+# или по прежнему названию Memsource: само слово phrase слишком общее
+CAT_PRODUCTS = {
+    'Trados': ['Trados'],
+    'memoQ': ['memoQ', 'memo Q'],
+    'Smartcat': ['Smartcat', 'Smart Cat'],
+    'Crowdin': ['Crowdin'],
+    'Phrase': ['Phrase TMS', 'Phrase Strings', 'Memsource'],
+}
+
+_PRODUCT_MATCHER = KeywordMatcher(CAT_PRODUCTS)
+
+# Ссылки, которые стоит открыть в первую очередь: вакансии, услуги, переводы
+_PRIORITY_LINK_RE = re.compile(
+    r'career|job|vacanc|вакан|карьер|service|услуг|translat|перевод|локализ|locali|about|о-компании',
+    re.IGNORECASE,
+)
+# Файлы, которые не являются страницами сайта
+_SKIP_LINK_RE = re.compile(r'\.(?:jpe?g|png|gif|svg|webp|pdf|docx?|xlsx?|zip|rar|mp4|css|js)(?:\?|$)',
+                           re.IGNORECASE)
+
+# Оценка модели: текст страниц и найденные продукты -> уверенность 0..1
+Scorer = Callable[[str, Dict[str, int]], float]
+
+
+def extract_text_and_links(content: bytes, base_url: str) -> Tuple[str, List[str]]:
+    """
+    Видимый текст страницы и абсолютные адреса ссылок
+
+    Скрипты и стили отбрасываются. Если lxml не установлен или не
+    разобрал страницу, используется BeautifulSoup.
+    """
+    if LXML_AVAILABLE and content:
+        try:
+            tree = lxml_html.fromstring(content)
+            for element in tree.xpath('//script|//style|//noscript'):
+                element.drop_tree()
+            text = ' '.join(tree.text_content().split())
+            links = [urljoin(base_url, href) for href in tree.xpath('//a/@href')]
+            return text, links
+        except (ValueError, TypeError, lxml_html.etree.ParserError):
+            pass
+    soup = BeautifulSoup(content or b'', 'html.parser')
+    for element in soup(['script', 'style', 'noscript']):
+        element.decompose()
+    text = ' '.join(soup.get_text(' ').split())
+    links = [urljoin(base_url, a['href']) for a in soup.find_all('a', href=True)]
+    return text, links
+
+
+def prescreen(text: str) -> Dict[str, int]:
+    """Число упоминаний каждого CAT-продукта в тексте (только найденные)"""
+    return _PRODUCT_MATCHER.count(text)
+
+
+def _confidence(hits: Dict[str, int], pages_with_hits: int) -> float:
+    # Одно упоминание на одной странице - 0.6; больше упоминаний и страниц - выше уверенность
+    if not hits:
+        return 0.0
+    return min(1.0, 0.4 + 0.1 * sum(hits.values()) + 0.1 * pages_with_hits)
+
+
+class SiteAnalyzer:
+    """
+    Анализатор сайтов компаний
+
+    Сайты обходятся параллельно (не более concurrency одновременных
+    запросов в одном вызове analyze_many), частота обращений к каждому
+    сайту ограничивается общим планировщиком RequestScheduler.
+
+    Пример:
+        analyzer = SiteAnalyzer(max_depth=1, max_pages=5)
+        result = analyzer.analyze('www.example.ru')
+        print(result.products, result.confidence)
+    """
+
+    def __init__(self, cache_path: str = 'site_cache.sqlite', max_depth: int = 1, max_pages: int = 5,
+                 concurrency: int = 4, scheduler: Optional[RequestScheduler] = None,
+                 scorer: Optional[Scorer] = None, page_ttl: float = 7 * 24 * 3600, timeout: float = 10):
+        """
+        Args:
+            cache_path: Файл кэша страниц и результатов (':memory:' - в памяти)
+            max_depth: Глубина обхода ссылок от главной страницы (0 - только главная)
+            max_pages: Сколько страниц одного сайта загружать не больше
+            concurrency: Одновременных запросов
+            scheduler: Общий планировщик запросов (лимит частоты на хост и повторы)
+            scorer: Необязательная оценка найденного моделью:
+                    scorer(текст, {продукт: число упоминаний}) -> уверенность 0..1
+            page_ttl: Сколько секунд страница считается свежей
+            timeout: Таймаут запроса в секундах
+        """
+        self.max_depth = max_depth
+        self.max_pages = max(1, max_pages)
+        self.concurrency = concurrency
+        # Сайты компаний - разные хосты, лимит действует на каждый отдельно.
+        # Недоступный сайт не стоит долго ждать: не больше одного повтора
+        self.scheduler = scheduler or RequestScheduler(rate=2.0, burst=2, max_retries=1, backoff_base=0.5)
+        self.scorer = scorer
+        self.timeout = timeout
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                          '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8',
+        }
+        # Страницы всех сайтов кэшируются на page_ttl
+        self.cache = ResponseCache(cache_path, ttls={}, default_ttl=page_ttl)
+        self.session = get_session('sites', headers=self.headers, cache=self.cache, pool_size=concurrency)
+        # Результаты анализа хранятся в том же файле, что и страницы (ResponseCache.put_result)
+
+    # --- Кэш результатов ---
+
+    def _saved_result(self, site: str, content_hash: str) -> Optional[SiteAnalysis]:
+        saved = self.cache.get_result('site_analysis', site, content_hash)
+        return SiteAnalysis.from_dict(saved) if saved is not None else None
+
+    def _save_result(self, result: SiteAnalysis) -> None:
+        self.cache.put_result('site_analysis', result.site, result.content_hash, result.as_dict())
+
+    # --- Обход ---
+
+    @staticmethod
+    def normalize_site(site: str) -> str:
+        """'https://www.Example.ru/' -> 'www.example.ru'"""
+        site = (site or '').strip()
+        if not site:
+            return ''
+        return urlsplit(site if '//' in site else f'//{site}').netloc.lower()
+
+    async def _fetch_page(self, fetcher: AsyncFetcher, url: str) -> Optional[requests.Response]:
+        try:
+            response = await fetcher.fetch(url)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            METRICS.incr('site.errors')
+            log(f"   Сайт недоступен: {url} ({e})")
+            return None
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            return None
+        return response
+
+    async def _crawl(self, fetcher: AsyncFetcher, site: str) -> List[Tuple[str, bytes]]:
+        """Страницы сайта (адрес, тело) в порядке обхода в ширину"""
+        # Сначала https, затем http
+        start = None
+        for scheme in ('https', 'http'):
+            start = await self._fetch_page(fetcher, f'{scheme}://{site}/')
+            if start is not None:
+                break
+        if start is None:
+            return []
+
+        pages: List[Tuple[str, bytes]] = []
+        seen = {urldefrag(start.url)[0]}
+        level = [start]
+        for depth in range(self.max_depth + 1):
+            next_urls: List[str] = []
+            for response in level:
+                if len(pages) >= self.max_pages:
+                    break
+                pages.append((response.url, response.content))
+                if depth == self.max_depth:
+                    continue
+                _, links = await asyncio.to_thread(extract_text_and_links, response.content, response.url)
+                host = urlsplit(response.url).netloc
+                for link in links:
+                    link = urldefrag(link)[0]
+                    parts = urlsplit(link)
+                    if parts.scheme not in ('http', 'https') or parts.netloc != host:
+                        continue
+                    if link in seen or _SKIP_LINK_RE.search(parts.path):
+                        continue
+                    seen.add(link)
+                    next_urls.append(link)
+            budget = self.max_pages - len(pages)
+            if budget <= 0 or not next_urls:
+                break
+            # Страницы вакансий и услуг - в первую очередь
+            next_urls.sort(key=lambda url: not _PRIORITY_LINK_RE.search(url))
+            fetched = await asyncio.gather(*(self._fetch_page(fetcher, url) for url in next_urls[:budget]))
+            level = [response for response in fetched if response is not None]
+        return pages
+
+    def _score(self, site: str, pages: List[Tuple[str, bytes]]) -> SiteAnalysis:
+        hits: Dict[str, int] = {}
+        pages_with_hits = 0
+        texts = []
+        for url, content in pages:
+            text, _ = extract_text_and_links(content, url)
+            page_hits = prescreen(text)
+            if page_hits:
+                pages_with_hits += 1
+                texts.append(text)
+            for product, count in page_hits.items():
+                hits[product] = hits.get(product, 0) + count
+        confidence = _confidence(hits, pages_with_hits)
+        # Модель - только для сайтов, прошедших быструю проверку
+        if hits and self.scorer is not None:
+            confidence = float(self.scorer(' '.join(texts), hits))
+        products = tuple(product for product in CAT_PRODUCTS if product in hits)
+        return SiteAnalysis(site=site, accessible=True, confidence=confidence, products=products,
+                            pages=len(pages))
+
+    async def analyze_async(self, site: str, fetcher: Optional[AsyncFetcher] = None) -> SiteAnalysis:
+        """
+        Анализирует один сайт
+
+        Args:
+            site: Адрес сайта в любом виде ('www.example.ru', 'https://example.ru/')
+            fetcher: Общий загрузчик (для analyze_many); по умолчанию создается свой
+
+        Returns:
+            SiteAnalysis; accessible=False, если сайт не указан или не открылся
+        """
+        started = time.perf_counter()
+        site = self.normalize_site(site)
+        today = date.today().isoformat()
+        if not site:
+            return SiteAnalysis(site='', analyzed_at=today)
+        fetcher = fetcher or AsyncFetcher(self.session, concurrency=self.concurrency,
+                                          scheduler=self.scheduler, timeout=self.timeout)
+        with METRICS.timer('site_crawl'):
+            pages = await self._crawl(fetcher, site)
+        if not pages:
+            return SiteAnalysis(site=site, analyzed_at=today, duration=time.perf_counter() - started)
+
+        digest = hashlib.sha256()
+        for url, content in sorted(pages):
+            digest.update(url.encode('utf-8'))
+            digest.update(hashlib.sha256(content).digest())
+        content_hash = digest.hexdigest()
+
+        saved = self._saved_result(site, content_hash)
+        if saved is not None:
+            METRICS.incr('site_result.hit')
+            saved.duration = time.perf_counter() - started
+            return saved
+        METRICS.incr('site_result.miss')
+        with METRICS.timer('site_score'):
+            result = await asyncio.to_thread(self._score, site, pages)
+        result.analyzed_at = today
+        result.content_hash = content_hash
+        result.duration = time.perf_counter() - started
+        self._save_result(result)
+        return result
+
+    def analyze(self, site: str) -> SiteAnalysis:
+        """Синхронная обертка над analyze_async (для потоков EnrichmentPipeline)"""
+        return asyncio.run(self.analyze_async(site))
+
+    async def analyze_many_async(self, sites: List[str]) -> List[SiteAnalysis]:
+        """Анализирует несколько сайтов параллельно; результаты в порядке sites"""
+        fetcher = AsyncFetcher(self.session, concurrency=self.concurrency,
+                               scheduler=self.scheduler, timeout=self.timeout)
+        return list(await asyncio.gather(*(self.analyze_async(site, fetcher) for site in sites)))
+
+    def analyze_many(self, sites: List[str]) -> List[SiteAnalysis]:
+        return asyncio.run(self.analyze_many_async(sites))
+
+    def close(self) -> None:
+        self.cache.close()
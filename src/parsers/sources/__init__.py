@@ -0,0 +1,15 @@
+"""
+Источники вакансий
+
+Адаптеры регистрируются в реестре при импорте модулей пакета;
+новый сайт добавляется наследником VacancySource с @register_source.
+"""
+from .base import VacancySource, available_sources, create_source, is_last_page, page_digest, register_source
+from .discovery import Discovery
+from .hh import HHSource, parse_hh_employers, parse_hh_vacancies
+from .superjob import SuperJobSource
+
+__all__ = [
+    'VacancySource', 'available_sources', 'create_source', 'is_last_page', 'page_digest', 'register_source',
+    'Discovery', 'HHSource', 'SuperJobSource', 'parse_hh_employers', 'parse_hh_vacancies',
+]
@@ -0,0 +1,142 @@
+"""
+Интерфейс источника вакансий и реестр источников
+"""
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Type
+
+import requests
+
+from ..async_fetch import AsyncFetcher
+from ..http_cache import ResponseCache
+from ..metrics import log
+from ..parse_pool import ParsePool
+from ..records import Source
+from ..scheduler import RequestScheduler
+
+# Имя источника -> класс адаптера
+_SOURCES: Dict[str, Type['VacancySource']] = {}
+
+
+def page_digest(vacancies: List[Tuple[str, str]]) -> str:
+    """Отпечаток страницы выдачи: сравнивается с отпечатком предыдущей страницы"""
+    return hashlib.sha256(json.dumps(vacancies, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def is_last_page(vacancies: List[Tuple[str, str]], previous_digest: Optional[str]) -> bool:
+    """
+    Выдача закончилась: страница пустая или повторяет предыдущую
+
+    Некоторые сайты на номер страницы за пределами выдачи отдают последнюю
+    страницу еще раз, поэтому одного признака пустой страницы недостаточно.
+    """
+    return not vacancies or page_digest(vacancies) == previous_digest
+
+
+def register_source(cls: Type['VacancySource']) -> Type['VacancySource']:
+    """Декоратор: добавляет адаптер в реестр под именем cls.name"""
+    _SOURCES[cls.name] = cls
+    return cls
+
+
+def available_sources() -> List[str]:
+    return sorted(_SOURCES)
+
+
+def create_source(name: str, **kwargs) -> 'VacancySource':
+    """
+    Создает адаптер по имени из реестра
+
+    Args:
+        name: Имя источника ('superjob', 'hh', ...)
+        **kwargs: Параметры конструктора VacancySource
+    """
+    if name not in _SOURCES:
+        raise ValueError(f"Неизвестный источник вакансий: {name} (доступны: {', '.join(available_sources())})")
+    return _SOURCES[name](**kwargs)
+
+
+class VacancySource(ABC):
+    """
+    Адаптер сайта с вакансиями
+
+    Наследник задает name, source, regions и реализует session(),
+    build_url() и parse_page(); обход страниц выдачи, лимиты и кэш -
+    общие. Адаптер без одного из этих методов не создается.
+    Регионы задаются общими именами ('moscow', 'spb'), а regions
+    переводит их в коды конкретного сайта.
+    """
+
+    name: str = ''
+    source: Source
+    # Общее имя региона -> код региона на сайте
+    regions: Dict[str, object] = {}
+
+    def __init__(self, concurrency: int = 4, scheduler: Optional[RequestScheduler] = None,
+                 cache: Optional[ResponseCache] = None, parse_pool: Optional[ParsePool] = None,
+                 http2: bool = False):
+        """
+        Args:
+            concurrency: Одновременных запросов к сайту
+            scheduler: Общий планировщик запросов (лимит частоты на хост и повторы)
+            cache: Кэш HTTP-ответов
+            parse_pool: Пул процессов для разбора страниц
+            http2: Использовать HTTP/2, если доступен
+        """
+        self.concurrency = concurrency
+        self.scheduler = scheduler or RequestScheduler(rate=1.0)
+        self.cache = cache
+        self.parse_pool = parse_pool
+        self.http2 = http2
+        self._fetcher: Optional[AsyncFetcher] = None
+
+    @abstractmethod
+    def session(self) -> requests.Session:
+        """HTTP-сессия сайта (общая для всех запросов адаптера)"""
+
+    @abstractmethod
+    def build_url(self, keyword: str, page: int, region: object) -> str:
+        """Адрес страницы выдачи (page начинается с 1)"""
+
+    @abstractmethod
+    async def parse_page(self, content: bytes, max_results: int) -> List[Tuple[str, str]]:
+        """Вакансии со страницы выдачи: пары (название компании, текст вакансии)"""
+
+    def fetcher(self) -> AsyncFetcher:
+        # Один загрузчик на источник: ограничение concurrency общее
+        # для всех слов и регионов этого сайта
+        if self._fetcher is None:
+            self._fetcher = AsyncFetcher(session=self.session(), concurrency=self.concurrency,
+                                         scheduler=self.scheduler)
+        return self._fetcher
+
+    async def iter_pages(self, keyword: str, region: str, max_pages: int = 5,
+                         max_results: int = 30) -> AsyncIterator[List[Tuple[str, str]]]:
+        """
+        Обходит страницы выдачи по одному слову в одном регионе
+
+        Обход заканчивается на пустой странице, на повторе предыдущей
+        страницы, после max_pages страниц или при ошибке.
+
+        Yields:
+            Списки вакансий (название компании, текст) со страниц по порядку
+        """
+        if region not in self.regions:
+            log(f"   {self.source.value}: регион '{region}' не поддерживается")
+            return
+        fetcher = self.fetcher()
+        previous_digest = None
+        for page in range(1, max_pages + 1):
+            url = self.build_url(keyword, page, self.regions[region])
+            try:
+                response = await fetcher.fetch(url)
+                response.raise_for_status()
+                vacancies = await self.parse_page(response.content, max_results)
+            except Exception as e:
+                log(f"   {self.source.value}: ошибка для '{keyword}' ({region}), страница {page}: {e}")
+                return
+            if is_last_page(vacancies, previous_digest):
+                return
+            previous_digest = page_digest(vacancies)
+            yield vacancies
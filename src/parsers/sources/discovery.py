@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from ..async_fetch import iter_async
+from ..keyword_matcher import KeywordMatcher
+from ..metrics import METRICS, log
+from ..normalize import make_company_id
+from ..records import CompanyRecord, keyword_bit
+from .base import VacancySource
+
+
+class Discovery:
+    """
+    Поиск компаний сразу на нескольких сайтах и в нескольких регионах
+
+    Каждая тройка (источник, регион, слово) обходится отдельной задачей,
+    и все задачи работают одновременно. Лимит частоты действует на каждый
+    хост отдельно, поэтому новый источник добавляет охват почти без роста
+    общего времени. Результаты сливаются в один поток без повторов.
+
+    Если передан matcher, свидетельством считаются ключевые слова,
+    действительно найденные в тексте вакансии, а не только слово
+    запроса, по которому она попала в выдачу.
+
+    Отданные записи больше не изменяются. Свидетельства всех появлений
+    компании копятся в компактной карте "ключ компании -> маска слов"
+    (см. keyword_bit); после окончания обхода evidence() отдает итоговую
+    маску, и конвейер объединяет ее с записью перед записью строки.
+    Сами записи после обработки не удерживаются в памяти.
+    """
+
+    def __init__(self, sources: List[VacancySource], regions: Optional[List[str]] = None,
+                 buffer: int = 16, matcher: Optional[KeywordMatcher] = None):
+        """
+        Args:
+            sources: Адаптеры сайтов (см. create_source)
+            regions: Общие имена регионов, по умолчанию ['moscow']
+            buffer: Размер очереди между задачами обхода и потребителем
+            matcher: Поиск ключевых слов в тексте вакансий (None - свидетельство
+                     только слово запроса)
+        """
+        self.sources = list(sources)
+        self.regions = list(regions or ['moscow'])
+        self.buffer = buffer
+        self.matcher = matcher
+        # Ключ компании -> маска пар (источник, слово) всех ее появлений
+        self._masks: Dict[str, int] = {}
+        self._masks_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Сколько разных компаний найдено"""
+        with self._masks_lock:
+            return len(self._masks)
+
+    def evidence(self, company_id: str) -> int:
+        """
+        Маска свидетельств компании на текущий момент (0 - компания не встречалась)
+
+        Безопасно вызывать из других потоков, пока идет поиск; окончательной
+        маска становится, когда закончился обход aiter_companies/iter_companies.
+        """
+        with self._masks_lock:
+            return self._masks.get(company_id, 0)
+
+    async def aiter_companies(self, keywords: List[str], max_pages: int = 5, max_results: int = 30,
+                              max_companies: Optional[int] = None) -> AsyncIterator[CompanyRecord]:
+        """
+        Потоковый поиск компаний по всем источникам и регионам
+
+        Компания отдается при первом появлении со свидетельствами этого
+        появления. Более поздние появления на других сайтах и по другим
+        словам добавляются только в карту evidence(), отданная запись
+        не меняется.
+
+        Args:
+            keywords: Ключевые слова для поиска вакансий
+            max_pages: Сколько страниц выдачи смотреть на одно слово
+            max_results: Сколько вакансий просматривать на странице
+            max_companies: Остановиться после стольких компаний (None - без лимита)
+
+        Yields:
+            Записи компаний (CompanyRecord)
+        """
+        found = asyncio.Queue(maxsize=max(1, self.buffer))
+        done = object()
+        # Порядок битов задает порядок слов в cat_evidence: регистрируем пары
+        # (источник, слово) заранее, по порядку источников и слов, а не по
+        # тому, какая страница загрузилась первой
+        words = list(dict.fromkeys(list(keywords) + list(self.matcher.keywords if self.matcher else [])))
+        for source in self.sources:
+            for word in words:
+                keyword_bit((source.source, word))
+
+        async def walk(source: VacancySource, region: str, keyword: str) -> None:
+            try:
+                async for vacancies in source.iter_pages(keyword, region, max_pages, max_results):
+                    METRICS.incr(f'discovery.pages.{source.name}')
+                    for company_name, text in vacancies:
+                        await found.put((company_name, self._evidence(keyword, text), source))
+            except Exception as e:
+                # Ошибка одной задачи не должна останавливать остальные
+                log(f"   {source.name}: ошибка поиска '{keyword}' ({region}): {e}")
+            # Маркер окончания ставится только при нормальном завершении:
+            # при отмене задачи очередь уже никто не читает
+            await found.put(done)
+
+        jobs = [(source, region, keyword) for source in self.sources
+                for region in self.regions for keyword in keywords]
+        log(f"🔍 Поиск: {len(self.sources)} источн., {len(self.regions)} регион., "
+            f"{len(keywords)} слов, до {max_pages} стр.")
+        tasks = [asyncio.create_task(walk(*job)) for job in jobs]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                item = await found.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                company_name, evidence, source = item
+                company_id = make_company_id(company_name)
+                mask = 0
+                for keyword in evidence:
+                    mask |= keyword_bit((source.source, keyword))
+                with self._masks_lock:
+                    known = self._masks.get(company_id)
+                    if known is None and max_companies is not None and len(self._masks) >= max_companies:
+                        break
+                    self._masks[company_id] = (known or 0) | mask
+                if known is not None:
+                    continue
+                METRICS.incr(f'discovery.companies.{source.name}')
+                yield CompanyRecord(name=company_name, source=source.source, keywords=mask)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _evidence(self, keyword: str, text: str) -> List[str]:
+        # Слова, найденные в тексте вакансии; если в коротком тексте выдачи
+        # их нет, остается слово запроса (сайт нашел его в полном описании)
+        if self.matcher is None:
+            return [keyword]
+        found = self.matcher.find(text)
+        METRICS.incr('discovery.evidence.text' if found else 'discovery.evidence.query')
+        return found or [keyword]
+
+    def iter_companies(self, keywords: List[str], max_pages: int = 5, max_results: int = 30,
+                       max_companies: Optional[int] = None) -> Iterator[CompanyRecord]:
+        """Синхронная обертка над aiter_companies (поиск идет в отдельном потоке)"""
+        return iter_async(lambda: self.aiter_companies(keywords, max_pages, max_results, max_companies),
+                          buffer=self.buffer)
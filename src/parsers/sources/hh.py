@@ -0,0 +1,84 @@
+import json
+import re
+from typing import List, Tuple, Union
+
+import requests
+
+from ..metrics import METRICS
+from ..records import Source
+from ..transport import get_session
+from .base import VacancySource, register_source
+
+
+# Подсветка найденных слов в описаниях: <highlighttext>Trados</highlighttext>
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def parse_hh_vacancies(page: Union[str, bytes], max_results: int) -> List[Tuple[str, str]]:
+    """
+    Вакансии из ответа API hh.ru (/vacancies): работодатель и текст вакансии
+
+    Текст - название вакансии и фрагменты требований и обязанностей
+    из snippet. Вакансии без работодателя и анонимные работодатели
+    пропускаются.
+
+    Args:
+        page: JSON ответа (строка или байты)
+        max_results: Сколько вакансий просматривать
+
+    Returns:
+        Список пар (название работодателя, текст вакансии) в порядке вакансий
+    """
+    data = json.loads(page)
+    vacancies = []
+    for item in (data.get('items') or [])[:max_results]:
+        employer = item.get('employer') or {}
+        name = (employer.get('name') or '').strip()
+        # У скрытых (анонимных) работодателей нет id
+        if not name or not employer.get('id'):
+            continue
+        snippet = item.get('snippet') or {}
+        parts = [item.get('name'), snippet.get('requirement'), snippet.get('responsibility')]
+        text = _TAG_RE.sub('', ' '.join(part for part in parts if part))
+        vacancies.append((name, text))
+    return vacancies
+
+
+def parse_hh_employers(page: Union[str, bytes], max_results: int) -> List[str]:
+    """Названия работодателей из ответа API hh.ru в порядке вакансий"""
+    return [name for name, _ in parse_hh_vacancies(page, max_results)]
+
+
+@register_source
+class HHSource(VacancySource):
+    """
+    hh.ru через открытый API поиска вакансий (ключ не нужен)
+
+    Страницы API нумеруются с нуля, на странице до PER_PAGE вакансий.
+    """
+
+    name = 'hh'
+    source = Source.HH
+    regions = {'moscow': 1, 'spb': 2}
+    API_URL = "https://api.hh.ru/vacancies"
+    PER_PAGE = 50
+
+    headers = {
+        # API hh.ru требует осмысленный User-Agent с названием приложения
+        'User-Agent': 'Parsing_CAT_companies/1.0',
+        'Accept': 'application/json',
+    }
+
+    def session(self) -> requests.Session:
+        return get_session('hh', headers=self.headers, cache=self.cache,
+                           pool_size=self.concurrency, http2=self.http2)
+
+    def build_url(self, keyword: str, page: int, region: object) -> str:
+        return (f"{self.API_URL}?text={requests.utils.quote(keyword)}&area={region}"
+                f"&page={page - 1}&per_page={self.PER_PAGE}")
+
+    async def parse_page(self, content: bytes, max_results: int) -> List[Tuple[str, str]]:
+        with METRICS.timer('parse'):
+            if self.parse_pool is not None:
+                return await self.parse_pool.run_async(parse_hh_vacancies, content, max_results)
+            return parse_hh_vacancies(content, max_results)
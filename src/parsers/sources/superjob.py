@@ -0,0 +1,31 @@
+from typing import List, Tuple
+
+import requests
+
+from ..records import Source
+from ..superjob_parser import SuperJobParser
+from .base import VacancySource, register_source
+
+
+@register_source
+class SuperJobSource(VacancySource):
+    """SuperJob: страницы выдачи разбираются через SuperJobParser"""
+
+    name = 'superjob'
+    source = Source.SUPERJOB
+    regions = {'moscow': 4, 'spb': 14}
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.parser = SuperJobParser(concurrency=self.concurrency, cache=self.cache,
+                                     scheduler=self.scheduler, http2=self.http2,
+                                     parse_pool=self.parse_pool)
+
+    def session(self) -> requests.Session:
+        return self.parser._make_session()
+
+    def build_url(self, keyword: str, page: int, region: object) -> str:
+        return self.parser._build_search_url(keyword, page, town=region)
+
+    async def parse_page(self, content: bytes, max_results: int) -> List[Tuple[str, str]]:
+        return await self.parser._parse_vacancies_async(content, max_results)
@@ -1,9 +1,19 @@
 import requests
 from bs4 import BeautifulSoup
-import time
 import re
 import csv
-from typing import List, Dict
+import asyncio
+from typing import AsyncIterator, Iterator, List, Dict, Optional, Tuple, Union
+
+from .async_fetch import AsyncFetcher
+from .fast_extract import FastExtractError, extract_superjob_company_names, extract_superjob_vacancies
+from .http_cache import ResponseCache
+from .metrics import METRICS, log
+from .normalize import make_company_id
+from .parse_pool import ParsePool
+from .records import CompanyRecord
+from .scheduler import RequestScheduler
+from .transport import get_session
 
 # Класс-заглушка для Rusprofile, пока не реализован парсинг
 class RusprofileParser:
@@ -23,72 +33,290 @@ class RusprofileParser:
             'okved_main': '62.01'
         }
 
+def parse_company_names(page: Union[str, bytes], max_results: int, fast_parse: bool = True) -> List[str]:
+    """
+    Извлекает названия компаний из страницы результатов поиска
+    
+    Карточки вакансий разбираются через lxml, при ошибке быстрого
+    разбора - через BeautifulSoup; вакансии скрытых компаний пропускаются.
+    
+    Args:
+        page: HTML страницы вакансий (строка или байты ответа в UTF-8)
+        max_results: Сколько вакансий просматривать
+        fast_parse: Разбирать через lxml (BeautifulSoup - запасной вариант)
+        
+    Returns:
+        Список названий компаний в порядке вакансий
+    """
+    html = page.decode('utf-8', errors='replace') if isinstance(page, bytes) else page
+    if fast_parse:
+        try:
+            return extract_superjob_company_names(html, max_results)
+        except FastExtractError:
+            pass
+    return [company_name for _, company_name in _soup_vacancy_items(html, max_results)]
+
+def parse_vacancies(page: Union[str, bytes], max_results: int, fast_parse: bool = True) -> List[Tuple[str, str]]:
+    """
+    Извлекает вакансии из страницы результатов поиска: название компании
+    и текст карточки (должность и описание) для поиска ключевых слов
+    
+    Args:
+        page: HTML страницы вакансий (строка или байты ответа в UTF-8)
+        max_results: Сколько вакансий просматривать
+        fast_parse: Разбирать через lxml (BeautifulSoup - запасной вариант)
+    
+    Returns:
+        Список пар (название компании, текст вакансии) в порядке вакансий
+    """
+    html = page.decode('utf-8', errors='replace') if isinstance(page, bytes) else page
+    if fast_parse:
+        try:
+            return extract_superjob_vacancies(html, max_results)
+        except FastExtractError:
+            pass
+    return [(company_name, ' '.join(item.get_text(' ').split()))
+            for item, company_name in _soup_vacancy_items(html, max_results)]
+
+def _soup_vacancy_items(html: str, max_results: int) -> Iterator[Tuple[object, str]]:
+    # Разбор через BeautifulSoup: карточки вакансий с названием компании
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Ищем вакансии (проверьте актуальность селекторов!)
+    vacancy_items = soup.find_all('div', class_='f-test-search-result-item')
+    if not vacancy_items:
+        vacancy_items = soup.find_all('div', {'class': re.compile(r'.*search-result-item.*')})
+    
+    for item in vacancy_items[:max_results]:
+        company_block = item.find('span', class_='f-test-text-vacancy-item-company-name')
+        if not company_block:
+            continue
+        
+        company_name = company_block.get_text(strip=True)
+        if not company_name or company_name.lower() == 'скрыто':
+            continue
+        yield item, company_name
+
 class SuperJobParser:
     BASE_URL = "https://www.superjob.ru/vakansii/"
+    # Регион поиска по умолчанию (4 - Москва)
+    DEFAULT_TOWN = 4
     
-    def __init__(self):
+    def __init__(self, concurrency: int = 4, rate: float = 1.0, burst: int = 1,
+                 cache: Optional[ResponseCache] = None, fast_parse: bool = True,
+                 scheduler: Optional[RequestScheduler] = None, http2: bool = False,
+                 parse_pool: Optional[ParsePool] = None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        # Кэш HTTP-ответов (None - всегда загружать из сети)
+        self.cache = cache
+        # Разбор страниц через lxml (BeautifulSoup - запасной вариант)
+        self.fast_parse = fast_parse
+        # Число одновременных запросов в асинхронном режиме
+        self.concurrency = concurrency
+        # Лимит частоты и повторы; rate/burst - начальная частота, если
+        # общий планировщик не передан
+        self.scheduler = scheduler or RequestScheduler(rate=rate, burst=burst)
+        # HTTP/2 через httpx (если установлен) вместо HTTP/1.1
+        self.http2 = http2
+        # Пул процессов для разбора страниц (None - разбор в текущем потоке)
+        self.parse_pool = parse_pool
+    
+    @staticmethod
+    def make_company_id(company_name: str) -> str:
+        """Нормализованный ключ компании для дедупликации"""
+        return make_company_id(company_name)
+    
+    def _make_session(self) -> requests.Session:
+        # Общая сессия с пулом по числу одновременных запросов:
+        # соединения переиспользуются между вызовами и экземплярами парсера
+        return get_session('superjob', headers=self.headers, cache=self.cache,
+                           pool_size=self.concurrency, http2=self.http2)
     
-    def search_companies_by_keywords(self, keywords: List[str], max_results: int = 30) -> List[Dict]:
+    def _build_search_url(self, keyword: str, page: int = 1, town: Optional[int] = None) -> str:
+        search_query = keyword.replace(' ', '+')
+        url = f"{self.BASE_URL}?keywords={search_query}&town={town or self.DEFAULT_TOWN}"
+        return url if page <= 1 else f"{url}&page={page}"
+    
+    def _parse_company_names(self, page: Union[str, bytes], max_results: int) -> List[str]:
+        """
+        Извлекает названия компаний из страницы результатов поиска
+        
+        Если задан parse_pool, страница разбирается в отдельном процессе.
+        
+        Args:
+            page: HTML страницы вакансий (строка или байты ответа)
+            max_results: Сколько вакансий просматривать
+            
+        Returns:
+            Список названий компаний в порядке вакансий
+        """
+        with METRICS.timer('parse'):
+            if self.parse_pool is not None:
+                return self.parse_pool.run(parse_company_names, page, max_results, self.fast_parse)
+            return parse_company_names(page, max_results, self.fast_parse)
+    
+    async def _parse_vacancies_async(self, page: bytes, max_results: int) -> List[Tuple[str, str]]:
+        """Пары (название компании, текст вакансии); с пулом - в отдельном процессе"""
+        with METRICS.timer('parse'):
+            if self.parse_pool is None:
+                return parse_vacancies(page, max_results, self.fast_parse)
+            return await self.parse_pool.run_async(parse_vacancies, page, max_results, self.fast_parse)
+    
+    def _parse_pages(self, pages: List[bytes], max_results: int) -> List[Union[List[str], Exception]]:
+        """
+        Разбор нескольких страниц; с пулом - пачками по chunksize
+
+        Returns:
+            Названия компаний для каждой страницы или исключение,
+            если страница не разобралась (остальные страницы не теряются)
+        """
+        if self.parse_pool is None:
+            parsed = []
+            for page in pages:
+                try:
+                    parsed.append(self._parse_company_names(page, max_results))
+                except Exception as e:
+                    parsed.append(e)
+            return parsed
+        with METRICS.timer('parse_batch'):
+            try:
+                return self.parse_pool.map(parse_company_names, pages, [max_results] * len(pages),
+                                           [self.fast_parse] * len(pages), return_exceptions=True)
+            except Exception as e:
+                # Сломался сам пул процессов - ошибка у каждой страницы пачки
+                return [e] * len(pages)
+
+    def _collect(self, fetched: List[Tuple[str, bytes]],
+                 parsed: List[Union[List[str], Exception]]) -> List[CompanyRecord]:
+        # Компании в порядке ключевых слов; страница с ошибкой разбора пропускается
         companies = {}
-        session = requests.Session()
+        for (keyword, _), names in zip(fetched, parsed):
+            if isinstance(names, Exception):
+                METRICS.incr('parse.errors')
+                log(f"   Ошибка разбора для '{keyword}': {names}")
+                continue
+            for company_name in names:
+                self._add_company(companies, company_name, keyword)
+        return self._finalize(companies)
+    
+    @staticmethod
+    def _new_company(company_name: str, keyword: str) -> CompanyRecord:
+        # Генерируем ИНН для теста (в реальности нужно искать на rusprofile)
+        fake_inn = ''.join([str(ord(c) % 10) for c in company_name[:10]]).ljust(10, '0')[:10]
+        company = CompanyRecord(name=company_name, inn=fake_inn)  # Тестовый ИНН
+        company.add_keyword(keyword)
+        return company
+    
+    def _add_company(self, companies: Dict[str, CompanyRecord], company_name: str, keyword: str) -> None:
+        company_id = self.make_company_id(company_name)
+        
+        if company_id not in companies:
+            companies[company_id] = self._new_company(company_name, keyword)
+        else:
+            companies[company_id].add_keyword(keyword)
+    
+    @staticmethod
+    def _finalize(companies: Dict[str, CompanyRecord]) -> List[CompanyRecord]:
+        # Преобразуем в список
+        return list(companies.values())
+    
+    def search_companies_by_keywords(self, keywords: List[str], max_results: int = 30) -> List[CompanyRecord]:
+        session = self._make_session()
         
+        # Сначала загружаем страницы, затем разбираем их одной пачкой
+        # (с parse_pool - параллельно в нескольких процессах)
+        fetched = []
         for keyword in keywords:
-            print(f"🔍 Поиск по слову: '{keyword}'...")
-            search_query = keyword.replace(' ', '+')
-            url = f"{self.BASE_URL}?keywords={search_query}&town=4"
+            log(f"🔍 Поиск по слову: '{keyword}'...")
+            url = self._build_search_url(keyword)
             
             try:
-                response = session.get(url, headers=self.headers, timeout=10)
+                response = self.scheduler.request(session, 'GET', url, timeout=10)
                 response.raise_for_status()
-                response.encoding = 'utf-8'
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Ищем вакансии (проверьте актуальность селекторов!)
-                vacancy_items = soup.find_all('div', class_='f-test-search-result-item')
-                if not vacancy_items:
-                    vacancy_items = soup.find_all('div', {'class': re.compile(r'.*search-result-item.*')})
-                
-                for item in vacancy_items[:max_results]:
-                    company_block = item.find('span', class_='f-test-text-vacancy-item-company-name')
-                    if not company_block:
-                        continue
-                    
-                    company_name = company_block.get_text(strip=True)
-                    if not company_name or company_name.lower() == 'скрыто':
-                        continue
-                    
-                    # Генерируем ИНН для теста (в реальности нужно искать на rusprofile)
-                    company_id = re.sub(r'\W+', '_', company_name.lower())
-                    fake_inn = ''.join([str(ord(c) % 10) for c in company_name[:10]]).ljust(10, '0')[:10]
-                    
-                    if company_id not in companies:
-                        companies[company_id] = {
-                            'name': company_name,
-                            'inn': fake_inn,  # Тестовый ИНН
-                            'source': 'superjob.ru',
-                            'cat_evidence': f'Вакансия: {keyword}',
-                            'keywords_found': [keyword]
-                        }
-                    else:
-                        if keyword not in companies[company_id]['keywords_found']:
-                            companies[company_id]['keywords_found'].append(keyword)
-                            companies[company_id]['cat_evidence'] += f', {keyword}'
-                
-                time.sleep(1)
-                
+                fetched.append((keyword, response.content))
             except Exception as e:
-                print(f"   Ошибка: {e}")
+                log(f"   Ошибка: {e}")
                 continue
         
-        # Преобразуем в список
-        result_list = list(companies.values())
-        for company in result_list:
-            company.pop('keywords_found', None)
+        parsed = self._parse_pages([content for _, content in fetched], max_results)
+        return self._collect(fetched, parsed)
+    
+    async def search_companies_by_keywords_async(self, keywords: List[str],
+                                                 max_results: int = 30) -> List[CompanyRecord]:
+        """
+        Параллельный поиск компаний по ключевым словам
+        
+        Страницы всех ключевых слов загружаются одновременно, а вместо
+        паузы после каждого запроса действует лимит частоты на хост.
+        Результат совпадает с search_companies_by_keywords.
         
-        return result_list
+        Args:
+            keywords: Ключевые слова для поиска вакансий
+            max_results: Сколько вакансий просматривать на страницу
+            
+        Returns:
+            Список уникальных компаний (CompanyRecord)
+        """
+        fetcher = AsyncFetcher(session=self._make_session(), concurrency=self.concurrency,
+                               scheduler=self.scheduler)
+        
+        urls = [self._build_search_url(keyword) for keyword in keywords]
+        log(f"🔍 Параллельный поиск по {len(keywords)} словам...")
+        results = await fetcher.fetch_all(urls)
+        
+        # Обрабатываем ответы в порядке ключевых слов, чтобы
+        # порядок компаний и cat_evidence совпадал с обычным режимом
+        fetched = []
+        for keyword, (url, response, error) in zip(keywords, results):
+            if error is not None:
+                log(f"   Ошибка для '{keyword}': {error}")
+                continue
+            fetched.append((keyword, response.content))
+        
+        pages = [content for _, content in fetched]
+        if self.parse_pool is not None:
+            # Все страницы уже загружены - разбираем пачкой в пуле процессов
+            parsed = await asyncio.to_thread(self._parse_pages, pages, max_results)
+        else:
+            parsed = self._parse_pages(pages, max_results)
+        return self._collect(fetched, parsed)
+    
+    def _discovery(self):
+        # Потоковый поиск общий для всех сайтов (parsers.sources.Discovery).
+        # Импорт здесь: адаптер SuperJobSource сам импортирует этот модуль
+        from .sources import Discovery, SuperJobSource
+        source = SuperJobSource(concurrency=self.concurrency, scheduler=self.scheduler, cache=self.cache,
+                                parse_pool=self.parse_pool, http2=self.http2)
+        source.parser.fast_parse = self.fast_parse
+        return Discovery([source], buffer=max(1, self.concurrency) * 2)
+    
+    async def aiter_companies(self, keywords: List[str], max_pages: int = 5, max_results: int = 30,
+                              max_companies: Optional[int] = None) -> AsyncIterator[CompanyRecord]:
+        """
+        Потоковый поиск компаний по всем страницам выдачи SuperJob (Москва)
+        
+        То же, что Discovery с одним источником SuperJobSource: ключевые слова
+        обходятся параллельно, страницы одного слова - по порядку, каждая
+        новая компания отдается сразу после разбора страницы.
+        
+        Args:
+            keywords: Ключевые слова для поиска вакансий
+            max_pages: Сколько страниц выдачи смотреть на одно слово
+            max_results: Сколько вакансий просматривать на странице
+            max_companies: Остановиться после стольких компаний (None - без лимита)
+            
+        Yields:
+            Записи компаний (CompanyRecord)
+        """
+        async for company in self._discovery().aiter_companies(keywords, max_pages, max_results, max_companies):
+            yield company
+    
+    def iter_companies(self, keywords: List[str], max_pages: int = 5, max_results: int = 30,
+                       max_companies: Optional[int] = None) -> Iterator[CompanyRecord]:
+        """Синхронная обертка над aiter_companies (поиск идет в отдельном потоке)"""
+        return self._discovery().iter_companies(keywords, max_pages, max_results, max_companies)
 
 # --- Запуск ---
 if __name__ == "__main__":
@@ -112,13 +340,14 @@ if __name__ == "__main__":
     filtered_companies = []
     
     for company in found_companies:
-        inn = company.get('inn')
+        inn = company.inn
         if inn:
             financials = rusprofile.get_financials(inn)
             if financials and financials.get('revenue', 0) >= 100_000_000:
                 # Объединяем данные
-                company.update(financials)
-                filtered_companies.append(company)
+                row = company.as_row()
+                row.update(financials)
+                filtered_companies.append(row)
     
     print(f"После фильтрации: {len(filtered_companies)} компаний")
     
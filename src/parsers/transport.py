@@ -0,0 +1,184 @@
+import os
+import ssl
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+
+from .http_cache import CachedSession, ResponseCache
+
+try:
+    import httpx
+    import h2  # noqa: F401 - нужен httpx для HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Общие сессии: ключ -> сессия. Соединения (и TLS-рукопожатия)
+# переиспользуются всеми экземплярами парсеров с одинаковым ключом.
+_SESSIONS: Dict[Tuple, requests.Session] = {}
+_LOCK = threading.Lock()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """
+    Транспорт requests поверх httpx с поддержкой HTTP/2
+
+    Подключается к обычной requests.Session через mount(), поэтому кэш,
+    планировщик и парсеры работают с ним без изменений. Все запросы
+    к одному хосту мультиплексируются в одном соединении.
+    """
+
+    def __init__(self, pool_size: int = 10):
+        if not HTTP2_AVAILABLE:
+            raise ImportError("Для HTTP/2 установите httpx с поддержкой h2: pip install 'httpx[http2]'")
+        super().__init__()
+        self.pool_size = pool_size
+        # Проверка сертификата и прокси задаются у клиента httpx, поэтому на каждое
+        # их сочетание (verify, cert, proxy) - свой клиент со своим пулом
+        self._clients: Dict[Tuple, 'httpx.Client'] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _timeout(timeout) -> 'httpx.Timeout':
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(timeout)
+
+    @staticmethod
+    def _ssl_verify(verify, cert):
+        """verify и cert в терминах requests -> параметр verify для httpx"""
+        if not verify:
+            return False
+        if verify is True and cert is None:
+            return True
+        if verify is True:
+            context = ssl.create_default_context()
+        elif os.path.isdir(verify):
+            context = ssl.create_default_context(capath=verify)
+        else:
+            context = ssl.create_default_context(cafile=verify)
+        if cert is not None:
+            if isinstance(cert, tuple):
+                context.load_cert_chain(*cert)
+            else:
+                context.load_cert_chain(cert)
+        return context
+
+    def _client(self, verify, cert, proxy: Optional[str]) -> 'httpx.Client':
+        key = (verify, cert, proxy)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+                client = httpx.Client(http2=True, limits=limits, follow_redirects=False,
+                                      verify=self._ssl_verify(verify, cert), proxy=proxy, trust_env=False)
+                self._clients[key] = client
+        return client
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout=None,
+             verify=True, cert=None, proxies=None) -> requests.Response:
+        client = self._client(verify, cert, select_proxy(request.url, proxies or {}))
+        try:
+            upstream = client.request(
+                request.method, request.url, headers=dict(request.headers),
+                content=request.body, timeout=self._timeout(timeout),
+            )
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e), request=request) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e), request=request) from e
+
+        response = requests.Response()
+        response.status_code = upstream.status_code
+        # Тело уже распаковано httpx
+        response.headers = CaseInsensitiveDict(
+            (k, v) for k, v in upstream.headers.items() if k.lower() != 'content-encoding'
+        )
+        # Тело всегда читается целиком; при stream=True iter_content отдает его частями
+        response._content = upstream.content
+        response._content_consumed = True
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = upstream.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.elapsed = upstream.elapsed
+        response.connection = self
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+def configure_pool(session: requests.Session, pool_size: int, http2: bool = False) -> None:
+    """
+    Подключает к сессии пул соединений нужного размера
+
+    Args:
+        session: Сессия requests
+        pool_size: Сколько соединений держать открытыми к одному хосту
+                   (обычно равно числу одновременных запросов)
+        http2: Использовать HTTP/2 через httpx вместо urllib3
+    """
+    if http2:
+        adapter = HTTP2Adapter(pool_size=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    previous = {id(old): old for prefix, old in session.adapters.items() if prefix in ('https://', 'http://')}
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # Прежний пул больше не используется - закрываем его соединения
+    for old in previous.values():
+        old.close()
+
+
+def get_session(name: str, headers: Optional[Dict] = None, cache: Optional[ResponseCache] = None,
+                pool_size: int = 10, http2: bool = False) -> requests.Session:
+    """
+    Возвращает общую сессию с пулом соединений
+
+    Повторный вызов с тем же именем, заголовками и кэшем отдает ту же сессию,
+    поэтому открытые keep-alive соединения переиспользуются всеми экземплярами
+    парсеров. Пул создается по первому вызову; при запросе большего
+    pool_size пул пересоздается, а прежний закрывается.
+
+    Args:
+        name: Имя сессии (например, 'superjob' или 'rusprofile')
+        headers: Заголовки по умолчанию
+        cache: Кэш ответов (сессия будет CachedSession)
+        pool_size: Размер пула соединений
+        http2: Использовать HTTP/2 (нужен httpx и h2)
+
+    Returns:
+        Сессия requests
+    """
+    key = (name, tuple(sorted((headers or {}).items())), cache, http2)
+    with _LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = CachedSession(cache) if cache is not None else requests.Session()
+            if headers:
+                session.headers.update(headers)
+            configure_pool(session, pool_size, http2=http2)
+            session.pool_size = pool_size
+            _SESSIONS[key] = session
+        elif pool_size > session.pool_size:
+            configure_pool(session, pool_size, http2=http2)
+            session.pool_size = pool_size
+    return session
+
+
+def close_sessions() -> None:
+    """Закрывает все общие сессии и их соединения"""
+    with _LOCK:
+        for session in _SESSIONS.values():
+            session.close()
+        _SESSIONS.clear()
@@ -0,0 +1,276 @@
+import queue
+import threading
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from checkpoint import STAGE_INN_RESOLVED, STAGE_NOT_FOUND, CheckpointStore
+from filtering import FilterCriteria
+from parsers.metrics import METRICS, log
+from parsers.normalize import make_company_id
+from parsers.records import CompanyRecord, Financials, SiteAnalysis, Status
+from parsers.site_analyzer import SiteAnalyzer
+from sinks import CsvSink
+
+# Маркер окончания потока данных между стадиями
+_DONE = object()
+
+
+class EnrichmentPipeline:
+    """
+    Конвейер обогащения компаний данными Rusprofile
+
+    Стадии работают одновременно и связаны ограниченными очередями:
+    поиск ИНН по названию -> получение финансов по ИНН -> фильтр
+    по выручке -> [анализ сайта] -> запись в файл. У каждой стадии свое число потоков,
+    поэтому медленный ответ по одной компании не останавливает остальные.
+    
+    Если передано хранилище CheckpointStore, прогресс по каждой компании
+    сохраняется сразу, а свежие результаты прошлых запусков берутся
+    из него без обращения к Rusprofile.
+    
+    Если передан evidence, строки, готовые раньше, чем закончился входной
+    поток компаний, ждут его окончания и записываются с итоговыми
+    свидетельствами: cat_evidence не зависит от того, как быстро
+    компания прошла конвейер.
+    """
+
+    def __init__(self, rusprofile_parser, output_file: str = 'superjob_companies.csv',
+                 min_revenue: float = 100_000_000, resolve_workers: int = 2,
+                 financials_workers: int = 2, filter_workers: int = 1,
+                 queue_size: int = 16, checkpoint: Optional[CheckpointStore] = None,
+                 sink=None, keep_results: bool = True, preview_size: int = 5,
+                 criteria: Optional[FilterCriteria] = None, analyzer: Optional[SiteAnalyzer] = None,
+                 analyze_workers: int = 4, evidence: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            rusprofile_parser: Экземпляр RusprofileParser
+            output_file: CSV-файл результата (если не передан sink)
+            min_revenue: Минимальная выручка в рублях (если не передан criteria)
+            resolve_workers: Потоков поиска ИНН
+            financials_workers: Потоков получения финансов
+            filter_workers: Потоков фильтрации
+            queue_size: Размер очереди между стадиями
+            checkpoint: Хранилище прогресса для продолжения прерванных запусков
+            sink: Приемник строк (CsvSink, ParquetSink, MultiSink);
+                  закрывается в конце run()
+            keep_results: Возвращать ли из run() все прошедшие фильтр компании;
+                          False - в памяти остаются только первые preview_size
+            preview_size: Сколько первых записей сохранять в preview
+            criteria: Условия отбора (выручка, сотрудники, ОКВЭД);
+                      по умолчанию - только выручка не меньше min_revenue
+            analyzer: Анализатор сайтов; если передан, сайты прошедших
+                      фильтр компаний проверяются на упоминания CAT-систем
+            analyze_workers: Потоков анализа сайтов
+            evidence: Свидетельства компании по ее ключу (например, Discovery.evidence);
+                      объединяются с keywords записи после окончания входного потока,
+                      чтобы в cat_evidence попали все появления компании
+        """
+        self.parser = rusprofile_parser
+        self.output_file = output_file
+        self.min_revenue = min_revenue
+        self.criteria = criteria or FilterCriteria(min_revenue=min_revenue)
+        self.resolve_workers = resolve_workers
+        self.financials_workers = financials_workers
+        self.filter_workers = filter_workers
+        self.analyzer = analyzer
+        self.analyze_workers = analyze_workers
+        self.evidence = evidence
+        self.queue_size = queue_size
+        self.checkpoint = checkpoint
+        self.sink = sink
+        self.keep_results = keep_results
+        self.preview_size = preview_size
+        self._results: List[CompanyRecord] = []
+        # Сколько компаний поступило на вход конвейера и сколько записано
+        self.processed = 0
+        self.written = 0
+        self.preview: List[CompanyRecord] = []
+        self._active_sink = None
+        # Строки, ждущие окончания входного потока (только с evidence)
+        self._pending: List[CompanyRecord] = []
+        self._inputs_done = threading.Event()
+
+    # --- Стадии ---
+
+    def _resolve_inn(self, company: CompanyRecord) -> Optional[CompanyRecord]:
+        company_name = company.name
+        company_id = make_company_id(company_name)
+        
+        if self.checkpoint is not None:
+            saved = self.checkpoint.get_resolution(company_id)
+            if saved is None:
+                self.checkpoint.mark_discovered(company_id, company_name)
+            elif saved['fresh'] and saved['stage'] == STAGE_INN_RESOLVED:
+                METRICS.incr('checkpoint.hit')
+                company.inn = saved['inn']
+                company.status = Status.INN_RESOLVED
+                return company
+            elif saved['fresh'] and saved['stage'] == STAGE_NOT_FOUND:
+                METRICS.incr('checkpoint.hit')
+                return None
+            METRICS.incr('checkpoint.miss')
+        
+        log(f"Поиск ИНН для компании: {company_name}")
+        inn_info, definitive = self.parser.resolve_inn(company_name)
+        if inn_info and 'inn' in inn_info:
+            company.inn = inn_info['inn']
+            company.status = Status.INN_RESOLVED
+            # Недостоверный ИНН (похожее название, сайт не ответил) не сохраняем
+            if self.checkpoint is not None and definitive:
+                self.checkpoint.save_resolution(company_id, company_name, inn_info['inn'])
+            return company
+        # Ошибку сети не сохраняем: при следующем запуске поиск повторится
+        if self.checkpoint is not None and definitive:
+            self.checkpoint.save_resolution(company_id, company_name, None)
+        log(f"  ИНН не найден для {company_name}")
+        return None
+
+    def _fetch_financials(self, company: CompanyRecord) -> Optional[CompanyRecord]:
+        if self.checkpoint is not None:
+            saved = self.checkpoint.get_company(company.inn)
+            if saved is not None and saved['fresh']:
+                METRICS.incr('checkpoint.hit')
+                company.financials = Financials.from_dict(saved['data'])
+                company.status = Status.FINANCIALS_FETCHED
+                return company
+            METRICS.incr('checkpoint.miss')
+        
+        financials = self.parser.get_company_info(company.inn)
+        if financials and self.checkpoint is not None:
+            self.checkpoint.save_financials(company.inn, financials.as_dict())
+        company.financials = financials
+        company.status = Status.FINANCIALS_FETCHED
+        return company
+
+    def _filter_revenue(self, company: CompanyRecord) -> Optional[CompanyRecord]:
+        passed = self.criteria.matches(company.financials)
+        if company.financials is not None and self.checkpoint is not None:
+            self.checkpoint.mark_filtered(company.inn, passed)
+        METRICS.incr('filter.passed' if passed else 'filter.rejected')
+        if passed:
+            company.status = Status.PASSED
+            return company
+        company.status = Status.REJECTED
+        log(f"  Пропускаем: {company.name} не подходит под {self.criteria} (выручка {company.revenue})")
+        return None
+
+    def _analyze_site(self, company: CompanyRecord) -> CompanyRecord:
+        site = company.financials.site if company.financials is not None else ''
+        if site:
+            log(f"  Анализ сайта {site} ({company.name})")
+            try:
+                company.site_analysis = self.analyzer.analyze(site)
+            except Exception as e:
+                # Компания уже прошла фильтр: сбой анализа не должен убирать ее из результата
+                METRICS.incr('analyze_site.errors')
+                log(f"  Ошибка анализа сайта {site}: {e}")
+                company.site_analysis = SiteAnalysis(site=site, analyzed_at=date.today().isoformat())
+        return company
+
+    def _write(self, company: CompanyRecord) -> None:
+        if self.evidence is None:
+            self._emit(company)
+            return
+        # Пока поиск идет, у компании могут появиться новые свидетельства
+        if not self._inputs_done.is_set():
+            self._pending.append(company)
+            return
+        self._flush_pending()
+        self._emit(company)
+
+    def _flush_pending(self) -> None:
+        pending, self._pending = self._pending, []
+        for company in pending:
+            self._emit(company)
+
+    def _emit(self, company: CompanyRecord) -> None:
+        if self.evidence is not None:
+            company.keywords |= self.evidence(make_company_id(company.name))
+        self._active_sink.write(company.as_row())
+        self.written += 1
+        if len(self.preview) < self.preview_size:
+            self.preview.append(company)
+        if self.keep_results:
+            self._results.append(company)
+
+    # --- Запуск ---
+
+    @staticmethod
+    def _worker(stage: str, func: Callable[[CompanyRecord], Optional[CompanyRecord]], in_queue: queue.Queue,
+                out_queue: Optional[queue.Queue]) -> None:
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                break
+            try:
+                with METRICS.timer(stage):
+                    result = func(item)
+            except Exception as e:
+                METRICS.incr(f'{stage}.errors')
+                log(f"  Ошибка при обработке {item.name}: {e}")
+                continue
+            if result is not None and out_queue is not None:
+                out_queue.put(result)
+
+    def run(self, companies: Iterable[Union[CompanyRecord, Dict]]) -> List[CompanyRecord]:
+        """
+        Прогоняет компании через все стадии конвейера
+
+        Args:
+            companies: Компании с SuperJob (CompanyRecord или словари с ключом 'name');
+                       может быть генератором - компании обрабатываются по мере поступления
+
+        Returns:
+            Список компаний, прошедших фильтр по выручке
+            (пустой, если keep_results=False)
+        """
+        self._results = []
+        self.processed = 0
+        self.written = 0
+        self.preview = []
+        self._pending = []
+        self._inputs_done.clear()
+        # Файл создается только при появлении первой подходящей компании
+        self._active_sink = self.sink if self.sink is not None else CsvSink(self.output_file)
+        stages = [
+            ('resolve_inn', self._resolve_inn, self.resolve_workers),
+            ('fetch_financials', self._fetch_financials, self.financials_workers),
+            ('filter', self._filter_revenue, self.filter_workers),
+        ]
+        if self.analyzer is not None:
+            stages.append(('analyze_site', self._analyze_site, self.analyze_workers))
+        stages.append(('write', self._write, 1))  # запись в файл всегда в одном потоке
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in stages]
+        threads = []
+        for index, (stage, func, workers) in enumerate(stages):
+            out_queue = queues[index + 1] if index + 1 < len(queues) else None
+            stage_threads = [
+                threading.Thread(target=self._worker, args=(stage, func, queues[index], out_queue), daemon=True)
+                for _ in range(max(1, workers))
+            ]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        try:
+            for company in companies:
+                if isinstance(company, dict):
+                    company = CompanyRecord.from_dict(company)
+                self.processed += 1
+                queues[0].put(company)
+            # Входной поток закончился - свидетельства компаний больше не меняются
+            self._inputs_done.set()
+        finally:
+            # Закрываем стадии по очереди: когда все потоки стадии
+            # завершились, следующая стадия получает маркеры окончания
+            for stage_queue, stage_threads in zip(queues, threads):
+                for _ in stage_threads:
+                    stage_queue.put(_DONE)
+                for thread in stage_threads:
+                    thread.join()
+            # Все потоки остановлены: отложенные строки дописывает этот поток
+            self._flush_pending()
+            self._active_sink.close()
+            self._active_sink = None
+
+        return self._results
@@ -0,0 +1,160 @@
+import csv
+import threading
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Порядок колонок выходного файла: сначала основные поля,
+# затем остальные поля из RusprofileParser.get_company_info и анализ сайта
+OUTPUT_FIELDS = [
+    'inn', 'name', 'revenue', 'site', 'source', 'cat_evidence',
+    'cat_product', 'employees', 'okved_main',
+    'address', 'authorized_capital', 'ceo', 'email', 'full_name', 'ogrn',
+    'okved', 'phone', 'profit', 'registration_date', 'status',
+    # Анализ сайта компании (SiteAnalyzer)
+    'cat_confidence', 'website_accessible', 'website_analysis_date', 'analysis_duration',
+]
+
+# Денежные поля - в Parquet хранятся числами
+MONEY_FIELDS = ('revenue', 'profit', 'authorized_capital')
+
+
+class CsvSink:
+    """
+    Потоковая запись компаний в CSV с фиксированным набором колонок
+
+    Файл создается при первой записи, строки сбрасываются на диск
+    каждые flush_every строк и при закрытии.
+    """
+
+    def __init__(self, path: str, fieldnames: Optional[List[str]] = None, flush_every: int = 20):
+        self.path = path
+        self.fieldnames = list(fieldnames or OUTPUT_FIELDS)
+        self.flush_every = max(1, flush_every)
+        self.rows_written = 0
+        self._file = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def write(self, row: Dict) -> None:
+        with self._lock:
+            if self._writer is None:
+                self._file = open(self.path, 'w', newline='', encoding='utf-8')
+                self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+                self._writer.writeheader()
+            self._writer.writerow(row)
+            self.rows_written += 1
+            if self.rows_written % self.flush_every == 0:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetSink:
+    """
+    Потоковая запись компаний в Parquet (нужен pyarrow)
+
+    Строки копятся в буфере и записываются группами по row_group_size,
+    поэтому в памяти одновременно находится не больше одной группы.
+    Денежные поля сохраняются как float64, остальные - как строки.
+    """
+
+    def __init__(self, path: str, fieldnames: Optional[List[str]] = None, row_group_size: int = 1000):
+        if not PARQUET_AVAILABLE:
+            raise ImportError("Для записи в Parquet установите pyarrow: pip install pyarrow")
+        self.path = path
+        self.fieldnames = list(fieldnames or OUTPUT_FIELDS)
+        self.row_group_size = max(1, row_group_size)
+        self.rows_written = 0
+        self.schema = pa.schema([
+            (name, pa.float64() if name in MONEY_FIELDS else pa.string()) for name in self.fieldnames
+        ])
+        self._buffer: List[Dict] = []
+        self._writer = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _to_float(value) -> Optional[float]:
+        if value is None or value == '':
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        columns = {}
+        for name in self.fieldnames:
+            values = [row.get(name) for row in self._buffer]
+            if name in MONEY_FIELDS:
+                columns[name] = [self._to_float(value) for value in values]
+            else:
+                columns[name] = [None if value is None else str(value) for value in values]
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+        self._writer.write_table(table)
+        self._buffer = []
+
+    def write(self, row: Dict) -> None:
+        with self._lock:
+            self._buffer.append(row)
+            self.rows_written += 1
+            if len(self._buffer) >= self.row_group_size:
+                self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MultiSink:
+    """Записывает каждую строку сразу в несколько приемников"""
+
+    def __init__(self, sinks: List):
+        self.sinks = list(sinks)
+
+    @property
+    def rows_written(self) -> int:
+        return self.sinks[0].rows_written if self.sinks else 0
+
+    def write(self, row: Dict) -> None:
+        for sink in self.sinks:
+            sink.write(row)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,686 @@
+"""
+Общая очередь задач для распределенного обхода
+
+Координатор кладет в очередь задачи (страница выдачи, поиск ИНН, данные
+компании), а рабочие процессы - на этой машине или на других - берут их
+в аренду на visibility_timeout секунд. Если процесс упал и не подтвердил
+задачу, по истечении аренды ее получит другой процесс. У каждой задачи
+уникальный ключ: повторная постановка той же задачи ничего не меняет.
+
+Там же хранятся результаты (по ИНН, повторная запись перезаписывает
+ту же строку), множества свидетельств (по какому слову и на каком сайте
+встретилась компания - со всех задач, а не только с первой) и счетчики
+для общего лимита частоты запросов.
+
+Хранилища:
+    SQLiteTaskQueue - файл SQLite; процессы одной машины (или общий диск)
+                      согласуются блокировкой файла базы;
+    RedisTaskQueue  - Redis или совместимый сервер для нескольких машин;
+                      в тестах его заменяет InMemoryRedis.
+
+Открыть по адресу: open_queue('crawl_queue.sqlite'), open_queue('redis://host:6379/0'),
+open_queue('memory://').
+"""
+import fnmatch
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Состояния задачи
+STATE_PENDING = 'pending'
+STATE_LEASED = 'leased'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+
+
+@dataclass(slots=True)
+class Task:
+    """Задача, выданная в аренду рабочему процессу"""
+    key: str
+    kind: str
+    payload: Dict
+    attempts: int
+    lease_id: str
+
+
+class TaskQueue(ABC):
+    """
+    Интерфейс очереди задач
+
+    Задача выдается в аренду методом lease() и должна быть подтверждена
+    ack() или возвращена fail() до истечения аренды. Подтверждение
+    с чужим lease_id (аренда истекла и задачу уже взял другой процесс)
+    ничего не делает. Хранилище без одного из абстрактных методов
+    не создается.
+    """
+
+    def __init__(self, max_attempts: int = 5):
+        """
+        Args:
+            max_attempts: После стольких неудачных попыток задача
+                          считается проваленной и больше не выдается
+        """
+        self.max_attempts = max_attempts
+
+    @abstractmethod
+    def put(self, kind: str, key: str, payload: Dict, priority: int = 0) -> bool:
+        """
+        Ставит задачу в очередь
+
+        Args:
+            kind: Тип задачи
+            key: Уникальный ключ задачи
+            payload: Параметры задачи (JSON-совместимый словарь)
+            priority: Задачи с большим приоритетом выдаются раньше
+
+        Returns:
+            False, если задача с таким ключом уже была
+        """
+
+    @abstractmethod
+    def lease(self, worker: str, visibility_timeout: float) -> Optional[Task]:
+        """Выдает следующую задачу в аренду (None - свободных задач нет)"""
+
+    @abstractmethod
+    def ack(self, task: Task) -> bool:
+        """Отмечает задачу выполненной; False - аренда уже потеряна"""
+
+    @abstractmethod
+    def fail(self, task: Task, error: str) -> None:
+        """Возвращает задачу в очередь (или отмечает проваленной после max_attempts попыток)"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Число задач в каждом состоянии"""
+
+    def is_drained(self) -> bool:
+        """Нет ни ожидающих, ни выданных задач"""
+        counts = self.counts()
+        return not counts.get(STATE_PENDING) and not counts.get(STATE_LEASED)
+
+    @abstractmethod
+    def save_result(self, inn: str, data: Dict, passed: bool) -> None:
+        """Сохраняет строку результата по ИНН (повторная запись заменяет прежнюю)"""
+
+    @abstractmethod
+    def results(self, passed_only: bool = True) -> Iterator[Dict]:
+        """Сохраненные строки результатов"""
+
+    @abstractmethod
+    def add_evidence(self, key: str, items: Iterable[str]) -> None:
+        """Добавляет строки в множество key (повторы не добавляются)"""
+
+    @abstractmethod
+    def evidence(self, key: str) -> Set[str]:
+        """Множество строк, добавленных в key всеми процессами"""
+
+    @abstractmethod
+    def incr_window(self, key: str, ttl: float) -> int:
+        """Увеличивает счетчик на 1 и возвращает новое значение; счетчик живет ttl секунд"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Удаляет все задачи, результаты, свидетельства и счетчики"""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteTaskQueue(TaskQueue):
+    """
+    Очередь в файле SQLite
+
+    Выдача задачи идет в транзакции BEGIN IMMEDIATE: SQLite блокирует
+    файл на запись, поэтому два процесса не получат одну задачу.
+    """
+
+    def __init__(self, path: str = 'crawl_queue.sqlite', max_attempts: int = 5, busy_timeout: float = 30):
+        """
+        Args:
+            path: Путь к файлу базы
+            max_attempts: Попыток на задачу
+            busy_timeout: Сколько секунд ждать блокировку базы другим процессом
+        """
+        super().__init__(max_attempts)
+        self._lock = threading.Lock()
+        # Транзакции открываются явно (isolation_level=None)
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_id TEXT,
+                lease_until REAL,
+                worker TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks(state, priority);
+            CREATE TABLE IF NOT EXISTS results (
+                inn TEXT PRIMARY KEY,
+                passed INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS evidence (
+                key TEXT NOT NULL,
+                item TEXT NOT NULL,
+                PRIMARY KEY (key, item)
+            );
+            CREATE TABLE IF NOT EXISTS counters (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL,
+                expires REAL NOT NULL
+            );
+        """)
+
+    def put(self, kind: str, key: str, payload: Dict, priority: int = 0) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO tasks (key, kind, payload, priority, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(payload, ensure_ascii=False), priority, STATE_PENDING, time.time())
+            )
+        return cursor.rowcount > 0
+
+    def lease(self, worker: str, visibility_timeout: float) -> Optional[Task]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    now = time.time()
+                    # Ожидающие задачи и задачи с истекшей арендой
+                    row = self._conn.execute(
+                        "SELECT key, kind, payload, attempts FROM tasks "
+                        "WHERE state = ? OR (state = ? AND lease_until < ?) "
+                        "ORDER BY priority DESC, rowid LIMIT 1",
+                        (STATE_PENDING, STATE_LEASED, now)
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+                    key, kind, payload, attempts = row
+                    if attempts >= self.max_attempts:
+                        # Процессы с этой задачей падали max_attempts раз подряд
+                        self._conn.execute(
+                            "UPDATE tasks SET state = ?, error = ?, updated_at = ? WHERE key = ?",
+                            (STATE_FAILED, 'аренда истекла', now, key)
+                        )
+                        continue
+                    lease_id = uuid.uuid4().hex
+                    self._conn.execute(
+                        "UPDATE tasks SET state = ?, attempts = attempts + 1, lease_id = ?, lease_until = ?, "
+                        "worker = ?, updated_at = ? WHERE key = ?",
+                        (STATE_LEASED, lease_id, now + visibility_timeout, worker, now, key)
+                    )
+                    self._conn.execute("COMMIT")
+                    return Task(key, kind, json.loads(payload), attempts + 1, lease_id)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def ack(self, task: Task) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET state = ?, lease_id = NULL, updated_at = ? WHERE key = ? AND lease_id = ?",
+                (STATE_DONE, time.time(), task.key, task.lease_id)
+            )
+        return cursor.rowcount > 0
+
+    def fail(self, task: Task, error: str) -> None:
+        state = STATE_FAILED if task.attempts >= self.max_attempts else STATE_PENDING
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET state = ?, lease_id = NULL, error = ?, updated_at = ? "
+                "WHERE key = ? AND lease_id = ?",
+                (state, error, time.time(), task.key, task.lease_id)
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def save_result(self, inn: str, data: Dict, passed: bool) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (inn, passed, data, updated_at) VALUES (?, ?, ?, ?)",
+                (inn, int(passed), json.dumps(data, ensure_ascii=False), time.time())
+            )
+
+    def results(self, passed_only: bool = True) -> Iterator[Dict]:
+        query = "SELECT data FROM results" + (" WHERE passed = 1" if passed_only else "") + " ORDER BY rowid"
+        with self._lock:
+            rows = self._conn.execute(query).fetchall()
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def add_evidence(self, key: str, items: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO evidence (key, item) VALUES (?, ?)",
+                                   [(key, item) for item in items])
+
+    def evidence(self, key: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT item FROM evidence WHERE key = ?", (key,)).fetchall()
+        return {item for (item,) in rows}
+
+    def incr_window(self, key: str, ttl: float) -> int:
+        now = time.time()
+        with self._lock:
+            # Истекший счетчик начинается заново, как ключ с EXPIRE в Redis
+            value = self._conn.execute(
+                "INSERT INTO counters (key, value, expires) VALUES (?, 1, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "value = CASE WHEN expires < ? THEN 1 ELSE value + 1 END, "
+                "expires = CASE WHEN expires < ? THEN excluded.expires ELSE expires END "
+                "RETURNING value",
+                (key, now + ttl, now, now)
+            ).fetchone()[0]
+            # Старые счетчики удаляются изредка, а не при каждом запросе
+            if random.random() < 0.01:
+                self._conn.execute("DELETE FROM counters WHERE expires < ?", (now,))
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.executescript(
+                "DELETE FROM tasks; DELETE FROM results; DELETE FROM evidence; DELETE FROM counters;"
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisTaskQueue(TaskQueue):
+    """
+    Очередь в Redis (или совместимом сервере: KeyDB, Valkey, Dragonfly)
+
+    Ожидающие задачи - сортированное множество по приоритету и порядку
+    постановки, выданные - множество со временем окончания аренды. Истекшие
+    аренды возвращает в очередь любой процесс при следующем lease().
+
+    Каждый переход задачи (постановка, выдача, возврат, подтверждение)
+    выполняется одной транзакцией WATCH/MULTI/EXEC: задача переходит
+    из одного множества в другое целиком, и процесс, упавший посреди
+    перехода, не теряет ее. Если другой процесс успел изменить те же
+    ключи, транзакция повторяется. Lua не используется, поэтому в тестах
+    сервер заменяет InMemoryRedis.
+    """
+
+    def __init__(self, client, prefix: str = 'cat', max_attempts: int = 5):
+        """
+        Args:
+            client: Клиент redis.Redis(decode_responses=True) или InMemoryRedis
+            prefix: Префикс ключей (несколько обходов в одной базе)
+            max_attempts: Попыток на задачу
+        """
+        super().__init__(max_attempts)
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RedisTaskQueue':
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("Для очереди в Redis установите клиент: pip install redis")
+        return cls(redis.Redis.from_url(url, decode_responses=True), **kwargs)
+
+    def _key(self, *parts: str) -> str:
+        return ':'.join((self.prefix, *parts))
+
+    def _transaction(self, func: Callable, *watches: str):
+        """
+        Выполняет func(pipe) в транзакции и возвращает ее результат
+
+        До pipe.multi() команды func выполняются сразу (чтение), после -
+        копятся и применяются все вместе при EXEC.
+        """
+        return self.client.transaction(func, *watches, value_from_callable=True)
+
+    def put(self, kind: str, key: str, payload: Dict, priority: int = 0) -> bool:
+        seen = self._key('seen', key)
+
+        def enqueue(pipe) -> bool:
+            if pipe.exists(seen):
+                return False
+            # Больший приоритет - меньший счет; внутри приоритета - по порядку постановки
+            score = -priority * 1e12 + pipe.incr(self._key('seq'))
+            pipe.multi()
+            pipe.set(seen, 1)
+            pipe.hset(self._key('task', key), mapping={
+                'kind': kind, 'payload': json.dumps(payload, ensure_ascii=False),
+                'attempts': 0, 'state': STATE_PENDING, 'lease_id': '',
+            })
+            pipe.zadd(self._key('pending'), {key: score})
+            return True
+
+        return self._transaction(enqueue, seen)
+
+    def _requeue_expired(self) -> None:
+        leased = self._key('leased')
+        for key in self.client.zrangebyscore(leased, '-inf', time.time()):
+            task_key = self._key('task', key)
+
+            def requeue(pipe) -> None:
+                score = pipe.zscore(leased, key)
+                if score is None or score > time.time():
+                    return  # истекшую аренду уже вернул или продлил другой процесс
+                attempts = int(pipe.hget(task_key, 'attempts') or 0)
+                seq = None if attempts >= self.max_attempts else pipe.incr(self._key('seq'))
+                pipe.multi()
+                pipe.zrem(leased, key)
+                if seq is None:
+                    pipe.hset(task_key, mapping={'state': STATE_FAILED, 'lease_id': '', 'error': 'аренда истекла'})
+                    pipe.hincrby(self._key('stats'), STATE_FAILED, 1)
+                else:
+                    pipe.hset(task_key, mapping={'state': STATE_PENDING, 'lease_id': ''})
+                    pipe.zadd(self._key('pending'), {key: seq})
+
+            self._transaction(requeue, task_key)
+
+    def lease(self, worker: str, visibility_timeout: float) -> Optional[Task]:
+        self._requeue_expired()
+        pending, leased = self._key('pending'), self._key('leased')
+        lease_id = uuid.uuid4().hex
+
+        def claim(pipe) -> Optional[Tuple[str, int]]:
+            head = pipe.zrange(pending, 0, 0)
+            if not head:
+                return None
+            key = head[0]
+            task_key = self._key('task', key)
+            pipe.watch(task_key)
+            attempts = int(pipe.hget(task_key, 'attempts') or 0) + 1
+            pipe.multi()
+            pipe.zrem(pending, key)
+            pipe.zadd(leased, {key: time.time() + visibility_timeout})
+            pipe.hset(task_key, mapping={'state': STATE_LEASED, 'lease_id': lease_id, 'worker': worker,
+                                         'attempts': attempts})
+            return key, attempts
+
+        claimed = self._transaction(claim, pending)
+        if claimed is None:
+            return None
+        key, attempts = claimed
+        data = self.client.hgetall(self._key('task', key))
+        return Task(key, data['kind'], json.loads(data['payload']), attempts, lease_id)
+
+    def _finish(self, task: Task, state: str, error: Optional[str] = None) -> bool:
+        """Снимает аренду и переводит задачу в state, если аренда еще наша"""
+        task_key, leased = self._key('task', task.key), self._key('leased')
+
+        def finish(pipe) -> bool:
+            # Аренда наша, если lease_id не сменился и задача еще числится выданной
+            if pipe.hget(task_key, 'lease_id') != task.lease_id or pipe.zscore(leased, task.key) is None:
+                return False
+            seq = pipe.incr(self._key('seq')) if state == STATE_PENDING else None
+            fields = {'state': state, 'lease_id': ''}
+            if error is not None:
+                fields['error'] = error
+            pipe.multi()
+            pipe.zrem(leased, task.key)
+            pipe.hset(task_key, mapping=fields)
+            if seq is None:
+                pipe.hincrby(self._key('stats'), state, 1)
+            else:
+                pipe.zadd(self._key('pending'), {task.key: seq})
+            return True
+
+        return self._transaction(finish, task_key)
+
+    def ack(self, task: Task) -> bool:
+        return self._finish(task, STATE_DONE)
+
+    def fail(self, task: Task, error: str) -> None:
+        self._finish(task, STATE_FAILED if task.attempts >= self.max_attempts else STATE_PENDING, error)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {state: int(count) for state, count in self.client.hgetall(self._key('stats')).items()}
+        counts[STATE_PENDING] = self.client.zcard(self._key('pending'))
+        counts[STATE_LEASED] = self.client.zcard(self._key('leased'))
+        return counts
+
+    def save_result(self, inn: str, data: Dict, passed: bool) -> None:
+        self.client.hset(self._key('results'), inn, json.dumps({'passed': passed, 'data': data}, ensure_ascii=False))
+
+    def results(self, passed_only: bool = True) -> Iterator[Dict]:
+        for value in self.client.hgetall(self._key('results')).values():
+            result = json.loads(value)
+            if result['passed'] or not passed_only:
+                yield result['data']
+
+    def add_evidence(self, key: str, items: Iterable[str]) -> None:
+        items = list(items)
+        if items:
+            self.client.sadd(self._key('evidence', key), *items)
+
+    def evidence(self, key: str) -> Set[str]:
+        return set(self.client.smembers(self._key('evidence', key)))
+
+    def incr_window(self, key: str, ttl: float) -> int:
+        counter = self._key('counter', key)
+        value = self.client.incr(counter)
+        if value == 1:
+            self.client.expire(counter, max(1, int(ttl + 0.999)))
+        return value
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self._key('*')))
+        if keys:
+            self.client.delete(*keys)
+
+
+class InMemoryRedis:
+    """
+    Заменитель сервера Redis в памяти процесса (для тестов и бенчмарков)
+
+    Поддерживает только команды, которые использует RedisTaskQueue,
+    с теми же сигнатурами, что у redis.Redis(decode_responses=True).
+    Рабочие процессы должны быть потоками одного процесса.
+
+    transaction() выполняется целиком под блокировкой клиента, поэтому
+    WATCH не нужен и конфликтов не бывает; команды после pipe.multi()
+    копятся и применяются при выходе из функции, как EXEC.
+    """
+
+    def __init__(self):
+        # Повторно входимая: команды транзакции выполняются под той же блокировкой
+        self._lock = threading.RLock()
+        self._data: Dict[str, object] = {}
+        self._expires: Dict[str, float] = {}
+
+    def _get(self, name: str, default=None):
+        expires = self._expires.get(name)
+        if expires is not None and expires <= time.time():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return self._data.get(name, default)
+
+    def set(self, name: str, value, nx: bool = False) -> Optional[bool]:
+        with self._lock:
+            if nx and self._get(name) is not None:
+                return None
+            self._data[name] = str(value)
+            self._expires.pop(name, None)
+            return True
+
+    def get(self, name: str) -> Optional[str]:
+        with self._lock:
+            return self._get(name)
+
+    def exists(self, *names: str) -> int:
+        with self._lock:
+            return sum(1 for name in names if self._get(name) is not None)
+
+    def incr(self, name: str) -> int:
+        with self._lock:
+            value = int(self._get(name, 0)) + 1
+            self._data[name] = str(value)
+            return value
+
+    def expire(self, name: str, seconds: int) -> bool:
+        with self._lock:
+            if self._get(name) is None:
+                return False
+            self._expires[name] = time.time() + seconds
+            return True
+
+    def hset(self, name: str, key: Optional[str] = None, value=None, mapping: Optional[Dict] = None) -> int:
+        with self._lock:
+            table = self._data.setdefault(name, {})
+            items = dict(mapping or {})
+            if key is not None:
+                items[key] = value
+            added = sum(1 for field in items if field not in table)
+            table.update({field: str(item) for field, item in items.items()})
+            return added
+
+    def hget(self, name: str, key: str) -> Optional[str]:
+        with self._lock:
+            return self._get(name, {}).get(key)
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._get(name, {}))
+
+    def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        with self._lock:
+            table = self._data.setdefault(name, {})
+            value = int(table.get(key, 0)) + amount
+            table[key] = str(value)
+            return value
+
+    def sadd(self, name: str, *values: str) -> int:
+        with self._lock:
+            members = self._data.setdefault(name, set())
+            added = sum(1 for value in set(values) if value not in members)
+            members.update(str(value) for value in values)
+            return added
+
+    def smembers(self, name: str) -> Set[str]:
+        with self._lock:
+            return set(self._get(name, set()))
+
+    def zadd(self, name: str, mapping: Dict[str, float]) -> int:
+        with self._lock:
+            zset = self._data.setdefault(name, {})
+            added = sum(1 for member in mapping if member not in zset)
+            zset.update({member: float(score) for member, score in mapping.items()})
+            return added
+
+    def zpopmin(self, name: str, count: int = 1) -> List[Tuple[str, float]]:
+        with self._lock:
+            zset = self._get(name, {})
+            popped = sorted(zset.items(), key=lambda item: (item[1], item[0]))[:count]
+            for member, _ in popped:
+                del zset[member]
+            return popped
+
+    def zscore(self, name: str, member: str) -> Optional[float]:
+        with self._lock:
+            return self._get(name, {}).get(member)
+
+    def zrange(self, name: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            items = sorted(self._get(name, {}).items(), key=lambda item: (item[1], item[0]))
+            return [member for member, _ in items[start:None if end == -1 else end + 1]]
+
+    def zrangebyscore(self, name: str, min_score, max_score) -> List[str]:
+        with self._lock:
+            low, high = float(min_score), float(max_score)
+            items = sorted(self._get(name, {}).items(), key=lambda item: (item[1], item[0]))
+            return [member for member, score in items if low <= score <= high]
+
+    def zrem(self, name: str, *members: str) -> int:
+        with self._lock:
+            zset = self._get(name, {})
+            return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def zcard(self, name: str) -> int:
+        with self._lock:
+            return len(self._get(name, {}))
+
+    def scan_iter(self, match: str = '*') -> Iterator[str]:
+        with self._lock:
+            names = [name for name in self._data if fnmatch.fnmatchcase(name, match)]
+        return iter(names)
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            deleted = 0
+            for name in names:
+                deleted += self._data.pop(name, None) is not None
+                self._expires.pop(name, None)
+            return deleted
+
+    def pipeline(self) -> '_InMemoryPipeline':
+        return _InMemoryPipeline(self)
+
+    def transaction(self, func: Callable, *watches: str, value_from_callable: bool = False):
+        with self._lock:
+            pipe = self.pipeline()
+            value = func(pipe)
+            results = pipe.execute()
+        return value if value_from_callable else results
+
+
+class _InMemoryPipeline:
+    """Транзакция InMemoryRedis: до multi() команды выполняются сразу, после - копятся до execute()"""
+
+    def __init__(self, client: InMemoryRedis):
+        self._client = client
+        self._queued: Optional[List[Tuple[str, tuple, dict]]] = None
+
+    def watch(self, *names: str) -> None:
+        pass
+
+    def multi(self) -> None:
+        self._queued = []
+
+    def execute(self) -> List:
+        queued, self._queued = self._queued or [], None
+        return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in queued]
+
+    def __getattr__(self, name: str):
+        command = getattr(self._client, name)
+        if self._queued is None:
+            return command
+
+        def queue(*args, **kwargs) -> '_InMemoryPipeline':
+            self._queued.append((name, args, kwargs))
+            return self
+
+        return queue
+
+
+def open_queue(url: str, **kwargs) -> TaskQueue:
+    """
+    Открывает очередь по адресу
+
+    Args:
+        url: 'redis://host:6379/0' - Redis, 'memory://' - InMemoryRedis
+             (только потоки одного процесса), иначе путь к файлу SQLite
+             (можно с префиксом 'sqlite:///')
+        **kwargs: Параметры конструктора очереди
+    """
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisTaskQueue.from_url(url, **kwargs)
+    if url.startswith('memory://'):
+        return RedisTaskQueue(InMemoryRedis(), **kwargs)
+    if url.startswith('sqlite:///'):
+        url = url[len('sqlite:///'):]
+    return SQLiteTaskQueue(url, **kwargs)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули проекта импортируются из src, как в src/main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
@@ -0,0 +1,101 @@
+"""Кэш HTTP-ответов: учет размера и вытеснение"""
+import requests
+
+from parsers import http_cache
+from parsers.http_cache import CachedSession, ResponseCache
+from parsers.scheduler import RequestScheduler
+
+
+def make_response(url: str, size: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = b'x' * size
+    return response
+
+
+def test_total_bytes_follows_put_replace_and_clear():
+    cache = ResponseCache(':memory:', max_bytes=10_000)
+    cache.put('a', make_response('https://a', 100), ttl=60)
+    cache.put('b', make_response('https://b', 50), ttl=60)
+    assert cache.total_bytes() == 150
+    cache.put('a', make_response('https://a', 30), ttl=60)
+    assert cache.total_bytes() == 80
+    cache.clear()
+    assert cache.total_bytes() == 0
+
+
+def test_evicts_least_recently_used(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(http_cache.time, 'time', lambda: clock[0])
+    cache = ResponseCache(':memory:', max_bytes=300)
+    for key in 'abc':
+        cache.put(key, make_response(f'https://{key}', 100), ttl=10_000)
+        clock[0] += 1
+    # Недавно записанное время использования не обновляется: 'a' остается самой старой
+    assert cache.get('a') is not None
+    cache.put('d', make_response('https://d', 100), ttl=10_000)
+    assert cache.get('a') is None
+    # Спустя ACCESS_RESOLUTION попадание обновляет время, и вытесняется 'c'
+    clock[0] += http_cache.ACCESS_RESOLUTION
+    assert cache.get('b') is not None
+    cache.put('e', make_response('https://e', 100), ttl=10_000)
+    assert cache.get('c') is None
+    assert [cache.get(key) is not None for key in 'bde'] == [True, True, True]
+    assert cache.total_bytes() == 300
+
+
+def test_total_bytes_of_existing_file(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = ResponseCache(path)
+    cache.put('a', make_response('https://a', 70), ttl=60)
+    cache.close()
+    assert ResponseCache(path).total_bytes() == 70
+
+
+class StaticAdapter(requests.adapters.BaseAdapter):
+    """Отвечает 200 на любой запрос, не обращаясь к сети"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        response = make_response(request.url, 10)
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_miss_reads_cache_once(monkeypatch):
+    cache = ResponseCache(':memory:', ttls={}, default_ttl=60)
+    session = CachedSession(cache)
+    adapter = StaticAdapter()
+    session.mount('https://', adapter)
+    lookups = []
+    original_get = cache.get
+    monkeypatch.setattr(cache, 'get', lambda key: lookups.append(key) or original_get(key))
+    scheduler = RequestScheduler(rate=100, burst=10)
+
+    response = scheduler.request(session, 'GET', 'https://example.ru/page', params={'q': 1})
+    assert not response.from_cache
+    assert len(lookups) == 1
+    response = scheduler.request(session, 'GET', 'https://example.ru/page', params={'q': 1})
+    assert response.from_cache
+    assert len(lookups) == 2
+    assert adapter.sent == 1
+
+
+def test_result_cache_by_content_hash():
+    cache = ResponseCache(':memory:')
+    assert cache.get_result('site_analysis', 'example.ru', 'h1') is None
+    cache.put_result('site_analysis', 'example.ru', 'h1', {'cat_product': 'Trados'})
+    assert cache.get_result('site_analysis', 'example.ru', 'h1') == {'cat_product': 'Trados'}
+    # Содержимое сайта изменилось - прежний результат не подходит
+    assert cache.get_result('site_analysis', 'example.ru', 'h2') is None
+    cache.put_result('site_analysis', 'example.ru', 'h2', {'cat_product': ''})
+    assert cache.get_result('site_analysis', 'example.ru', 'h1') is None
+    assert cache.get_result('other', 'example.ru', 'h2') is None
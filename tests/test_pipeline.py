@@ -0,0 +1,65 @@
+"""Конвейер обогащения: свидетельства в строке не зависят от скорости обработки"""
+import time
+
+from parsers.normalize import make_company_id
+from parsers.records import CompanyRecord, Financials, Source, keyword_bit
+from pipeline import EnrichmentPipeline
+
+
+class FakeRusprofile:
+    """ИНН и финансы без обращения к сайту; все компании проходят фильтр"""
+
+    def __init__(self):
+        self.names = {}
+
+    def resolve_inn(self, name):
+        inn = str(7700000001 + len(self.names))
+        self.names[inn] = name
+        return {'inn': inn}, True
+
+    def get_company_info(self, inn):
+        return Financials(inn=inn, name=self.names[inn], revenue=500_000_000)
+
+
+class ListSink:
+    def __init__(self):
+        self.rows = []
+        self.closed = False
+
+    def write(self, row):
+        self.rows.append(row)
+
+    def close(self):
+        self.closed = True
+
+
+def test_rows_get_evidence_found_after_handoff():
+    masks = {}
+
+    def companies():
+        for name in ('ООО Альфа', 'ООО Бета'):
+            mask = keyword_bit((Source.SUPERJOB, 'Trados'))
+            masks[make_company_id(name)] = mask
+            yield CompanyRecord(name=name, keywords=mask)
+        # Пока первые компании уже прошли конвейер, поиск находит их на другом сайте
+        time.sleep(0.3)
+        masks[make_company_id('ООО Альфа')] |= keyword_bit((Source.HH, 'переводчик'))
+
+    sink = ListSink()
+    pipeline = EnrichmentPipeline(FakeRusprofile(), sink=sink, resolve_workers=1, evidence=lambda company_id: masks.get(company_id, 0))
+    pipeline.run(companies())
+
+    assert sink.closed
+    assert pipeline.written == 2
+    evidence = {row['name']: row['cat_evidence'] for row in sink.rows}
+    assert evidence == {
+        'ООО Альфа': 'Вакансия: superjob.ru - Trados; hh.ru - переводчик',
+        'ООО Бета': 'Вакансия: Trados',
+    }
+
+
+def test_rows_written_immediately_without_evidence():
+    sink = ListSink()
+    pipeline = EnrichmentPipeline(FakeRusprofile(), sink=sink)
+    pipeline.run([{'name': 'ООО Альфа'}])
+    assert [row['name'] for row in sink.rows] == ['ООО Альфа']
@@ -0,0 +1,39 @@
+"""Записи о компаниях: колонка cat_evidence"""
+import pytest
+
+from parsers.records import CompanyRecord, Source, format_evidence, parse_evidence
+
+
+@pytest.mark.parametrize('evidence', [
+    [(Source.SUPERJOB, 'Trados'), (Source.SUPERJOB, 'memoQ')],
+    [(Source.SUPERJOB, 'Trados'), (Source.SUPERJOB, 'memoQ'), (Source.HH, 'переводчик')],
+    [(Source.HH, 'Smartcat'), (Source.SUPERJOB, 'translation memory'), (Source.SUPERJOB, 'CAT tool')],
+])
+def test_parse_evidence_reverses_format_evidence(evidence):
+    assert parse_evidence(format_evidence(evidence)) == evidence
+
+
+def test_single_source_form_uses_default_source():
+    assert parse_evidence('Вакансия: Trados, memoQ', Source.HH) == [(Source.HH, 'Trados'), (Source.HH, 'memoQ')]
+    assert parse_evidence('') == []
+
+
+def test_company_record_round_trip():
+    record = CompanyRecord(name='ООО Ромашка', inn='7700000001')
+    record.add_keyword('Trados')
+    record.add_keyword('memoQ')
+    record.add_keyword('переводчик', Source.HH)
+    row = record.as_row()
+    assert row['cat_evidence'] == 'Вакансия: superjob.ru - Trados, memoQ; hh.ru - переводчик'
+
+    restored = CompanyRecord.from_dict(row)
+    assert restored.evidence == record.evidence
+    assert restored.as_row() == row
+
+
+def test_single_source_round_trip_keeps_record_source():
+    record = CompanyRecord(name='ООО Ромашка', source=Source.HH)
+    record.add_keyword('Smartcat')
+    restored = CompanyRecord.from_dict(record.as_row())
+    assert restored.source == Source.HH
+    assert restored.evidence == [(Source.HH, 'Smartcat')]
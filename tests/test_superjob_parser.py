@@ -0,0 +1,58 @@
+"""Разбор выдачи SuperJob: ошибка одной страницы не теряет остальные"""
+import asyncio
+import os
+
+import pytest
+import requests
+
+from parsers.parse_pool import ParsePool
+from parsers.superjob_parser import SuperJobParser
+
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures', 'superjob_search.html')
+
+
+class FakeScheduler:
+    """Отдает страницу выдачи из фикстуры, а для слова 'broken' - тело, которое не разбирается"""
+
+    def __init__(self):
+        with open(FIXTURE, 'rb') as f:
+            self.page = f.read()
+
+    def _response(self, url):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = None if 'broken' in url else self.page
+        return response
+
+    def request(self, session, method, url, **kwargs):
+        return self._response(url)
+
+    async def request_async(self, session, method, url, **kwargs):
+        return self._response(url)
+
+
+@pytest.fixture(scope='module')
+def parse_pool():
+    with ParsePool(workers=2, chunksize=2) as pool:
+        yield pool
+
+
+def test_pool_map_returns_exceptions(parse_pool):
+    results = parse_pool.map(int, ['1', 'x', '3'], return_exceptions=True)
+    assert results[0] == 1 and results[2] == 3
+    assert isinstance(results[1], ValueError)
+
+
+@pytest.mark.parametrize('use_pool', [False, True])
+@pytest.mark.parametrize('run_async', [False, True])
+def test_bad_page_skips_only_its_keyword(parse_pool, use_pool, run_async):
+    parser = SuperJobParser(scheduler=FakeScheduler(), parse_pool=parse_pool if use_pool else None)
+    keywords = ['Trados', 'broken', 'memoQ']
+    if run_async:
+        companies = asyncio.run(parser.search_companies_by_keywords_async(keywords))
+    else:
+        companies = parser.search_companies_by_keywords(keywords)
+    assert companies
+    evidence = {keyword for company in companies for keyword in company.keywords_found}
+    assert evidence == {'Trados', 'memoQ'}
@@ -0,0 +1,263 @@
+"""Очередь задач распределенного обхода: оба хранилища ведут себя одинаково"""
+import time
+
+import pytest
+
+from task_queue import (STATE_DONE, STATE_FAILED, STATE_LEASED, STATE_PENDING, InMemoryRedis,
+                        RedisTaskQueue, SQLiteTaskQueue)
+
+LEASE = 0.05
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def make_queue(request, tmp_path):
+    queues = []
+
+    def make(max_attempts=5):
+        if request.param == 'sqlite':
+            queue = SQLiteTaskQueue(str(tmp_path / f'queue{len(queues)}.sqlite'), max_attempts=max_attempts)
+        else:
+            queue = RedisTaskQueue(InMemoryRedis(), max_attempts=max_attempts)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+@pytest.fixture
+def queue(make_queue):
+    return make_queue()
+
+
+def expire_lease():
+    time.sleep(LEASE * 3)
+
+
+def test_lease_by_priority_then_order(queue):
+    queue.put('page', 'a', {'n': 1}, priority=0)
+    queue.put('page', 'b', {'n': 2}, priority=0)
+    queue.put('company', 'c', {'n': 3}, priority=2)
+    keys = [queue.lease('w', 60).key for _ in range(3)]
+    assert keys == ['c', 'a', 'b']
+    assert queue.lease('w', 60) is None
+
+
+def test_leased_task_is_not_given_twice(queue):
+    queue.put('page', 'a', {'n': 1})
+    task = queue.lease('w1', 60)
+    assert task.payload == {'n': 1}
+    assert task.attempts == 1
+    assert queue.lease('w2', 60) is None
+    assert queue.counts()[STATE_LEASED] == 1
+    assert not queue.is_drained()
+
+
+def test_expired_lease_is_leased_again(queue):
+    queue.put('page', 'a', {})
+    first = queue.lease('w1', LEASE)
+    expire_lease()
+    second = queue.lease('w2', 60)
+    assert second is not None
+    assert second.key == first.key
+    assert second.attempts == 2
+    assert second.lease_id != first.lease_id
+
+
+def test_stale_ack_after_expiry_is_ignored(queue):
+    queue.put('page', 'a', {})
+    stale = queue.lease('w1', LEASE)
+    expire_lease()
+    current = queue.lease('w2', 60)
+    assert queue.ack(stale) is False
+    assert queue.counts()[STATE_LEASED] == 1
+    assert queue.ack(current) is True
+    assert queue.counts().get(STATE_DONE) == 1
+    assert queue.is_drained()
+
+
+def test_stale_fail_after_expiry_is_ignored(queue):
+    queue.put('page', 'a', {})
+    stale = queue.lease('w1', LEASE)
+    expire_lease()
+    current = queue.lease('w2', 60)
+    queue.fail(stale, 'поздно')
+    assert queue.lease('w3', 60) is None
+    assert queue.ack(current) is True
+
+
+def test_ack_twice(queue):
+    queue.put('page', 'a', {})
+    task = queue.lease('w', 60)
+    assert queue.ack(task) is True
+    assert queue.ack(task) is False
+    assert queue.counts().get(STATE_DONE) == 1
+
+
+def test_fail_retries_until_max_attempts(make_queue):
+    queue = make_queue(max_attempts=3)
+    queue.put('page', 'a', {})
+    for attempt in range(1, 4):
+        task = queue.lease('w', 60)
+        assert task is not None
+        assert task.attempts == attempt
+        queue.fail(task, 'ошибка сети')
+    assert queue.lease('w', 60) is None
+    counts = queue.counts()
+    assert counts.get(STATE_FAILED) == 1
+    assert not counts.get(STATE_PENDING)
+    assert queue.is_drained()
+
+
+def test_expired_lease_counts_as_attempt(make_queue):
+    queue = make_queue(max_attempts=2)
+    queue.put('page', 'a', {})
+    queue.lease('w1', LEASE)
+    expire_lease()
+    queue.lease('w2', LEASE)
+    expire_lease()
+    assert queue.lease('w3', 60) is None
+    assert queue.counts().get(STATE_FAILED) == 1
+
+
+def test_put_is_idempotent(queue):
+    assert queue.put('page', 'a', {'n': 1}) is True
+    assert queue.put('page', 'a', {'n': 2}) is False
+    task = queue.lease('w', 60)
+    assert task.payload == {'n': 1}
+    queue.ack(task)
+    # Выполненная задача тоже не ставится заново
+    assert queue.put('page', 'a', {'n': 3}) is False
+    assert queue.lease('w', 60) is None
+
+
+def test_save_result_replaces_row(queue):
+    queue.save_result('7700000001', {'inn': '7700000001', 'revenue': 1}, passed=False)
+    queue.save_result('7700000001', {'inn': '7700000001', 'revenue': 2}, passed=True)
+    queue.save_result('7700000002', {'inn': '7700000002', 'revenue': 3}, passed=False)
+    assert list(queue.results()) == [{'inn': '7700000001', 'revenue': 2}]
+    assert sorted(row['inn'] for row in queue.results(passed_only=False)) == ['7700000001', '7700000002']
+
+
+def test_evidence_is_a_set(queue):
+    queue.add_evidence('company:a', ['hh.ru\tTrados', 'superjob.ru\tmemoQ'])
+    queue.add_evidence('company:a', ['hh.ru\tTrados'])
+    queue.add_evidence('company:a', [])
+    assert queue.evidence('company:a') == {'hh.ru\tTrados', 'superjob.ru\tmemoQ'}
+    assert queue.evidence('company:b') == set()
+
+
+def test_incr_window(queue):
+    assert [queue.incr_window('rate:host:1', ttl=60) for _ in range(3)] == [1, 2, 3]
+    assert queue.incr_window('rate:host:2', ttl=60) == 1
+    assert queue.incr_window('rate:other:1', ttl=60) == 1
+
+
+def test_incr_window_expires(queue):
+    assert queue.incr_window('rate:host:1', ttl=1) == 1
+    assert queue.incr_window('rate:host:1', ttl=1) == 2
+    time.sleep(1.1)
+    assert queue.incr_window('rate:host:1', ttl=1) == 1
+
+
+def test_clear(queue):
+    queue.put('page', 'a', {})
+    queue.save_result('7700000001', {'inn': '7700000001'}, passed=True)
+    queue.add_evidence('company:a', ['hh.ru\tTrados'])
+    queue.incr_window('rate:host:1', ttl=60)
+    queue.clear()
+    assert queue.lease('w', 60) is None
+    assert list(queue.results(passed_only=False)) == []
+    assert queue.evidence('company:a') == set()
+    assert queue.incr_window('rate:host:1', ttl=60) == 1
+    assert queue.put('page', 'a', {}) is True
+
+
+class WorkerCrash(Exception):
+    pass
+
+
+class CrashingPipeline:
+    """Транзакция, процесс которой падает, отправив часть команд после MULTI"""
+
+    def __init__(self, pipe, command: str, key_suffix: str):
+        self._pipe = pipe
+        self._command = command
+        self._key_suffix = key_suffix
+        self._in_multi = False
+
+    def multi(self):
+        self._in_multi = True
+        self._pipe.multi()
+
+    def __getattr__(self, name):
+        attr = getattr(self._pipe, name)
+        if not self._in_multi or name != self._command:
+            return attr
+
+        def crash(key, *args, **kwargs):
+            if key.endswith(self._key_suffix):
+                raise WorkerCrash(f'{name} {key}')
+            return attr(key, *args, **kwargs)
+
+        return crash
+
+
+class CrashingRedis(InMemoryRedis):
+    def __init__(self):
+        super().__init__()
+        self.crash_on = None
+
+    def pipeline(self):
+        pipe = super().pipeline()
+        return CrashingPipeline(pipe, *self.crash_on) if self.crash_on else pipe
+
+
+@pytest.fixture
+def crashing():
+    client = CrashingRedis()
+    return client, RedisTaskQueue(client)
+
+
+def test_redis_crash_during_lease_keeps_task(crashing):
+    client, queue = crashing
+    queue.put('page', 'a', {})
+    # Процесс упал после ZREM из pending, не успев добавить задачу в leased
+    client.crash_on = ('zadd', ':leased')
+    with pytest.raises(WorkerCrash):
+        queue.lease('w1', 60)
+    client.crash_on = None
+    assert queue.counts()[STATE_PENDING] == 1
+    task = queue.lease('w2', 60)
+    assert task.key == 'a'
+    assert task.attempts == 1
+
+
+def test_redis_crash_during_requeue_keeps_task(crashing):
+    client, queue = crashing
+    queue.put('page', 'a', {})
+    queue.lease('w1', LEASE)
+    expire_lease()
+    # Процесс упал после ZREM из leased, не успев вернуть задачу в pending
+    client.crash_on = ('zadd', ':pending')
+    with pytest.raises(WorkerCrash):
+        queue.lease('w2', 60)
+    client.crash_on = None
+    assert queue.counts()[STATE_LEASED] == 1
+    task = queue.lease('w3', 60)
+    assert task.key == 'a'
+    assert task.attempts == 2
+
+
+def test_redis_crash_during_fail_keeps_lease(crashing):
+    client, queue = crashing
+    queue.put('page', 'a', {})
+    task = queue.lease('w1', 60)
+    client.crash_on = ('zadd', ':pending')
+    with pytest.raises(WorkerCrash):
+        queue.fail(task, 'ошибка сети')
+    client.crash_on = None
+    assert queue.counts()[STATE_LEASED] == 1
+    queue.fail(task, 'ошибка сети')
+    assert queue.lease('w2', 60).attempts == 2
@@ -0,0 +1,86 @@
+"""Общие сессии и транспорт HTTP/2"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from parsers import transport
+from parsers.transport import HTTP2_AVAILABLE, close_sessions, configure_pool, get_session
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions():
+    close_sessions()
+    yield
+    close_sessions()
+
+
+def test_headers_are_part_of_the_session_key():
+    first = get_session('test', headers={'User-Agent': 'a'})
+    again = get_session('test', headers={'User-Agent': 'a'})
+    other = get_session('test', headers={'User-Agent': 'b'})
+    assert first is again
+    assert other is not first
+    assert other.headers['User-Agent'] == 'b'
+
+
+def test_growing_pool_closes_previous_adapter(monkeypatch):
+    closed = []
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, 'close', lambda adapter: closed.append(adapter))
+    session = get_session('test', pool_size=2)
+    previous = session.get_adapter('https://example.ru')
+    closed.clear()
+    get_session('test', pool_size=8)
+    assert closed == [previous]
+    assert session.get_adapter('https://example.ru') is not previous
+    assert session.pool_size == 8
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'x' * 1000
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.skipif(not HTTP2_AVAILABLE, reason='нужен httpx с h2')
+def test_http2_adapter_forwards_send_options(server_url):
+    session = requests.Session()
+    # Без CA-бандла и прокси из переменных окружения
+    session.trust_env = False
+    configure_pool(session, 2, http2=True)
+    adapter = session.get_adapter(server_url)
+
+    response = session.get(server_url, stream=True, verify=False, timeout=5)
+    assert b''.join(response.iter_content(100)) == b'x' * 1000
+    assert list(adapter._clients) == [(False, None, None)]
+
+    session.get(server_url, timeout=5, proxies={'https': 'http://proxy.invalid:3128'})
+    assert (True, None, None) in adapter._clients
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get(server_url, timeout=5, proxies={'http': 'http://127.0.0.1:9'})
+    assert (True, None, 'http://127.0.0.1:9') in adapter._clients
+
+    adapter.close()
+    assert adapter._clients == {}
+
+
+def test_module_has_no_stale_sessions():
+    assert transport._SESSIONS == {}